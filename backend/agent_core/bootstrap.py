@@ -10,6 +10,8 @@ from backend.memory.memory_zep_thread import ZepThreadMemory
 from backend.captain_hub import CaptainHub, HubPolicy
 from backend.orchestration.zep_adapter import ZepMemoryAdapter, PersistTarget
 from backend.memory.memory import ZepMemory
+from backend.llm_client import AsyncLLMClient
+from backend.reply_cache import ReplyCache
 
 
 @dataclass
@@ -23,6 +25,7 @@ class RuntimeState:
     hub: Optional[Any]
     orch_nested: bool
     persist_cfg: dict
+    llm: Optional[Any] = None  # geteilter AsyncLLMClient (Pool + Concurrency-Cap)
 
 
 _RUNTIME: Optional[RuntimeState] = None
@@ -123,17 +126,45 @@ async def ensure_runtime() -> RuntimeState:
     if mem_thread is None:
         raise RuntimeError("ZEP-Memory fehlt – Adapter kann nicht gebaut werden.")
     mem_adapter = ZepMemoryAdapter(zep_facade=mem_thread, thread_mode=thread_mode, targets=targets)
+    if mem_adapter.mirror_stats() is not None:
+        logger.info("🪞 ZEP-Mirror aktiv (targets={})", targets)
     
+    # Geteilter Async-LLM-Client (einmal pro Prozess, Keep-Alive-Pool)
+    llm = AsyncLLMClient.from_env()
+    llm.bind_loop()
+    logger.info("🤖 LLM-Client: model={} | max_concurrency={} | timeout={}s", llm.model, llm.max_concurrency, llm.timeout)
+
     # Router laden – ohne Fallback
     from backend.captain_spoke_registry import RealRouter, load_default_spokes
-    router_obj = RealRouter(load_default_spokes())
+    router_obj = RealRouter(load_default_spokes(llm=llm))
     logger.info("🔌 RealRouter aktiv (registry-basiert).")
 
     # 👉 jetzt ist router_obj garantiert gebunden:
     logger.info("🧩 Router: {}", type(router_obj).__name__)
 
     # Hub + Chat-Facade: Hub bauen, core2-Lobby anhängen, Fassade bereitstellen
-    hub = CaptainHub(router=router_obj, memory=mem_adapter, policy=HubPolicy(persist_workcell=targets["workcell"]))
+    # Optionaler Reply-Cache für Near-Duplicate-Prompts (CHAT_REPLY_CACHE=true)
+    reply_cache = None
+    try:
+        reply_cache = ReplyCache.from_env()
+        if reply_cache is not None:
+            logger.info("🗃️ Reply-Cache aktiv (threshold={}, ttl={}s)", reply_cache.threshold, reply_cache.ttl)
+    except Exception as e:
+        logger.warning("⚠️ Reply-Cache nicht verfügbar: {}", e)
+
+    hub = CaptainHub(
+        router=router_obj,
+        memory=mem_adapter,
+        policy=HubPolicy(
+            persist_workcell=targets["workcell"],
+            coder_fanout=int(os.getenv("ORCH_CODER_FANOUT", "1")),
+            spoke_wait=float(os.getenv("ORCH_SPOKE_WAIT", "5")),
+            spoke_fallback=os.getenv("ORCH_SPOKE_FALLBACK", "overcommit"),
+            spoke_score_band=int(os.getenv("ORCH_SPOKE_SCORE_BAND", "0")),
+        ),
+        llm=llm,
+        reply_cache=reply_cache,
+    )
 
     hub_lobby = hub.build_chat_facade(zep_facade=mem_thread, user_id=user_id, thread_id=canonical_tid)
 
@@ -204,6 +235,7 @@ async def ensure_runtime() -> RuntimeState:
         hub=hub,
         orch_nested=orch_nested,
         persist_cfg=persist_cfg,
+        llm=llm,
     )
     logger.info("✅ ensure_runtime: bereit (thread_id={!r}; nested={})", canonical_tid, orch_nested)
     return _RUNTIME
@@ -2,15 +2,49 @@
 from __future__ import annotations
 from dataclasses import dataclass
 from enum import Enum
-from typing import Any, Dict, List, Optional, Protocol, Set, Tuple, Callable, cast, Sequence
+from typing import Any, AsyncIterator, Dict, List, Optional, Protocol, Set, Tuple, Callable, cast, Sequence
 from .prompts import render_planner, render_implement, render_review
 from .workcell_io import WorkcellIO
+from .reply_cache import fingerprint
+from .metrics import timed
+from .llm_cache import cache_bypassed, cache_key, cache_skip, cache_skipped, get_llm_cache
+from .spoke_slots import SpokeSlots, spoke_slots
+from .orchestration.batch import pack_planner_prompts, split_packed_plans
+from .orchestration.cancel import CancelToken, RunCancelled, check_cancelled, use_token
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait as wait_futures
+import asyncio
+import contextvars
+import inspect
+import queue
+import re
+import threading
+import time
 import uuid 
 import os
 from loguru import logger
 
 
-def _llm_chat(messages: Sequence[dict[str, Any]], model: str | None = None) -> str | None:
+def _llm_chat(messages: Sequence[dict[str, Any]], model: str | None = None, *, cacheable: Optional[bool] = None) -> str | None:
+    # Legacy-Pfad nutzt fix temperature=0.7 → Cache nur bei explizitem `cacheable`
+    cache = get_llm_cache() if cacheable and not cache_skipped() else None
+    key = None
+    if cache is not None:
+        key = cache_key(
+            model=model or os.getenv("OPENAI_MODEL", "gpt-4o-mini"), messages=messages,
+            temperature=0.7, base_url=os.getenv("OPENAI_BASE_URL"),
+        )
+        if cache_bypassed():
+            cache.note_bypass()
+        elif (hit := cache.get(key)) is not None:
+            return hit
+    with timed("llm", engine="legacy"):
+        out = _llm_chat_blocking(messages, model)
+    if cache is not None and key is not None and out:
+        cache.put(key, out)
+    return out
+
+
+def _llm_chat_blocking(messages: Sequence[dict[str, Any]], model: str | None = None) -> str | None:
     """
     Versucht zuerst neues OpenAI-SDK (>=1.x), dann altes (<1.x).
     Unterstützt OPENAI_BASE_URL (z.B. Azure, LM Studio, Ollama Gateway).
@@ -76,6 +110,10 @@ class Memory(Protocol):
 class Impl(Protocol):
     def run(self, prompt: str) -> str: ...
 
+class AsyncImpl(Protocol):
+    """Optional: Impls mit `arun` werden von `arun_ticket` ohne Worker-Thread genutzt."""
+    async def arun(self, prompt: str) -> str: ...
+
 class Spoke(Protocol):
     role: str
     score: int
@@ -84,11 +122,41 @@ class Spoke(Protocol):
     def release(self) -> None: ...
 
 class Router(Protocol):
-    def candidates(self, role: str, tags: Set[str]) -> List[Spoke]: ...
+    def candidates(self, role: str, tags: Set[str]) -> Sequence[Spoke]: ...
 
 @dataclass
 class HubPolicy:
     persist_workcell: str = "graph"
+    coder_fanout: int = 1  # >1: Implement-Prompt parallel an Top-N Coder, erstes OK gewinnt
+    spoke_wait: float = 5.0            # Sekunden warten, wenn alle Kandidaten ausgelastet sind
+    spoke_fallback: str = "overcommit"  # danach: "overcommit" (besten trotzdem nehmen) | "none"
+    spoke_score_band: int = 0          # Score-Abstand, innerhalb dessen Spokes als gleichwertig gelten
+
+_REVIEW_OK_RE = re.compile(r"^\W*(urteil\W*)?ok\b", re.IGNORECASE)
+
+def _review_ok(review: Optional[str]) -> bool:
+    """Grobe Auswertung des Critic-Urteils (Template: "OK/Änderungen nötig")."""
+    t = (review or "").strip()
+    if not t or "änderungen nötig" in t.lower():
+        return False
+    return bool(_REVIEW_OK_RE.match(t))
+
+def _candidate_outcome(
+    fut: Any, idx: int, spoke: Spoke, t0: float, decided: bool
+) -> Tuple[Dict[str, Any], Optional[Tuple[str, str]], bool]:
+    """Fertiger Fan-out-Kandidat (Thread- oder asyncio-Future) → Event-Payload, (impl, review), OK."""
+    info: Dict[str, Any] = {"index": idx, "score": getattr(spoke, "score", 0)}
+    exc = fut.exception()
+    if exc is not None:
+        info.update(status="error", error=str(exc), total_s=round(time.perf_counter() - t0, 4))
+        return info, None, False
+    impl, review, t_impl = fut.result()
+    ok = _review_ok(review)
+    info.update(
+        status="accepted" if ok and not decided else ("ok" if ok else "rejected"),
+        impl_s=round(t_impl, 4), total_s=round(time.perf_counter() - t0, 4),
+    )
+    return info, (impl, review), ok
 
 class TicketStatus(str, Enum):
     pending = "pending"
@@ -104,10 +172,12 @@ class Ticket:
     constraints: List[str]
     workcell_space_id: Optional[str] = None
     status: TicketStatus = TicketStatus.pending
+    plan: Optional[str] = None  # vorab erzeugter Plan (z. B. gebündelte Batch-Planung) → Planner entfällt
 
 @dataclass
 class OrchestrationRun:
     run_id: str
+    cancel: Optional[CancelToken] = None  # Abbruch/Deadline (siehe orchestration/cancel.py)
 
 
 class HubChatFacade:
@@ -116,7 +186,7 @@ class HubChatFacade:
     - Persistiert den User-Prompt im ZEP-Thread
     - Ruft direkt ein LLM mit ZEP-Kontext (KEINE Orchestrierung!)
     - Persistiert die Assistant-Antwort im ZEP-Thread
-    - Liefert {reply, steps} ähnlich core2 zurück
+    - Liefert {reply, steps, context} ähnlich core2 zurück (context: genutzte/verworfene Quellen)
     """
     def __init__(self, hub, zep_facade, user_id: str, thread_id: str):
         self.hub = hub
@@ -124,11 +194,20 @@ class HubChatFacade:
         self.user_id = user_id
         self.thread_id = thread_id
 
-    async def _build_messages(self, prompt: str) -> list[dict[str, Any]]:
+    async def _build_messages(self, prompt: str) -> tuple[list[dict[str, Any]], dict[str, Any]]:
+        """
+        Prompt-Nachrichten + Kontext-Report ({sources, dropped}) dieses Requests.
+        Der Report wird zurückgegeben statt auf der (geteilten) Fassade abgelegt.
+        """
         msgs: list[dict[str, Any]] = []
         ctx = None
+        report: dict[str, Any] = {"sources": [], "dropped": []}
         try:
-            if hasattr(self.zep, "build_context_block"):
+            if hasattr(self.zep, "build_context"):
+                res = await self.zep.build_context(include_recent=True, recent_limit=8)  # type: ignore
+                ctx = res.get("block")
+                report = {"sources": res.get("sources", []), "dropped": res.get("dropped", [])}
+            elif hasattr(self.zep, "build_context_block"):
                 ctx = await self.zep.build_context_block(include_recent=True, recent_limit=8)  # type: ignore
         except Exception:
             ctx = None
@@ -136,23 +215,61 @@ class HubChatFacade:
         if ctx:
             msgs.append({"role": "system", "content": f"Nutze folgenden kompakten Kontext:\n{ctx}"})
         msgs.append({"role": "user", "content": prompt})
-        return msgs
+        return msgs, report
 
+    async def _llm(self, messages: list[dict[str, Any]]) -> str | None:
+        """Geteilter Async-Client vom Hub; ohne Client blockiert der Legacy-Pfad nur einen Worker-Thread."""
+        llm = getattr(self.hub, "llm", None)
+        if llm is not None:
+            return await llm.chat(messages)
+        return await asyncio.to_thread(_llm_chat, messages)
+
+    def _cache_lookup(self, prompt: str, messages: list[dict[str, Any]]) -> tuple[Optional[str], Optional[dict]]:
+        """
+        Reply-Cache (opt-in, hub.reply_cache): Fingerprint über den Kontext-Block des Requests
+        (User-Kontext + letzte Nachrichten) → neue Turns machen alte Antworten ungültig.
+        Rückgabe (ctx_fp, hit|None).
+        """
+        cache = getattr(self.hub, "reply_cache", None)
+        if cache is None:
+            return None, None
+        try:
+            ctx = "\n".join(str(m.get("content") or "") for m in messages if m.get("role") == "system")
+            ctx_fp = fingerprint(ctx)
+            return ctx_fp, cache.lookup(self.thread_id, prompt, ctx_fp)
+        except Exception:
+            return None, None
+
+    def _cache_store(self, prompt: str, ctx_fp: Optional[str], reply: str) -> None:
+        cache = getattr(self.hub, "reply_cache", None)
+        if cache is not None and ctx_fp is not None:
+            try:
+                cache.store(self.thread_id, prompt, ctx_fp, reply, [["assistant", reply]])
+            except Exception:
+                pass
 
     async def converse(self, prompt: str) -> dict:
         # 1) User-Message speichern (best effort)
         try:
-            await self.zep.add_user_message(prompt)  # type: ignore
+            with timed("persist_user"):
+                await self.zep.add_user_message(prompt)  # type: ignore
         except Exception:
             pass
 
-        # 2) Direktes LLM mit ZEP-Kontext (kein hub.run_ticket!)
+        # 2) Direktes LLM mit ZEP-Kontext (kein hub.run_ticket!) – oder Cache-Treffer
         reply: str | None = None
-        try:
-            messages = await self._build_messages(prompt)
-            reply = _llm_chat(messages)
-        except Exception:
-            reply = None
+        messages, report = await self._build_messages(prompt)
+        ctx_fp, hit = self._cache_lookup(prompt, messages)
+        if hit:
+            reply = hit["reply"]
+            report = {"sources": [], "dropped": []}   # Antwort stammt nicht aus diesem Kontext
+        else:
+            try:
+                reply = await self._llm(messages)
+            except Exception:
+                reply = None
+            if reply:
+                self._cache_store(prompt, ctx_fp, reply)
 
         # Fallback – wenn kein LLM verfügbar ist
         if not reply:
@@ -160,13 +277,68 @@ class HubChatFacade:
 
         # 3) Assistant-Message spiegeln (best effort)
         try:
-            await self.zep.add_assistant_message(reply)  # type: ignore
+            with timed("persist_assistant"):
+                await self.zep.add_assistant_message(reply)  # type: ignore
         except Exception:
             pass
 
         # 4) core2-ähnliches Format
         steps = [["assistant", reply]]
-        return {"reply": reply, "steps": steps}
+        out = {"reply": reply, "steps": steps, "context": report}
+        if hit:
+            out["cached"] = {"similarity": hit.get("similarity")}
+        return out
+
+    async def converse_stream(self, prompt: str, context: Optional[dict[str, Any]] = None) -> AsyncIterator[str]:
+        """
+        Wie `converse`, aber liefert Tokens, sobald das Modell sie erzeugt.
+        Die vollständige Antwort wird nach Stream-Ende im ZEP-Thread gespeichert.
+        `context` (optional, Out-Dict) erhält den Kontext-Report dieses Requests.
+        """
+        try:
+            with timed("persist_user"):
+                await self.zep.add_user_message(prompt)  # type: ignore
+        except Exception:
+            pass
+
+        parts: list[str] = []
+        llm = getattr(self.hub, "llm", None)
+        ctx_fp: Optional[str] = None
+        hit: Optional[dict] = None
+        try:
+            messages, report = await self._build_messages(prompt)
+            ctx_fp, hit = self._cache_lookup(prompt, messages)
+            if hit:
+                # Cache-Treffer: sofort komplett ausliefern (Kontext-Report bleibt leer)
+                parts.append(hit["reply"])
+                yield hit["reply"]
+            else:
+                if context is not None:
+                    context.update(report)
+                if llm is not None and hasattr(llm, "stream"):
+                    async for tok in llm.stream(messages):
+                        parts.append(tok)
+                        yield tok
+                else:
+                    full = await self._llm(messages)
+                    if full:
+                        parts.append(full)
+                        yield full
+        except Exception:
+            pass
+
+        reply = "".join(parts).strip()
+        if not reply:
+            reply = f"Ich habe dich gehört: „{prompt}“ (LLM nicht verfügbar)."
+            yield reply
+        elif not hit:
+            self._cache_store(prompt, ctx_fp, reply)
+
+        try:
+            with timed("persist_assistant"):
+                await self.zep.add_assistant_message(reply)  # type: ignore
+        except Exception:
+            pass
 
 
     
@@ -174,11 +346,21 @@ class HubChatFacade:
 class CaptainHub:
     """CaptainHub mit DRY-Prompts & Schritt-I/O via WorkcellIO."""
 
-    def __init__(self, *, router: Router, memory: Memory, policy: Optional[HubPolicy] = None) -> None:
+    def __init__(
+        self,
+        *,
+        router: Router,
+        memory: Memory,
+        policy: Optional[HubPolicy] = None,
+        llm: Optional[Any] = None,
+        reply_cache: Optional[Any] = None,
+    ) -> None:
         self.router = router
         self.memory = memory
         self.policy = policy or HubPolicy()
         self.io = WorkcellIO(memory)
+        self.llm = llm  # geteilter AsyncLLMClient (siehe backend/llm_client.py)
+        self.reply_cache = reply_cache  # optionaler ReplyCache (siehe backend/reply_cache.py)
 
     def build_chat_facade(self, *, zep_facade, user_id: str, thread_id: str) -> HubChatFacade:
         facade = HubChatFacade(self, zep_facade, user_id, thread_id)
@@ -210,7 +392,8 @@ class CaptainHub:
 
     # -- Auswahl & Tags ---------------------------------------------------------
     def _match_spokes(self, role: str, tags: Set[str]) -> List[Tuple[int, Spoke]]:
-        cands = self.router.candidates(role, tags) or []
+        # Lookup-Cache liegt im Router (RealRouter); vorsortierte Listen sortiert Timsort in O(n)
+        cands = self.router.candidates(role, tags) or ()
         return sorted(((getattr(s, "score", 0), s) for s in cands), key=lambda t: t[0], reverse=True)
 
     def _compute_tags(self, ticket: Ticket) -> Set[str]:
@@ -233,13 +416,171 @@ class CaptainHub:
     def _choose_critic(self, tags: Set[str]) -> Optional[Spoke]:
         r = self._match_spokes("critic", tags);   return r[0][1] if r else None
 
+    # -- Slots -----------------------------------------------------------------
+    def _slot_pool(self, role: str, tags: Set[str]) -> List[Spoke]:
+        """Kandidaten für einen Slot: bevorzugter Spoke (`_choose_*`, überschreibbar) + Rollenliste."""
+        chooser = {"planner": self._choose_planner, "coder": self._choose_coder, "critic": self._choose_critic}[role]
+        preferred = chooser(tags)
+        if preferred is None:
+            return []
+        pool = [sp for _, sp in self._match_spokes(role, tags)]
+        if preferred not in pool:
+            pool.insert(0, preferred)
+        return pool
+
+    def _try_take(self, spoke: Spoke) -> bool:
+        sl = spoke_slots(spoke)
+        if sl is None:
+            spoke.acquire()  # Legacy-Spoke ohne Slots: unbegrenzt
+            return True
+        return sl.try_acquire()
+
+    def _take_best(self, pool: List[Spoke]) -> Optional[Spoke]:
+        """Bester Score mit freiem Slot; unter Gleichwertigen der am wenigsten ausgelastete."""
+        free = [sp for sp in pool if (sl := spoke_slots(sp)) is None or sl.free > 0]
+        if not free:
+            return None
+        top = max(getattr(sp, "score", 0) for sp in free)
+        band = [sp for sp in free if getattr(sp, "score", 0) >= top - self.policy.spoke_score_band]
+        band.sort(key=lambda sp: (getattr(spoke_slots(sp), "load", 0.0), -getattr(sp, "score", 0)))
+        for sp in band:
+            if self._try_take(sp):
+                return sp
+        return None
+
+    def _fallback_take(self, role: str, pool: List[Spoke]) -> Optional[Spoke]:
+        if self.policy.spoke_fallback != "overcommit":
+            logger.warning("Alle {}-Spokes ausgelastet – Rolle bleibt unbesetzt", role)
+            return None
+        sp = pool[0]
+        sl = spoke_slots(sp)
+        if sl is not None:
+            sl.force_acquire()
+        else:
+            sp.acquire()
+        return sp
+
+    def _take_extra(self, role: str, tags: Set[str], n: int, *, exclude: Optional[Spoke] = None) -> List[Spoke]:
+        """Bis zu `n` weitere Slots der Rolle, nur wenn sofort frei (kein Warten, kein Overcommit)."""
+        extra: List[Spoke] = []
+        for _, sp in self._match_spokes(role, tags):
+            if len(extra) >= n:
+                break
+            if sp is not exclude and self._try_take(sp):
+                extra.append(sp)
+        return extra
+
+    @staticmethod
+    def _pool_slots(pool: List[Spoke]) -> List[SpokeSlots]:
+        return [sl for sp in pool if (sl := spoke_slots(sp)) is not None]
+
+    def _acquire_role(self, role: str, tags: Set[str]) -> Optional[Spoke]:
+        pool = self._slot_pool(role, tags)
+        if not pool:
+            return None
+        deadline = time.monotonic() + self.policy.spoke_wait
+        # bei release() eines Pool-Spokes wecken; kurzes Maximum, damit Abbruch im Thread greift
+        freed = threading.Event()
+        slots = self._pool_slots(pool)
+        for sl in slots:
+            sl.subscribe(freed.set)
+        try:
+            while True:
+                freed.clear()
+                sp = self._take_best(pool)
+                if sp is not None:
+                    return sp
+                rest = deadline - time.monotonic()
+                if rest <= 0:
+                    return self._fallback_take(role, pool)
+                check_cancelled()
+                freed.wait(min(rest, 0.25))
+        finally:
+            for sl in slots:
+                sl.unsubscribe(freed.set)
+
+    async def _aacquire_role(self, role: str, tags: Set[str]) -> Optional[Spoke]:
+        pool = self._slot_pool(role, tags)
+        if not pool:
+            return None
+        deadline = time.monotonic() + self.policy.spoke_wait
+        # release() kann aus Worker-Threads kommen → Event über den Loop setzen
+        loop = asyncio.get_running_loop()
+        freed = asyncio.Event()
+
+        def _wake() -> None:
+            try:
+                loop.call_soon_threadsafe(freed.set)
+            except RuntimeError:
+                pass  # Loop bereits geschlossen
+
+        slots = self._pool_slots(pool)
+        for sl in slots:
+            sl.subscribe(_wake)
+        try:
+            while True:
+                freed.clear()
+                sp = self._take_best(pool)
+                if sp is not None:
+                    return sp
+                rest = deadline - time.monotonic()
+                if rest <= 0:
+                    return self._fallback_take(role, pool)
+                check_cancelled()
+                try:
+                    await asyncio.wait_for(freed.wait(), timeout=min(rest, 0.25))
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            for sl in slots:
+                sl.unsubscribe(_wake)
+
+    def slot_stats(self) -> List[Dict[str, Any]]:
+        """Slot-Belegung aller registrierten Spokes (für /api/orch/_diag)."""
+        all_fn = getattr(self.router, "all_spokes", None)
+        if not callable(all_fn):
+            return []
+        out: List[Dict[str, Any]] = []
+        for role, sp in all_fn():
+            sl = spoke_slots(sp)
+            out.append({
+                "role": role,
+                "spoke": type(sp).__name__,
+                "score": getattr(sp, "score", 0),
+                **(sl.stats() if sl is not None else {"capacity": None, "in_use": None}),
+            })
+        return out
+
     # -- Workcell mgmt via WorkcellIO ------------------------------------------
+    @staticmethod
+    def _roles(ticket: Ticket) -> Tuple[str, ...]:
+        # vorab geplante Tickets (gebündelte Batch-Planung) brauchen keinen Planner-Slot
+        return ("coder", "critic") if ticket.plan else ("planner", "coder", "critic")
+
     def allocate_workcell(self, ticket: Ticket) -> Dict[str, Spoke]:
         tags = self._compute_tags(ticket)
         chosen: Dict[str, Spoke] = {}
-        if (pl := self._choose_planner(tags)): pl.acquire(); chosen["planner"] = pl
-        if (cd := self._choose_coder(tags)):   cd.acquire(); chosen["coder"] = cd
-        if (cr := self._choose_critic(tags)):  cr.acquire(); chosen["critic"] = cr
+        try:
+            for role in self._roles(ticket):
+                if (sp := self._acquire_role(role, tags)):
+                    chosen[role] = sp
+        except BaseException:
+            # z. B. RunCancelled während des Wartens auf Slots
+            self._release_workcell(chosen)
+            raise
+        return chosen
+
+    async def aallocate_workcell(self, ticket: Ticket) -> Dict[str, Spoke]:
+        """Wie `allocate_workcell`, wartet auf freie Slots aber ohne den Event-Loop zu blockieren."""
+        tags = self._compute_tags(ticket)
+        chosen: Dict[str, Spoke] = {}
+        try:
+            for role in self._roles(ticket):
+                if (sp := await self._aacquire_role(role, tags)):
+                    chosen[role] = sp
+        except BaseException:
+            self._release_workcell(chosen)
+            raise
         return chosen
 
     def _release_workcell(self, chosen: Dict[str, Spoke]) -> None:
@@ -249,8 +590,14 @@ class CaptainHub:
 
     # -- Pipeline ---------------------------------------------------------------
     def run_ticket(self, *, run: OrchestrationRun, ticket: Ticket) -> Dict[str, Any]:
+        # Token auch im Kontext: `Impl.run` → `chat_sync` sieht Abbruch/Deadline ohne Extra-Parameter
+        with use_token(run.cancel):
+            return self._run_ticket(run=run, ticket=ticket)
+
+    def _run_ticket(self, *, run: OrchestrationRun, ticket: Ticket) -> Dict[str, Any]:
         tags = self._compute_tags(ticket)
         chosen = self.allocate_workcell(ticket)
+        wc: Optional[str] = None
         try:
             opened = self.io.open(ticket_id=ticket.ticket_id, workcell_space_id=ticket.workcell_space_id)
             wc, st = opened.workcell_sid, opened.st_ids
@@ -274,17 +621,26 @@ class CaptainHub:
 
 
             # Planner
+            check_cancelled(run.cancel)
             planner = chosen.get("planner")
             plan_prompt = render_planner(ticket.goal, ticket.deliverables, ticket.constraints)
-            if planner:
+            if ticket.plan:
+                plan = ticket.plan
+            elif planner:
                 plan = planner.impl.run(plan_prompt)
             else:
                 plan = f"(No planner) Plan aus Ziel:\n{ticket.goal}"
             self.io.step_out(workcell_sid=wc, st_ids=st, role="planner", content=plan, prompt=plan_prompt)
 
             # Coder (Template)
+            check_cancelled(run.cancel)
             coder = chosen.get("coder")
             critic = chosen.get("critic")
+            if coder and self.policy.coder_fanout > 1:
+                # Fan-out übernimmt Coder-/Critic-Slot: Threads sind nicht abbrechbar, Freigabe
+                # erst wenn der jeweilige Thread fertig ist (siehe `_coder_fanout`)
+                chosen.pop("coder")
+                chosen.pop("critic", None)
             impl, review = self.coder_step(
                 run=run, ticket=ticket, plan=plan, coder=coder, critic=critic,
                 workcell_space_id=wc, st_ids=st
@@ -293,6 +649,15 @@ class CaptainHub:
             # Close
             self.io.close(workcell_sid=wc, review=review, impl_ok=bool(impl), do_gc=True)
             return {"plan": plan, "impl": impl, "review": review, "workcell_space_id": wc}
+        except RunCancelled as e:
+            if wc:
+                self.io.cancel(workcell_sid=wc, reason=e.reason)
+            raise
+        except Exception as e:
+            # Impl/I/O-Fehler: Workcell als failed markieren und freigeben, nicht liegen lassen
+            if wc:
+                self.io.fail(workcell_sid=wc, error=str(e) or type(e).__name__)
+            raise
         finally:
             self._release_workcell(chosen)
 
@@ -308,6 +673,18 @@ class CaptainHub:
         workcell_space_id: str,
         st_ids: Dict[str, str],
     ) -> Tuple[str, str]:
+        # Best-of-N: Review passiert bereits pro Kandidat
+        if coder and self.policy.coder_fanout > 1:
+            impl_prompt = render_implement(plan, ticket.deliverables, ticket.constraints)
+            impl, review = self._coder_fanout(
+                ticket=ticket, coder=coder, critic=critic, impl_prompt=impl_prompt, workcell_space_id=workcell_space_id
+            )
+            self.io.step_out(workcell_sid=workcell_space_id, st_ids=st_ids, role="coder", content=impl, prompt=impl_prompt)
+            if critic:
+                self.io.step_out(workcell_sid=workcell_space_id, st_ids=st_ids, role="critic", content=review,
+                                 prompt=self._critic_prompt(ticket, impl))
+            return impl, review
+
         # Implement
         if not coder:
             impl = f"(No coder) Nutze Plan:\n{plan}"
@@ -318,11 +695,334 @@ class CaptainHub:
         self.io.step_out(workcell_sid=workcell_space_id, st_ids=st_ids, role="coder", content=impl, prompt=impl_prompt)
 
         # Review
+        check_cancelled(run.cancel)
         if critic:
-            review_prompt = render_review(ticket.deliverables, ticket.constraints)
+            review_prompt = self._critic_prompt(ticket, impl)
             review = critic.impl.run(review_prompt)
             self.io.step_out(workcell_sid=workcell_space_id, st_ids=st_ids, role="critic", content=review, prompt=review_prompt)
         else:
             review = "OK"
 
         return impl, review
+
+    @staticmethod
+    def _critic_prompt(ticket: Ticket, impl: str) -> str:
+        """Critic-Eingabe (Review-Template + zu prüfendes Ergebnis), für alle Pfade gleich."""
+        return f"{render_review(ticket.deliverables, ticket.constraints)}\n\nErgebnis:\n{impl}"
+
+    def _coder_fanout(
+        self,
+        *,
+        ticket: Ticket,
+        coder: Spoke,
+        critic: Optional[Spoke],
+        impl_prompt: str,
+        workcell_space_id: str,
+    ) -> Tuple[str, str]:
+        """
+        Sync-Variante von `_acoder_fanout` (Kandidaten in Worker-Threads). Threads lassen sich
+        nicht abbrechen: Verlierer laufen im Hintergrund zu Ende, starten aber kein Review mehr.
+        Übernimmt die Slots von `coder`/`critic`: ein Coder-Slot wird frei, sobald sein Thread
+        fertig ist, ein Critic-Slot, sobald er nach der Entscheidung zurückgegeben wird – die
+        Rückgabe des Ergebnisses wartet auf keinen Verlierer.
+        """
+        owned: List[Spoke] = [coder] + ([critic] if critic else [])
+        try:
+            tags = self._compute_tags(ticket)
+            extra = self._take_extra("coder", tags, self.policy.coder_fanout - 1, exclude=coder)
+            # je Zusatz-Kandidat ein weiterer Critic-Slot, sofern frei; sonst teilen sie sich die vorhandenen
+            extra_critics = self._take_extra("critic", tags, len(extra)) if critic else []
+        except BaseException:
+            self._release_workcell({f"owned{i}": sp for i, sp in enumerate(owned)})
+            raise
+        cands: List[Spoke] = [coder] + extra
+        reviewers: "queue.Queue[Spoke]" = queue.Queue()
+        for rv in ([critic] if critic else []) + extra_critics:
+            reviewers.put(rv)
+        decided = threading.Event()
+        give_back = threading.Lock()
+        t0 = time.perf_counter()
+
+        def _return_reviewer(rv: Spoke) -> None:
+            # vor der Entscheidung zurück in den Pool, danach Slot direkt freigeben
+            with give_back:
+                if not decided.is_set():
+                    reviewers.put(rv)
+                    return
+            self._release_workcell({"critic": rv})
+
+        def _one(spoke: Spoke) -> Tuple[str, str, float]:
+            with cache_skip():   # Kandidaten sollen sich unterscheiden, kein geteilter Cache-Treffer
+                impl = spoke.impl.run(impl_prompt)
+            t_impl = time.perf_counter() - t0
+            if not impl:
+                return impl, "Änderungen nötig: leeres Ergebnis", t_impl
+            if critic is None:
+                return impl, "OK", t_impl
+            while True:
+                if decided.is_set():
+                    raise RunCancelled("fanout decided")
+                try:
+                    rv = reviewers.get(timeout=0.05)
+                    break
+                except queue.Empty:
+                    continue
+            try:
+                if decided.is_set():
+                    raise RunCancelled("fanout decided")
+                return impl, rv.impl.run(self._critic_prompt(ticket, impl)), t_impl
+            finally:
+                _return_reviewer(rv)
+
+        pool = ThreadPoolExecutor(max_workers=len(cands), thread_name_prefix="coder-fanout")
+        futs: Dict[Any, int] = {}
+        for i, sp in enumerate(cands):
+            # eigener Kontext je Thread: Cancel-Token + Cache-Bypass wandern mit
+            fut = pool.submit(contextvars.copy_context().run, _one, sp)
+            # Coder-Slot (auch der übernommene) erst mit Ende des Threads freigeben
+            fut.add_done_callback(lambda _f, sp=sp: self._release_workcell({"coder": sp}))
+            futs[fut] = i
+        first: Optional[Tuple[str, str]] = None
+        winner: Optional[Tuple[str, str]] = None
+        pending = set(futs)
+        try:
+            while pending and winner is None:
+                done, pending = wait_futures(pending, timeout=0.2, return_when=FIRST_COMPLETED)
+                for f in done:
+                    info, res, ok = _candidate_outcome(f, futs[f], cands[futs[f]], t0, winner is not None)
+                    if res is not None and first is None:
+                        first = res
+                    if ok and winner is None:
+                        winner = res
+                    self.io.emit(workcell_sid=workcell_space_id, type="coder_candidate", payload=info)
+                check_cancelled()
+        finally:
+            with give_back:
+                decided.set()
+            # freie Critic-Slots sofort zurück; laufende Reviews geben ihren Slot selbst frei
+            idle: List[Spoke] = []
+            while True:
+                try:
+                    idle.append(reviewers.get_nowait())
+                except queue.Empty:
+                    break
+            self._release_workcell({f"critic{i}": sp for i, sp in enumerate(idle)})
+            pool.shutdown(wait=False, cancel_futures=True)
+            for f in pending:
+                self.io.emit(
+                    workcell_sid=workcell_space_id, type="coder_candidate",
+                    payload={"index": futs[f], "status": "cancelled", "total_s": round(time.perf_counter() - t0, 4)},
+                )
+        # Kein OK → schnellstes Ergebnis (inkl. Urteil) übernehmen
+        impl, review = winner or first or ("(No coder) Implement fehlgeschlagen", "Änderungen nötig")
+        return impl, review
+
+    # -- Async-Pipeline ---------------------------------------------------------
+    async def _impl_run(self, spoke: Spoke, prompt: str) -> str:
+        """`impl.arun` wenn vorhanden, sonst sync `impl.run` in einem Worker-Thread."""
+        impl = spoke.impl
+        arun = getattr(impl, "arun", None)
+        if arun is not None and inspect.iscoroutinefunction(arun):
+            return await arun(prompt)
+        return await asyncio.to_thread(impl.run, prompt)
+
+    async def arun_ticket(self, *, run: OrchestrationRun, ticket: Ticket) -> Dict[str, Any]:
+        """Async-Variante von `run_ticket`: wartet auf I/O, ohne einen Threadpool-Worker zu belegen."""
+        with use_token(run.cancel):
+            return await self._arun_ticket(run=run, ticket=ticket)
+
+    async def _arun_ticket(self, *, run: OrchestrationRun, ticket: Ticket) -> Dict[str, Any]:
+        chosen = await self.aallocate_workcell(ticket)
+        wc: Optional[str] = None
+        try:
+            opened = await self.io.aopen(ticket_id=ticket.ticket_id, workcell_space_id=ticket.workcell_space_id)
+            wc, st = opened.workcell_sid, opened.st_ids
+            await self.io.astart(workcell_sid=wc, payload={"run_id": run.run_id, "ticket_id": ticket.ticket_id})
+
+            # Fallback: wenn keine Spokes ausgewählt wurden (Registry leer)
+            if not chosen:
+                plan = f"(Fallback) Plan aus Ziel:\n{ticket.goal}"
+                await self.io.astep_out(workcell_sid=wc, st_ids=st, role="planner", content=plan, prompt=None)
+
+                impl: Optional[str] = None
+                if not getattr(self, "_in_chat_facade", False) and callable(getattr(self, "chat_reply_sync", None)):
+                    impl = await asyncio.to_thread(self._try_chat_reply, ticket.goal)
+                impl = impl or f"(No coder) Nutze Plan:\n{plan}"
+
+                await self.io.astep_out(workcell_sid=wc, st_ids=st, role="coder", content=impl, prompt=None)
+                review = "OK"
+                await self.io.aclose(workcell_sid=wc, review=review, impl_ok=True, do_gc=True)
+                return {"plan": plan, "impl": impl, "review": review, "workcell_space_id": wc}
+
+            # Planner
+            check_cancelled(run.cancel)
+            planner = chosen.get("planner")
+            plan_prompt = render_planner(ticket.goal, ticket.deliverables, ticket.constraints)
+            if ticket.plan:
+                plan = ticket.plan
+            elif planner:
+                plan = await self._impl_run(planner, plan_prompt)
+            else:
+                plan = f"(No planner) Plan aus Ziel:\n{ticket.goal}"
+            await self.io.astep_out(workcell_sid=wc, st_ids=st, role="planner", content=plan, prompt=plan_prompt)
+
+            # Coder (Template)
+            check_cancelled(run.cancel)
+            impl, review = await self.acoder_step(
+                run=run, ticket=ticket, plan=plan, coder=chosen.get("coder"), critic=chosen.get("critic"),
+                workcell_space_id=wc, st_ids=st
+            )
+
+            # Close
+            await self.io.aclose(workcell_sid=wc, review=review, impl_ok=bool(impl), do_gc=True)
+            return {"plan": plan, "impl": impl, "review": review, "workcell_space_id": wc}
+        except (RunCancelled, asyncio.CancelledError) as e:
+            # Task-Abbruch (Token, Deadline, Client-Disconnect): Spaces sofort freigeben
+            if wc:
+                reason = e.reason if isinstance(e, RunCancelled) else ((run.cancel and run.cancel.reason) or "cancelled")
+                await self.io.acancel(workcell_sid=wc, reason=reason)
+            raise
+        except Exception as e:
+            if wc:
+                await self.io.afail(workcell_sid=wc, error=str(e) or type(e).__name__)
+            raise
+        finally:
+            self._release_workcell(chosen)
+
+    async def aplan_packed(self, tickets: List[Ticket]) -> List[Optional[str]]:
+        """
+        Planner-Prompts mehrerer Tickets in einem Request bündeln (ein Planner-Slot, ein LLM-Call)
+        und die Pläne pro Ticket zurückgeben; None, wo die Antwort keinen Abschnitt liefert.
+        """
+        if not tickets:
+            return []
+        tags: Set[str] = set()
+        for t in tickets:
+            tags |= self._compute_tags(t)
+        planner = await self._aacquire_role("planner", tags)
+        if planner is None:
+            return [None] * len(tickets)
+        try:
+            prompts = [render_planner(t.goal, t.deliverables, t.constraints) for t in tickets]
+            text = await self._impl_run(planner, pack_planner_prompts(prompts))
+            return split_packed_plans(text, len(tickets))
+        except Exception as e:
+            logger.warning("Gebündelte Planung fehlgeschlagen: {}", e)
+            return [None] * len(tickets)
+        finally:
+            self._release_workcell({"planner": planner})
+
+    async def acoder_step(
+        self,
+        *,
+        run: OrchestrationRun,
+        ticket: Ticket,
+        plan: str,
+        coder: Optional[Spoke],
+        critic: Optional[Spoke],
+        workcell_space_id: str,
+        st_ids: Dict[str, str],
+    ) -> Tuple[str, str]:
+        # Best-of-N: Review passiert bereits pro Kandidat
+        if coder and self.policy.coder_fanout > 1:
+            impl_prompt = render_implement(plan, ticket.deliverables, ticket.constraints)
+            impl, review = await self._acoder_fanout(
+                ticket=ticket, coder=coder, critic=critic, impl_prompt=impl_prompt, workcell_space_id=workcell_space_id
+            )
+            await self.io.astep_out(workcell_sid=workcell_space_id, st_ids=st_ids, role="coder", content=impl, prompt=impl_prompt)
+            if critic:
+                await self.io.astep_out(workcell_sid=workcell_space_id, st_ids=st_ids, role="critic", content=review,
+                                        prompt=self._critic_prompt(ticket, impl))
+            return impl, review
+
+        # Implement
+        if not coder:
+            impl = f"(No coder) Nutze Plan:\n{plan}"
+            impl_prompt = None
+        else:
+            impl_prompt = render_implement(plan, ticket.deliverables, ticket.constraints)
+            impl = await self._impl_run(coder, impl_prompt)
+        await self.io.astep_out(workcell_sid=workcell_space_id, st_ids=st_ids, role="coder", content=impl, prompt=impl_prompt)
+
+        # Review
+        check_cancelled(run.cancel)
+        if critic:
+            review_prompt = self._critic_prompt(ticket, impl)
+            review = await self._impl_run(critic, review_prompt)
+            await self.io.astep_out(workcell_sid=workcell_space_id, st_ids=st_ids, role="critic", content=review, prompt=review_prompt)
+        else:
+            review = "OK"
+
+        return impl, review
+
+    async def _acoder_fanout(
+        self,
+        *,
+        ticket: Ticket,
+        coder: Spoke,
+        critic: Optional[Spoke],
+        impl_prompt: str,
+        workcell_space_id: str,
+    ) -> Tuple[str, str]:
+        """
+        Implement-Prompt parallel an `coder` + die nächstbesten Coder aus `_match_spokes`.
+        Erstes Ergebnis mit OK-Urteil (Critic bzw. nicht-leer ohne Critic) gewinnt, der Rest
+        wird abgebrochen. Zusatz-Coder laufen nur mit freiem Slot und geben ihn danach frei.
+        Reviews laufen über die gehaltenen Critic-Slots (je Zusatz-Coder ein weiterer, falls frei).
+        Pro Kandidat landet ein `coder_candidate`-Event (Dauer, Urteil) in der Workcell.
+        """
+        # `coder`/`critic` halten bereits einen Slot aus allocate_workcell
+        tags = self._compute_tags(ticket)
+        extra = self._take_extra("coder", tags, self.policy.coder_fanout - 1, exclude=coder)
+        cands: List[Spoke] = [coder] + extra
+        extra_critics = self._take_extra("critic", tags, len(extra)) if critic else []
+        reviewers: "asyncio.Queue[Spoke]" = asyncio.Queue()
+        for rv in ([critic] if critic else []) + extra_critics:
+            reviewers.put_nowait(rv)
+        t0 = time.perf_counter()
+
+        async def _one(spoke: Spoke) -> Tuple[str, str, float]:
+            with cache_skip():   # Kandidaten sollen sich unterscheiden, kein geteilter Cache-Treffer
+                impl = await self._impl_run(spoke, impl_prompt)
+            t_impl = time.perf_counter() - t0
+            if not impl:
+                return impl, "Änderungen nötig: leeres Ergebnis", t_impl
+            if critic is None:
+                return impl, "OK", t_impl
+            rv = await reviewers.get()
+            try:
+                return impl, await self._impl_run(rv, self._critic_prompt(ticket, impl)), t_impl
+            finally:
+                reviewers.put_nowait(rv)
+
+        tasks: Dict["asyncio.Future[Tuple[str, str, float]]", int] = {
+            asyncio.ensure_future(_one(s)): i for i, s in enumerate(cands)
+        }
+        first: Optional[Tuple[str, str]] = None
+        winner: Optional[Tuple[str, str]] = None
+        pending = set(tasks)
+        try:
+            while pending and winner is None:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for t in done:
+                    info, res, ok = _candidate_outcome(t, tasks[t], cands[tasks[t]], t0, winner is not None)
+                    if res is not None and first is None:
+                        first = res
+                    if ok and winner is None:
+                        winner = res
+                    await self.io.aemit(workcell_sid=workcell_space_id, type="coder_candidate", payload=info)
+        finally:
+            for t in pending:
+                t.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+            # Slots freigeben – auch für Tasks, die vor ihrem Start abgebrochen wurden
+            self._release_workcell({f"extra{i}": sp for i, sp in enumerate(extra + extra_critics)})
+            for t in pending:
+                await self.io.aemit(
+                    workcell_sid=workcell_space_id, type="coder_candidate",
+                    payload={"index": tasks[t], "status": "cancelled", "total_s": round(time.perf_counter() - t0, 4)},
+                )
+        # Kein OK → schnellstes Ergebnis (inkl. Urteil) übernehmen
+        impl, review = winner or first or ("(No coder) Implement fehlgeschlagen", "Änderungen nötig")
+        return impl, review
@@ -1,6 +1,8 @@
 
 from __future__ import annotations
-from dataclasses import dataclass
+import asyncio
+import inspect
+from dataclasses import dataclass, field
 from typing import Any, Dict, Optional, Protocol, Set, Tuple
 
 """
@@ -9,6 +11,17 @@ Kein doppeltes run_ticket, keine duplizierten Events/Spaces/GC.
 """
 
 from .captain_hub import CaptainHub, OrchestrationRun, Ticket, Spoke, Memory
+from .orchestration.cancel import CancelToken, check_cancelled
+from .spoke_slots import SpokeSlots
+
+
+def _accepts_cancel(fn: Any) -> bool:
+    """Ältere Runner kennen `cancel` nicht → nur weiterreichen, wenn die Signatur es erlaubt."""
+    try:
+        params = inspect.signature(fn).parameters
+    except (TypeError, ValueError):
+        return False
+    return "cancel" in params or any(p.kind is inspect.Parameter.VAR_KEYWORD for p in params.values())
 
 
 # === Nested Captain-Spoke =====================================================
@@ -21,6 +34,7 @@ class HasRunNested(Protocol):
         ticket_id: str,
         parent_workcell_space_id: str,
         tags: Set[str],
+        cancel: Optional[CancelToken] = None,
     ) -> Dict[str, Any]: ...
 
 
@@ -31,9 +45,17 @@ class CaptainSpoke:
     score: int
     impl: Any  # ungenutzt, nested ruft direkt run_nested
     runner: HasRunNested
+    capacity: int = 1  # ein verschachtelter Run belegt den Captain komplett
+    slots: SpokeSlots = field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        self.slots = SpokeSlots(self.capacity)
+
+    def acquire(self) -> None:
+        self.slots.force_acquire()
 
-    def acquire(self) -> None: ...
-    def release(self) -> None: ...
+    def release(self) -> None:
+        self.slots.release()
 
     def run_nested(
         self,
@@ -43,14 +65,53 @@ class CaptainSpoke:
         ticket_id: str,
         parent_workcell_space_id: str,
         tags: Set[str],
+        cancel: Optional[CancelToken] = None,
     ) -> Dict[str, Any]:
-        return self.runner.run_nested(
+        check_cancelled(cancel)
+        kwargs: Dict[str, Any] = dict(
             memory=memory,
             run_id=run_id,
             ticket_id=ticket_id,
             parent_workcell_space_id=parent_workcell_space_id,
             tags=tags,
         )
+        if cancel is not None and _accepts_cancel(self.runner.run_nested):
+            kwargs["cancel"] = cancel
+        result = self.runner.run_nested(**kwargs)
+        check_cancelled(cancel)
+        return result
+
+    async def arun_nested(
+        self,
+        *,
+        memory: Memory,
+        run_id: str,
+        ticket_id: str,
+        parent_workcell_space_id: str,
+        tags: Set[str],
+        cancel: Optional[CancelToken] = None,
+    ) -> Dict[str, Any]:
+        """
+        Async-Runner (`arun_nested`) bevorzugt, sonst sync `run_nested` im Worker-Thread.
+        `cancel` geht an Runner, die ihn annehmen; ein Task-Abbruch beendet async Runner sofort,
+        der Thread eines sync Runners läuft bis zu seinem nächsten Checkpoint weiter.
+        """
+        check_cancelled(cancel)
+        kwargs: Dict[str, Any] = dict(
+            memory=memory,
+            run_id=run_id,
+            ticket_id=ticket_id,
+            parent_workcell_space_id=parent_workcell_space_id,
+            tags=tags,
+        )
+        arun = getattr(self.runner, "arun_nested", None)
+        if arun is not None and inspect.iscoroutinefunction(arun):
+            if cancel is not None and _accepts_cancel(arun):
+                kwargs["cancel"] = cancel
+            return await arun(**kwargs)
+        if cancel is not None and _accepts_cancel(self.runner.run_nested):
+            kwargs["cancel"] = cancel
+        return await asyncio.to_thread(self.runner.run_nested, **kwargs)
 
 
 # === Hub-Subklasse =============================================================
@@ -59,18 +120,11 @@ class CaptainHubNested(CaptainHub):
 
     # 1) Coder-Wahl: Erlaube builder_captain Spokes, den Slot zu gewinnen
     def _choose_coder(self, tags: Set[str]) -> Optional[Spoke]:
-        # Hole Kandidaten für beide Rollen
-        bc_list = self.router.candidates("builder_captain", tags) or []
-        cd_list = self.router.candidates("coder", tags) or []
-
-        def best(xs):
-            try:
-                return sorted(xs, key=lambda s: getattr(s, "score", 0), reverse=True)[0]
-            except Exception:
-                return None
-
-        bc = best(bc_list)
-        cd = best(cd_list)
+        # Beste Kandidaten beider Rollen (vorsortiert/gecacht über _match_spokes)
+        bc_list = self._match_spokes("builder_captain", tags)
+        cd_list = self._match_spokes("coder", tags)
+        bc = bc_list[0][1] if bc_list else None
+        cd = cd_list[0][1] if cd_list else None
 
         if bc and cd:
             return bc if getattr(bc, "score", 0) >= getattr(cd, "score", 0) else cd
@@ -91,13 +145,18 @@ class CaptainHubNested(CaptainHub):
         if coder and hasattr(coder, "run_nested"):
             # Tags einmalig berechnen (gleich wie in allocate_workcell)
             tags = self._compute_tags(ticket)
-            nested_result = getattr(coder, "run_nested")(
+            kwargs: Dict[str, Any] = dict(
                 memory=self.memory,
                 run_id=run.run_id,
                 ticket_id=ticket.ticket_id,
                 parent_workcell_space_id=workcell_space_id,
                 tags=tags,
             )
+            run_nested = getattr(coder, "run_nested")
+            if run.cancel is not None and _accepts_cancel(run_nested):
+                kwargs["cancel"] = run.cancel
+            nested_result = run_nested(**kwargs)
+            check_cancelled(run.cancel)
             impl = str(nested_result.get("impl", ""))
             review = str(nested_result.get("review", "OK"))
 
@@ -119,3 +178,57 @@ class CaptainHubNested(CaptainHub):
             workcell_space_id=workcell_space_id,
             st_ids=st_ids,
         )
+
+    # 3) Async-Coder-Phase (für arun_ticket)
+    async def acoder_step(
+        self,
+        *,
+        run: OrchestrationRun,
+        ticket: Ticket,
+        plan: str,
+        coder: Optional[Spoke],
+        critic: Optional[Spoke],
+        workcell_space_id: str,
+        st_ids: Dict[str, str],
+    ) -> Tuple[str, str]:
+        if coder and hasattr(coder, "run_nested"):
+            tags = self._compute_tags(ticket)
+            kwargs = dict(
+                memory=self.memory,
+                run_id=run.run_id,
+                ticket_id=ticket.ticket_id,
+                parent_workcell_space_id=workcell_space_id,
+                tags=tags,
+            )
+            arun = getattr(coder, "arun_nested", None)
+            if arun is not None and inspect.iscoroutinefunction(arun):
+                if run.cancel is not None and _accepts_cancel(arun):
+                    kwargs["cancel"] = run.cancel
+                nested_result = await arun(**kwargs)
+            else:
+                run_nested = getattr(coder, "run_nested")
+                if run.cancel is not None and _accepts_cancel(run_nested):
+                    kwargs["cancel"] = run.cancel
+                nested_result = await asyncio.to_thread(run_nested, **kwargs)
+            check_cancelled(run.cancel)
+            impl = str(nested_result.get("impl", ""))
+            review = str(nested_result.get("review", "OK"))
+
+            # Optional noch in ST-Spaces spiegeln (für Konsistenz)
+            if impl:
+                await self.io.awrite(space_id=st_ids["coder"], role="coder", content=impl)
+            if review:
+                await self.io.awrite(space_id=st_ids["critic"], role="critic", content=review)
+
+            return impl, review
+
+        # Fallback: Standard-Verhalten
+        return await super().acoder_step(
+            run=run,
+            ticket=ticket,
+            plan=plan,
+            coder=coder,
+            critic=critic,
+            workcell_space_id=workcell_space_id,
+            st_ids=st_ids,
+        )
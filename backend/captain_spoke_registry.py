@@ -1,6 +1,6 @@
 # backend/captain_spoke_registry.py
 from __future__ import annotations
-from typing import Dict, List, Set, Optional
+from typing import Any, Dict, FrozenSet, List, Set, Optional, Tuple
 from loguru import logger
 
 # Wir nutzen die Typen aus captain_hub
@@ -8,26 +8,127 @@ from backend.captain_hub import Router, Spoke  # type: ignore
 
 class RealRouter(Router):
     """
-    Einfache Router-Implementierung mit registry-basierten Kandidatenlisten.
-    Anfangs leer (wie ein NullRouter), aber später leicht erweiterbar:
+    Registry-basierter Router mit vorsortierten Kandidatenlisten.
+    Anfangs leer (wie ein NullRouter), erweiterbar per `register(role, spoke)`
+    oder Dict im Konstruktor:
     - spokes['planner'] = [MyPlanner(...), ...]
     - spokes['coder']   = [MyCoder(...),   ...]
     - spokes['critic']  = [MyCritic(...),  ...]
+
+    Routing:
+    - pro Rolle nach Score absteigend sortiert (stabil nach Registrierungsreihenfolge)
+    - invertierter Index tag → Spokes; Spokes ohne `tags` gelten als generisch
+    - `candidates(role, tags)` = passende Spezialisten + generische Spokes;
+      passt nichts, die volle Rollenliste (wie bisher); gecacht je (Rolle, bekannte Tags)
+      – Freitext-Tags ohne Index-Eintrag zählen nicht zum Key – und als Tupel ausgegeben
+      → Aufrufer können den Cache nicht verändern
+    - `version` zählt jede Registry-Änderung (leert den Cache)
     """
     def __init__(self, spokes: Optional[Dict[str, List[Spoke]]] = None) -> None:
-        self._spokes: Dict[str, List[Spoke]] = spokes or {}
+        self._spokes: Dict[str, Tuple[Spoke, ...]] = {}
+        self._tag_index: Dict[str, Dict[str, Set[int]]] = {}   # role → tag → {id(spoke)}
+        self._generic: Dict[str, Set[int]] = {}                # role → {id(spoke)} ohne Tags
+        self._cache: Dict[Tuple[str, FrozenSet[str]], Tuple[Spoke, ...]] = {}
+        self.version = 0
+        for role, xs in (spokes or {}).items():
+            for sp in xs:
+                self.register(role, sp)
+
+    # -------------------------
+    # Registry
+    # -------------------------
+    def register(self, role: str, spoke: Spoke) -> None:
+        # Copy-on-write: bereits ausgegebene Kandidaten-Tupel bleiben unverändert
+        lst = list(self._spokes.get(role, ()))
+        # stabil einsortieren: Score absteigend, gleiche Scores in Registrierungsreihenfolge
+        score = getattr(spoke, "score", 0)
+        i = len(lst)
+        while i > 0 and getattr(lst[i - 1], "score", 0) < score:
+            i -= 1
+        lst.insert(i, spoke)
+        self._spokes[role] = tuple(lst)
+        tags = _spoke_tags(spoke)
+        if tags:
+            idx = self._tag_index.setdefault(role, {})
+            for t in tags:
+                idx.setdefault(t, set()).add(id(spoke))
+        else:
+            self._generic.setdefault(role, set()).add(id(spoke))
+        self._bump()
+
+    def unregister(self, role: str, spoke: Spoke) -> bool:
+        lst = self._spokes.get(role) or ()
+        if not any(sp is spoke for sp in lst):
+            return False
+        self._spokes[role] = tuple(sp for sp in lst if sp is not spoke)
+        sid = id(spoke)
+        self._generic.get(role, set()).discard(sid)
+        for ids in self._tag_index.get(role, {}).values():
+            ids.discard(sid)
+        self._bump()
+        return True
+
+    def _bump(self) -> None:
+        self.version += 1
+        self._cache.clear()
+
+    def has_spokes(self) -> bool:
+        return any(self._spokes.values())
+
+    def all_spokes(self) -> List[Tuple[str, Spoke]]:
+        return [(role, sp) for role, xs in self._spokes.items() for sp in xs]
+
+    # -------------------------
+    # Lookup
+    # -------------------------
+    def candidates(self, role: str, tags: Set[str]) -> Tuple[Spoke, ...]:  # type: ignore[override]
+        """Nach Score sortierte Kandidaten (gecachtes, unveränderliches Tupel)."""
+        idx = self._tag_index.get(role) or {}
+        # nur Tags, die der Index kennt → wenige, stabile Keys (Rest ändert das Ergebnis nicht)
+        known = frozenset(t for t in (tags or ()) if t in idx)
+        key = (role, known)
+        hit = self._cache.get(key)
+        if hit is not None:
+            return hit
+        full = self._spokes.get(role, ())
+        matched: Set[int] = set()
+        for t in known:
+            matched |= idx[t]
+        if matched:
+            matched |= self._generic.get(role, set())
+            out = tuple(sp for sp in full if id(sp) in matched)
+        else:
+            out = full
+        if len(self._cache) >= 1024:
+            self._cache.pop(next(iter(self._cache)))   # ältesten Key verdrängen statt alles zu leeren
+        self._cache[key] = out
+        return out
+
 
-    def candidates(self, role: str, tags: Set[str]) -> List[Spoke]:  # type: ignore[override]
-        # Tags können später für Filter/Scoring genutzt werden
-        return list(self._spokes.get(role, []))
+def _spoke_tags(spoke: Any) -> Set[str]:
+    raw = getattr(spoke, "tags", None) or ()
+    if isinstance(raw, str):
+        raw = (raw,)
+    return {str(t).strip().lower() for t in raw if str(t).strip()}
 
 
-from typing import Dict, List
+from typing import Any, Dict, List
+import os
 from loguru import logger
 from backend.captain_hub import Spoke  # type: ignore
 
-def load_default_spokes() -> Dict[str, List[Spoke]]:
+def load_default_spokes(llm: Optional[Any] = None) -> Dict[str, List[Spoke]]:
     spokes: Dict[str, List[Spoke]] = {"planner": [], "coder": [], "critic": []}
+    # Optional: LLM-Spokes über den geteilten Client (ORCH_LLM_SPOKES=true)
+    if llm is not None and os.getenv("ORCH_LLM_SPOKES", "false").lower() == "true":
+        from backend.llm_client import LLMImpl, LLMSpoke
+        slots = int(os.getenv("ORCH_LLM_SPOKE_SLOTS", "4"))
+        # Coder/Critic sind gesampelt und werden beurteilt → nie cachen (abgelehnte Ergebnisse kämen wieder)
+        cache_planner = os.getenv("LLM_CACHE_SPOKES", "false").lower() == "true"
+        for role in ("planner", "coder", "critic"):
+            impl = LLMImpl(llm, cacheable=cache_planner and role == "planner")
+            spokes[role].append(LLMSpoke(role=role, score=10, impl=impl, capacity=slots))
+        logger.info("Spokes geladen: LLM planner/coder/critic")
     try:
         from backend.spokes.librarian import LibrarianPlanner  # optional, wenn vorhanden
         spokes["planner"].append(LibrarianPlanner())
@@ -1,5 +1,5 @@
 # backend/chat.py
-import asyncio, os, io, sys
+import asyncio, os, io, sys, json
 from typing import List, Dict, Any
 import httpx
 from loguru import logger
@@ -49,6 +49,7 @@ Tippe 'health' (oder 'hc') für einen ZEP-Healthcheck.
 """
 
 VERBOSE = False
+STREAM = os.getenv("CHAT_STREAM", "true").lower() == "true"
 
 def _coerce_dict(x: Any) -> Dict[str, Any]:
     """Immer ein Dict liefern, egal ob JSON dict/list/primitive/String."""
@@ -83,8 +84,48 @@ def _print_steps(steps: list[dict]) -> None:
             print(f"[step {i}] {t}: {s}")
 
 
+async def _stream_reply(client: httpx.AsyncClient, url: str, prompt: str) -> None:
+    """POST mit `Accept: text/event-stream`; Tokens werden sofort ausgegeben."""
+    sep = "&" if "?" in url else "?"
+    headers = {"Accept": "text/event-stream"}
+    event = None
+    started = False
+    async with client.stream("POST", f"{url}{sep}stream=true", json={"prompt": prompt}, headers=headers) as r:
+        if VERBOSE:
+            print("[HTTP]", r.status_code, dict(r.headers))
+        if r.status_code >= 400:
+            await r.aread()
+            r.raise_for_status()
+        async for line in r.aiter_lines():
+            if not line:
+                event = None
+                continue
+            if line.startswith("event:"):
+                event = line[6:].strip()
+                continue
+            if not line.startswith("data:"):
+                continue
+            try:
+                data = _coerce_dict(json.loads(line[5:].strip()))
+            except Exception:
+                continue
+            if event == "done":
+                steps = data.get("steps") or []
+                if VERBOSE and steps:
+                    print()
+                    _print_steps(steps)
+                continue
+            tok = str(data.get("token", "") or "")
+            if tok:
+                if not started:
+                    print("\n[Assistant]")
+                    started = True
+                print(tok, end="", flush=True)
+    print("\n" if started else "\n[Assistant]\n(keine Antwort erhalten)\n")
+
+
 async def run_cli() -> None:
-    global VERBOSE
+    global VERBOSE, STREAM
     print(BANNER)
 
     async with httpx.AsyncClient(timeout=60) as client:
@@ -208,6 +249,9 @@ async def run_cli() -> None:
             if cmd in {"v", ":v", "verbose"}:
                 VERBOSE = not VERBOSE
                 print(f"[Verbose] {'on' if VERBOSE else 'off'}"); continue
+            if cmd in {"stream", ":stream"}:
+                STREAM = not STREAM
+                print(f"[Stream] {'on' if STREAM else 'off'}"); continue
 
             try:
                 dry_req = False
@@ -215,6 +259,10 @@ async def run_cli() -> None:
                     dry_req = True
                     user_text = user_text[4:].lstrip()
 
+                if STREAM and not dry_req:
+                    await _stream_reply(client, api_url, user_text)
+                    continue
+
                 r = await client.post(api_url + ("?dry=true" if dry_req else ""), json={"prompt": user_text})
                 if VERBOSE:
                     print("[HTTP]", r.status_code, dict(r.headers))
@@ -0,0 +1,285 @@
+"""
+LLMResponseCache
+----------------
+Opt-in, inhaltsadressierter Cache für LLM-Antworten (deterministische/wiederholte Prompts).
+
+- Key = SHA-256 über (model, messages, temperature, base_url) in kanonischem JSON
+- Zwei Stufen: In-Memory-LRU + SQLite auf Platte (größenbegrenzt, älteste Zugriffe fliegen)
+- Gespeichert wird nur bei temperature == 0 oder explizit `cacheable=True`
+- Bypass pro Request: Header `X-LLM-Cache: bypass` (setzt ein ContextVar, siehe main.py);
+  beim Bypass wird nicht gelesen, die frische Antwort aber gespeichert
+- Skip (`cache_skip()`, z. B. Fan-out-Kandidaten): weder lesen noch speichern
+
+ENV:
+  LLM_RESPONSE_CACHE=true     aktivieren
+  LLM_CACHE_PATH              (default data/llm_cache.sqlite3; "" → nur In-Memory)
+  LLM_CACHE_MEM_MAX           (Einträge im Speicher, default 512)
+  LLM_CACHE_DISK_MAX_MB       (default 64)
+  LLM_CACHE_TTL               (Sekunden, default 0 = kein Ablauf)
+  LLM_CACHE_SPOKES            (default false; true: Planner-Spoke gilt als cacheable)
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, Optional, Sequence
+
+from loguru import logger
+
+BYPASS_HEADER = "x-llm-cache"
+
+_BYPASS: ContextVar[bool] = ContextVar("llm_cache_bypass", default=False)
+_SKIP: ContextVar[bool] = ContextVar("llm_cache_skip", default=False)
+
+
+def cache_key(
+    *,
+    model: str,
+    messages: Sequence[Dict[str, Any]],
+    temperature: float,
+    base_url: Optional[str],
+) -> str:
+    payload = json.dumps(
+        {"model": model, "messages": list(messages), "temperature": float(temperature), "base_url": base_url or ""},
+        ensure_ascii=False, sort_keys=True, separators=(",", ":"), default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def should_store(temperature: float, cacheable: Optional[bool]) -> bool:
+    return bool(cacheable) or float(temperature) == 0.0
+
+
+# --- Bypass (pro Request/Task) -------------------------------------------------
+def cache_bypassed() -> bool:
+    return _BYPASS.get()
+
+
+def set_cache_bypass(on: bool) -> None:
+    _BYPASS.set(bool(on))
+
+
+@contextmanager
+def cache_bypass(on: bool = True) -> Iterator[None]:
+    token = _BYPASS.set(bool(on))
+    try:
+        yield
+    finally:
+        _BYPASS.reset(token)
+
+
+# --- Skip (kein Lesen, kein Speichern) ----------------------------------------
+def cache_skipped() -> bool:
+    return _SKIP.get()
+
+
+@contextmanager
+def cache_skip(on: bool = True) -> Iterator[None]:
+    token = _SKIP.set(bool(on))
+    try:
+        yield
+    finally:
+        _SKIP.reset(token)
+
+
+class LLMResponseCache:
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        *,
+        mem_max: int = 512,
+        disk_max_bytes: int = 64 * 1024 * 1024,
+        ttl: float = 0.0,
+    ) -> None:
+        self.path = path or None
+        self.mem_max = max(1, mem_max)
+        self.disk_max_bytes = max(0, disk_max_bytes)
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._mem: "OrderedDict[str, tuple[float, str]]" = OrderedDict()
+        self._db: Optional[sqlite3.Connection] = None
+        self._disk_bytes = 0
+        self._stats: Dict[str, int] = {
+            "hits_mem": 0, "hits_disk": 0, "misses": 0, "stores": 0, "bypassed": 0, "evictions": 0,
+        }
+        if self.path:
+            try:
+                self._db = self._open(self.path)
+                row = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM llm_cache").fetchone()
+                self._disk_bytes = int(row[0] or 0)
+            except Exception as e:
+                logger.warning("LLM-Cache: SQLite {} nicht nutzbar ({}), nur In-Memory", self.path, e)
+                self._db = None
+
+    @classmethod
+    def from_env(cls) -> Optional["LLMResponseCache"]:
+        if os.getenv("LLM_RESPONSE_CACHE", "false").lower() != "true":
+            return None
+        return cls(
+            os.getenv("LLM_CACHE_PATH", os.path.join("data", "llm_cache.sqlite3")),
+            mem_max=int(os.getenv("LLM_CACHE_MEM_MAX", "512")),
+            disk_max_bytes=int(float(os.getenv("LLM_CACHE_DISK_MAX_MB", "64")) * 1024 * 1024),
+            ttl=float(os.getenv("LLM_CACHE_TTL", "0")),
+        )
+
+    @staticmethod
+    def _open(path: str) -> sqlite3.Connection:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        db = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=5.0)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            " key TEXT PRIMARY KEY,"
+            " created REAL NOT NULL,"
+            " accessed REAL NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " reply TEXT NOT NULL)"
+        )
+        db.execute("CREATE INDEX IF NOT EXISTS llm_cache_accessed ON llm_cache(accessed)")
+        return db
+
+    # -------------------------
+    # API
+    # -------------------------
+    def get(self, key: str, *, disk: bool = True) -> Optional[str]:
+        """Speicher zuerst, dann (optional) Platte; Platten-Treffer wandern in den Speicher."""
+        now = time.time()
+        with self._lock:
+            hit = self._mem.get(key)
+            if hit is not None:
+                created, reply = hit
+                if not self._expired(created, now):
+                    self._mem.move_to_end(key)
+                    self._stats["hits_mem"] += 1
+                    return reply
+                self._mem.pop(key, None)
+            if not disk or self._db is None:
+                if disk:
+                    self._stats["misses"] += 1
+                return None
+            try:
+                row = self._db.execute("SELECT created, reply FROM llm_cache WHERE key = ?", (key,)).fetchone()
+                if row is not None and self._expired(row[0], now):
+                    self._delete(key)
+                    row = None
+                if row is not None:
+                    self._db.execute("UPDATE llm_cache SET accessed = ? WHERE key = ?", (now, key))
+            except Exception as e:
+                logger.warning("LLM-Cache: Lesen fehlgeschlagen: {}", e)
+                row = None
+            if row is None:
+                self._stats["misses"] += 1
+                return None
+            self._stats["hits_disk"] += 1
+            self._remember(key, float(row[0]), row[1])
+            return row[1]
+
+    def put(self, key: str, reply: str) -> None:
+        if not reply:
+            return
+        now = time.time()
+        with self._lock:
+            self._remember(key, now, reply)
+            self._stats["stores"] += 1
+            if self._db is None:
+                return
+            size = len(reply.encode("utf-8"))
+            try:
+                old = self._db.execute("SELECT size FROM llm_cache WHERE key = ?", (key,)).fetchone()
+                self._db.execute(
+                    "INSERT OR REPLACE INTO llm_cache(key, created, accessed, size, reply) VALUES (?, ?, ?, ?, ?)",
+                    (key, now, now, size, reply),
+                )
+                self._disk_bytes += size - (int(old[0]) if old else 0)
+                self._evict_disk()
+            except Exception as e:
+                logger.warning("LLM-Cache: Schreiben fehlgeschlagen: {}", e)
+
+    def note_bypass(self) -> None:
+        with self._lock:
+            self._stats["bypassed"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self._stats,
+                "mem_entries": len(self._mem),
+                "disk_bytes": self._disk_bytes if self._db is not None else None,
+                "path": self.path if self._db is not None else None,
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            db, self._db = self._db, None
+            if db is not None:
+                try:
+                    db.close()
+                except Exception:
+                    pass
+
+    # -------------------------
+    # Intern
+    # -------------------------
+    def _expired(self, created: float, now: float) -> bool:
+        return self.ttl > 0 and now - created > self.ttl
+
+    def _remember(self, key: str, created: float, reply: str) -> None:
+        self._mem[key] = (created, reply)
+        self._mem.move_to_end(key)
+        while len(self._mem) > self.mem_max:
+            self._mem.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def _delete(self, key: str) -> None:
+        assert self._db is not None
+        row = self._db.execute("SELECT size FROM llm_cache WHERE key = ?", (key,)).fetchone()
+        if row:
+            self._db.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+            self._disk_bytes -= int(row[0])
+
+    def _evict_disk(self) -> None:
+        # Älteste Zugriffe zuerst, in kleinen Batches bis unter das Limit
+        while self._db is not None and self.disk_max_bytes and self._disk_bytes > self.disk_max_bytes:
+            rows = self._db.execute(
+                "SELECT key, size FROM llm_cache ORDER BY accessed ASC LIMIT 64"
+            ).fetchall()
+            if not rows:
+                self._disk_bytes = 0
+                return
+            for key, size in rows:
+                self._db.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self._disk_bytes -= int(size)
+                self._stats["evictions"] += 1
+                if self._disk_bytes <= self.disk_max_bytes:
+                    break
+
+
+# --- Prozessweite Instanz (lazy, aus ENV) --------------------------------------
+_CACHE: Optional[LLMResponseCache] = None
+_CACHE_INIT = False
+_CACHE_LOCK = threading.Lock()
+
+
+def get_llm_cache() -> Optional[LLMResponseCache]:
+    """Gemeinsamer Cache für AsyncLLMClient und den Legacy-Pfad `_llm_chat` (None = aus)."""
+    global _CACHE, _CACHE_INIT
+    if not _CACHE_INIT:
+        with _CACHE_LOCK:
+            if not _CACHE_INIT:
+                _CACHE = LLMResponseCache.from_env()
+                _CACHE_INIT = True
+    return _CACHE
+
+
+__all__ = [
+    "LLMResponseCache", "get_llm_cache", "cache_key", "should_store",
+    "cache_bypass", "cache_bypassed", "set_cache_bypass", "cache_skip", "cache_skipped", "BYPASS_HEADER",
+]
@@ -0,0 +1,409 @@
+"""
+AsyncLLMClient
+--------------
+Geteilter, asynchroner LLM-Client (OpenAI-kompatibel) für Chat-Fassade und Spokes.
+
+- Wird **einmal** in `ensure_runtime` erzeugt und auf `RuntimeState.llm` abgelegt
+- Keep-Alive-Connection-Pool (httpx) statt neuem Client + TLS-Handshake pro Call
+- Concurrency-Cap (Semaphore) und Timeout pro Call
+- `chat_sync` für synchrone Aufrufer aus Worker-Threads (z. B. `Impl.run` im Hub)
+- optionaler Antwort-Cache (`backend/llm_cache.py`) für temperature 0 / `cacheable=True`
+- Cancel-Token (explizit oder aus dem Kontext, `backend/orchestration/cancel.py`):
+  Timeout auf die Run-Deadline begrenzt, Abbruch → `RunCancelled` statt None
+
+ENV:
+  OPENAI_MODEL, OPENAI_BASE_URL, OPENAI_API_KEY
+  LLM_MAX_CONCURRENCY      (default 16)
+  LLM_TIMEOUT              (Sekunden, default 60)
+  LLM_POOL_MAX_CONNECTIONS (default 32)
+  LLM_POOL_KEEPALIVE       (default 16)
+  LLM_KEEPALIVE_EXPIRY     (Sekunden, default 30)
+"""
+from __future__ import annotations
+
+import asyncio
+import concurrent.futures
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Optional, Sequence, cast
+
+from loguru import logger
+
+from backend.llm_cache import (
+    LLMResponseCache, cache_bypass, cache_bypassed, cache_key, cache_skip, cache_skipped, get_llm_cache, should_store,
+)
+from backend.metrics import METRICS, timed
+from backend.orchestration.cancel import CancelToken, RunCancelled, current_token
+from backend.spoke_slots import SpokeSlots
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, "") or default)
+    except ValueError:
+        return default
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, "") or default)
+    except ValueError:
+        return default
+
+
+class AsyncLLMClient:
+    def __init__(
+        self,
+        *,
+        model: Optional[str] = None,
+        base_url: Optional[str] = None,
+        api_key: Optional[str] = None,
+        max_concurrency: int = 16,
+        timeout: float = 60.0,
+        max_connections: int = 32,
+        max_keepalive: int = 16,
+        keepalive_expiry: float = 30.0,
+        cache: Optional[LLMResponseCache] = None,
+    ) -> None:
+        self.model = model or os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+        self.base_url = base_url
+        self._api_key = api_key
+        self.timeout = timeout
+        self.max_concurrency = max(1, int(max_concurrency))
+        self._limits = (max_connections, max_keepalive, keepalive_expiry)
+        self._sem = asyncio.Semaphore(self.max_concurrency)
+        self._client: Any = None
+        self._http: Any = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._in_flight = 0
+        self.cache = cache
+
+    @classmethod
+    def from_env(cls) -> "AsyncLLMClient":
+        return cls(
+            model=os.getenv("OPENAI_MODEL", "gpt-4o-mini"),
+            base_url=os.getenv("OPENAI_BASE_URL") or None,
+            api_key=os.getenv("OPENAI_API_KEY") or None,
+            max_concurrency=_env_int("LLM_MAX_CONCURRENCY", 16),
+            timeout=_env_float("LLM_TIMEOUT", 60.0),
+            max_connections=_env_int("LLM_POOL_MAX_CONNECTIONS", 32),
+            max_keepalive=_env_int("LLM_POOL_KEEPALIVE", 16),
+            keepalive_expiry=_env_float("LLM_KEEPALIVE_EXPIRY", 30.0),
+            cache=get_llm_cache(),
+        )
+
+    # -------------------------
+    # Lifecycle
+    # -------------------------
+    def _ensure_client(self) -> Any:
+        """Erzeugt AsyncOpenAI + httpx-Pool lazy im Loop des ersten Aufrufers."""
+        if self._client is not None:
+            return self._client
+        import httpx
+        from openai import AsyncOpenAI  # type: ignore
+
+        max_conn, max_keep, expiry = self._limits
+        self._http = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=max_conn,
+                max_keepalive_connections=max_keep,
+                keepalive_expiry=expiry,
+            ),
+            timeout=httpx.Timeout(self.timeout),
+        )
+        kwargs: dict[str, Any] = {"http_client": self._http, "timeout": self.timeout}
+        if self.base_url:
+            kwargs["base_url"] = self.base_url
+        if self._api_key:
+            kwargs["api_key"] = self._api_key
+        self._client = AsyncOpenAI(**kwargs)  # type: ignore[arg-type]
+        return self._client
+
+    def bind_loop(self, loop: Optional[asyncio.AbstractEventLoop] = None) -> None:
+        """Merkt sich den Server-Loop, damit `chat_sync` aus Threads dorthin delegieren kann."""
+        try:
+            self._loop = loop or asyncio.get_running_loop()
+        except RuntimeError:
+            self._loop = None
+
+    async def aclose(self) -> None:
+        http, self._http, self._client = self._http, None, None
+        if http is not None:
+            try:
+                await http.aclose()
+            except Exception as e:
+                logger.warning("LLM-Client-Cleanup schlug fehl: {}", e)
+
+    # -------------------------
+    # Calls
+    # -------------------------
+    async def chat(
+        self,
+        messages: Sequence[dict[str, Any]],
+        *,
+        model: Optional[str] = None,
+        temperature: float = 0.7,
+        timeout: Optional[float] = None,
+        cacheable: Optional[bool] = None,
+        cancel: Optional[CancelToken] = None,
+    ) -> Optional[str]:
+        """Ein Chat-Completion-Call; None bei Fehler/Timeout (LLM_DEBUG=1 loggt), `RunCancelled` bei Abbruch."""
+        if self._loop is None:
+            self.bind_loop()
+        token = cancel or current_token()
+        if token is not None:
+            token.check()
+
+        # Antwort-Cache: nur deterministische (temperature 0) oder explizit cachebare Calls
+        cache = self.cache if should_store(temperature, cacheable) and not cache_skipped() else None
+        key: Optional[str] = None
+        if cache is not None:
+            key = cache_key(model=model or self.model, messages=messages, temperature=temperature, base_url=self.base_url)
+            if cache_bypassed():
+                cache.note_bypass()
+            else:
+                hit = cache.get(key, disk=False) or await asyncio.to_thread(cache.get, key)
+                if hit is not None:
+                    return hit
+        try:
+            client = self._ensure_client()
+        except Exception as e:
+            self._dbg(e, "init")
+            return None
+
+        async with self._sem:
+            self._in_flight += 1
+            try:
+                with timed("llm", engine="async"):
+                    resp = await asyncio.wait_for(
+                        client.chat.completions.create(
+                            model=model or self.model,
+                            messages=cast(Any, messages),
+                            temperature=temperature,
+                        ),
+                        timeout=token.clamp(timeout or self.timeout) if token is not None else (timeout or self.timeout),
+                    )
+                out = (resp.choices[0].message.content or "").strip()
+                if cache is not None and key is not None and out:
+                    await asyncio.to_thread(cache.put, key, out)
+                return out
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Timeout wegen Run-Deadline ist ein Abbruch, kein leeres Ergebnis
+                if token is not None and token.cancelled:
+                    raise RunCancelled(token.reason or "cancelled") from e
+                self._dbg(e, "chat")
+                return None
+            finally:
+                self._in_flight -= 1
+
+    async def stream(
+        self,
+        messages: Sequence[dict[str, Any]],
+        *,
+        model: Optional[str] = None,
+        temperature: float = 0.7,
+        timeout: Optional[float] = None,
+        cancel: Optional[CancelToken] = None,
+    ) -> AsyncIterator[str]:
+        """
+        Token-Streaming (`stream=True`); liefert Text-Deltas, bricht bei Fehler still ab,
+        `RunCancelled` bei Abbruch/Deadline. Upstream wird von einem eigenen Task in eine Queue
+        gelesen → der Concurrency-Slot hängt nicht an der Lesegeschwindigkeit des Clients.
+        """
+        if self._loop is None:
+            self.bind_loop()
+        token = cancel or current_token()
+        if token is not None:
+            token.check()
+        try:
+            client = self._ensure_client()
+        except Exception as e:
+            self._dbg(e, "init")
+            return
+
+        out: "asyncio.Queue[Any]" = asyncio.Queue()
+        end = object()
+
+        async def _read() -> None:
+            t0 = time.perf_counter()
+            first = True
+            resp = await asyncio.wait_for(
+                client.chat.completions.create(
+                    model=model or self.model,
+                    messages=cast(Any, messages),
+                    temperature=temperature,
+                    stream=True,
+                ),
+                timeout=token.clamp(timeout or self.timeout) if token is not None else (timeout or self.timeout),
+            )
+            async for chunk in resp:
+                if token is not None:
+                    token.check()
+                choices = getattr(chunk, "choices", None) or []
+                delta = getattr(choices[0].delta, "content", None) if choices else None
+                if delta:
+                    if first:
+                        METRICS.observe("llm_first_token", time.perf_counter() - t0)
+                        first = False
+                    out.put_nowait(delta)
+
+        async def _pump() -> None:
+            t0 = time.perf_counter()
+            async with self._sem:
+                self._in_flight += 1
+                try:
+                    with timed("llm", engine="async_stream"):
+                        # Gesamtdauer des Streams ebenfalls an die Run-Deadline binden
+                        rest = token.remaining() if token is not None else None
+                        await asyncio.wait_for(_read(), timeout=rest)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    if token is not None and token.cancelled:
+                        out.put_nowait(RunCancelled(token.reason or "cancelled"))
+                    else:
+                        self._dbg(e, "stream")
+                finally:
+                    METRICS.observe("llm_stream", time.perf_counter() - t0)
+                    self._in_flight -= 1
+                    out.put_nowait(end)
+
+        task = asyncio.ensure_future(_pump())
+        try:
+            while True:
+                item = await out.get()
+                if item is end:
+                    return
+                if isinstance(item, RunCancelled):
+                    raise item
+                yield item
+        finally:
+            # Client weg/abgebrochen → Upstream nicht weiterlesen
+            if not task.done():
+                task.cancel()
+
+    def chat_sync(
+        self,
+        messages: Sequence[dict[str, Any]],
+        *,
+        model: Optional[str] = None,
+        temperature: float = 0.7,
+        timeout: Optional[float] = None,
+        cacheable: Optional[bool] = None,
+        cancel: Optional[CancelToken] = None,
+    ) -> Optional[str]:
+        """
+        Synchroner Aufruf aus Worker-Threads (z. B. `run_in_threadpool(hub.run_ticket)`):
+        delegiert an den gebundenen Server-Loop und nutzt damit denselben Pool.
+        Ohne laufenden Loop → Legacy-Pfad `_llm_chat`.
+        Mit Cancel-Token wird in kurzen Intervallen gewartet; Abbruch bricht den Call im Loop ab.
+        """
+        # ContextVars reisen nicht mit run_coroutine_threadsafe → Token hier auflösen
+        token = cancel or current_token()
+        if token is not None:
+            token.check()
+        loop = self._loop
+        on_loop_thread = False
+        try:
+            on_loop_thread = asyncio.get_running_loop() is loop
+        except RuntimeError:
+            pass
+        if loop is not None and loop.is_running() and not on_loop_thread:
+            bypass, skip = cache_bypassed(), cache_skipped()
+
+            async def _call() -> Optional[str]:
+                # Cache-Flags ebenso: im Loop-Task neu setzen
+                with cache_bypass(bypass), cache_skip(skip):
+                    return await self.chat(
+                        messages, model=model, temperature=temperature, timeout=timeout, cacheable=cacheable, cancel=token
+                    )
+
+            fut = asyncio.run_coroutine_threadsafe(_call(), loop)
+            limit = time.monotonic() + (timeout or self.timeout) + 5.0
+            try:
+                while True:
+                    if token is not None and token.cancelled:
+                        fut.cancel()
+                        raise RunCancelled(token.reason or "cancelled")
+                    rest = max(0.0, limit - time.monotonic())
+                    try:
+                        return fut.result(min(rest, 0.25) if token is not None else rest)
+                    except concurrent.futures.TimeoutError:
+                        if time.monotonic() >= limit:
+                            raise
+            except RunCancelled:
+                raise
+            except Exception as e:
+                fut.cancel()
+                self._dbg(e, "chat_sync")
+                return None
+
+        from backend.captain_hub import _llm_chat  # lokal: vermeidet Zirkelimport
+        return _llm_chat(messages, model=model or self.model, cacheable=cacheable)
+
+    # -------------------------
+    # Diag
+    # -------------------------
+    def stats(self) -> dict[str, Any]:
+        max_conn, max_keep, _ = self._limits
+        return {
+            "model": self.model,
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self._in_flight,
+            "timeout": self.timeout,
+            "pool": {"max_connections": max_conn, "max_keepalive": max_keep},
+            "cache": self.cache.stats() if self.cache is not None else None,
+        }
+
+    @staticmethod
+    def _dbg(exc: BaseException, where: str) -> None:
+        if os.getenv("LLM_DEBUG") == "1":
+            logger.warning("LLM call failed in {}: {}", where, repr(exc))
+
+
+# === Spoke-Impl ================================================================
+@dataclass
+class LLMImpl:
+    """`Impl` für Spokes: Prompt → geteilter LLM-Client (sync `run`, async `arun`)."""
+    llm: AsyncLLMClient
+    system: Optional[str] = None
+    temperature: float = 0.7
+    cacheable: bool = False  # Antwort-Cache auch bei temperature > 0 (gleicher Prompt → gleiche Antwort)
+
+    def _messages(self, prompt: str) -> list[dict[str, Any]]:
+        msgs: list[dict[str, Any]] = []
+        if self.system:
+            msgs.append({"role": "system", "content": self.system})
+        msgs.append({"role": "user", "content": prompt})
+        return msgs
+
+    def run(self, prompt: str) -> str:
+        return self.llm.chat_sync(self._messages(prompt), temperature=self.temperature, cacheable=self.cacheable) or ""
+
+    async def arun(self, prompt: str) -> str:
+        return await self.llm.chat(self._messages(prompt), temperature=self.temperature, cacheable=self.cacheable) or ""
+
+
+@dataclass
+class LLMSpoke:
+    """Einfacher Spoke (planner/coder/critic) auf Basis von `LLMImpl` mit `capacity` Slots."""
+    role: str
+    score: int
+    impl: LLMImpl
+    capacity: int = 4
+    slots: SpokeSlots = field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        self.slots = SpokeSlots(self.capacity)
+
+    def acquire(self) -> None:
+        self.slots.force_acquire()
+
+    def release(self) -> None:
+        self.slots.release()
+
+
+__all__ = ["AsyncLLMClient", "LLMImpl", "LLMSpoke"]
@@ -12,8 +12,12 @@ from backend.routes.memory_api import router as memory_router
 from backend.routes.websocket import start_watcher
 from contextlib import asynccontextmanager
 from fastapi import Request
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
 from backend.agent_core.bootstrap import ensure_runtime
+from backend.metrics import render_prometheus
+from backend.llm_cache import BYPASS_HEADER, get_llm_cache, set_cache_bypass
+from backend.orchestration.run_store import RunStore
+from backend.orchestration.scheduler import RunScheduler
 # nur die Chat-Funktionen hier importieren; das Router-Objekt wird unten
 # bedarfsweise (ORCH_ENABLED) nachgeladen, um Redundanz zu vermeiden
 from backend.routes.orch_api import orch_chat, ChatIn
@@ -85,6 +89,9 @@ async def lifespan(app: FastAPI):
     app.state.hub         = getattr(runtime, "hub", None)
     app.state.persist_cfg = getattr(runtime, "persist_cfg", {})
     app.state.orch_nested = getattr(runtime, "orch_nested", False)
+    app.state.llm         = getattr(runtime, "llm", None)
+    app.state.run_scheduler = RunScheduler.from_env()  # Worker starten lazy beim ersten Submit
+    app.state.run_store   = RunStore.from_env()
 
     # Adapter robust auflösen: runtime.adapter → hub.zep_adapter (Fallback)
     adapter_from_runtime = getattr(runtime, "adapter", None)
@@ -113,10 +120,10 @@ async def lifespan(app: FastAPI):
 
         snapshot = None
         if adapter_obj is not None:
-            space_snapshot_fn = getattr(adapter_obj, "space_snapshot", None)
-            if callable(space_snapshot_fn):
+            space_stats_fn = getattr(adapter_obj, "space_stats", None)
+            if callable(space_stats_fn):
                 try:
-                    snapshot = space_snapshot_fn()
+                    snapshot = space_stats_fn()
                 except Exception:
                     snapshot = None
 
@@ -140,6 +147,56 @@ async def lifespan(app: FastAPI):
         except Exception as e:
             logger.warning("Watcher-Cleanup schlug fehl: {}", e)
 
+        # Run-Scheduler stoppen (laufende Hintergrund-Runs abbrechen)
+        try:
+            scheduler = getattr(app.state, "run_scheduler", None)
+            if scheduler is not None:
+                await scheduler.shutdown()
+        except Exception as e:
+            logger.warning("Run-Scheduler-Shutdown schlug fehl: {}", e)
+
+        # Run-Registry (SQLite) schließen
+        try:
+            run_store = getattr(app.state, "run_store", None)
+            if run_store is not None:
+                run_store.close()
+        except Exception as e:
+            logger.warning("Run-Store-Cleanup schlug fehl: {}", e)
+
+        # ZEP-Mirror des Workcell-Adapters leeren, Retention ins Space-Archiv schreiben
+        try:
+            adapter = getattr(getattr(app.state, "hub", None), "memory", None)
+            if adapter is not None and hasattr(adapter, "aclose"):
+                await adapter.aclose()
+        except Exception as e:
+            logger.warning("Mirror-Flush schlug fehl: {}", e)
+
+        # Write-behind-Queue der Thread-Memory leeren (ausstehende Nachrichten senden)
+        try:
+            mem_thread = getattr(app.state, "mem_thread", None)
+            if mem_thread is not None and hasattr(mem_thread, "aclose"):
+                await mem_thread.aclose()
+                logger.info("💾 Thread-Memory geflusht")
+        except Exception as e:
+            logger.warning("Thread-Memory-Flush schlug fehl: {}", e)
+
+        # LLM-Client (Connection-Pool) schließen
+        try:
+            llm = getattr(runtime, "llm", None)
+            if llm is not None:
+                await llm.aclose()
+                logger.info("🔒 LLM-Client geschlossen")
+        except Exception as e:
+            logger.warning("LLM-Client-Cleanup schlug fehl: {}", e)
+
+        # LLM-Antwort-Cache (SQLite) schließen
+        try:
+            llm_cache = get_llm_cache()
+            if llm_cache is not None:
+                llm_cache.close()
+        except Exception as e:
+            logger.warning("LLM-Cache-Cleanup schlug fehl: {}", e)
+
         # ZEP-Client schließen (sync/async tolerant)
         try:
             zep = getattr(app.state, "zep_client", None)
@@ -173,6 +230,13 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# LLM-Antwort-Cache pro Request umgehen: `X-LLM-Cache: bypass`
+@app.middleware("http")
+async def _llm_cache_bypass(request: Request, call_next):
+    if (request.headers.get(BYPASS_HEADER) or "").strip().lower() in ("bypass", "no-cache", "off"):
+        set_cache_bypass(True)
+    return await call_next(request)
+
 # Routen (Bewusst uneinheitlich belassen – wird später vereinheitlicht)
 ORCH_ENABLED = os.getenv("ORCH_ENABLED", "false").lower() == "true"
 app.include_router(agents_router)
@@ -188,7 +252,7 @@ from fastapi import Request
 from fastapi.responses import JSONResponse
 
 @app.post("/api/chat")
-async def _chat_alias(request: Request) -> JSONResponse:
+async def _chat_alias(request: Request) -> Response:
     # Debug: sehen, dass wirklich der Alias greift
     logger.debug("🔀 /api/chat via compat alias")
     try:
@@ -216,7 +280,8 @@ async def _chat_alias(request: Request) -> JSONResponse:
 
     chat_in = ChatIn(**payload)
     res = await orch_chat(chat_in, request)
-    return res if isinstance(res, JSONResponse) else JSONResponse(content=res)
+    # StreamingResponse (SSE/chunked) unverändert durchreichen
+    return res if isinstance(res, Response) else JSONResponse(content=res)
 
 # 2) DANACH erst die Router mounten (damit der Alias gewinnt)
 #app.include_router(chat_router,   prefix="/api")
@@ -229,6 +294,11 @@ if ORCH_ENABLED:
 
 app.add_api_route("/api/chat", _chat_alias, methods=["POST"])
 
+# Prometheus-Textformat: Latenz-Histogramme (Chat-Phasen mit route/engine-Labels, ZEP-Mirror-Lag) + Ereignis-Zähler
+@app.get("/metrics", include_in_schema=False)
+async def metrics() -> PlainTextResponse:
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4")
+
 # Health-Endpoint (für Docker/Logs): behebt 404 auf /api/health
 @app.get("/api/health")
 async def api_health():
@@ -5,13 +5,32 @@ ZepThreadMemory (async-only)
 ----------------------------
 - Ensures/lazily creates a thread
 - Adds user/assistant/system messages (with recreate+retry on 404)
-- Builds a compact context block (user_context + recent)
+- Builds a compact context block (user_context + recent + registered sources),
+  fetched concurrently with a per-source timeout
+- Caches user_context per (thread, mode) with TTL; appends mark the entry stale,
+  a completed turn (non-user append) refreshes it in the background
+  (stale-while-revalidate, one remote fetch per turn)
+- Serves recent history from a bounded per-thread ring buffer (seeded once via
+  last-N fetch, kept in sync by appends, re-synced on foreign writes)
+- Optional write-behind: appends are queued and flushed in ordered multi-message
+  batches by a background worker (ZEP_WRITE_BEHIND=true)
+- Thread search via a persisted, incrementally updated BM25 index (thread_index.py);
+  substring hits among the newest `max_scan` messages rank first (previous semantics),
+  index file I/O runs in worker threads (load, backfill, batched appends)
 """
 from __future__ import annotations
 
-from typing import Any, Optional, List, Dict, Set
+import asyncio
+import os
+import time
+from collections import Counter, deque
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Deque, Optional, List, Dict, Set, Tuple
 from zep_cloud.core.api_error import ApiError
 
+from backend.memory.thread_index import ThreadSearchIndex, index_path
+from backend.metrics import timed
+
 try:
     from loguru import logger
 except Exception:  # pragma: no cover
@@ -23,6 +42,46 @@ except Exception:  # pragma: no cover
     logger = _Dummy()
 
 
+@dataclass
+class _CtxEntry:
+    value: str
+    fetched_at: float
+    stale: bool = False
+
+
+def _normalize_message(m: Any) -> Optional[Dict[str, Any]]:
+    """SDK-Objekt oder Dict → {"role","content","ts"}; None bei leerem Inhalt."""
+    if isinstance(m, dict):
+        role = m.get("role") or ""
+        content = m.get("content") or ""
+        ts = m.get("created_at") or m.get("ts")
+    else:
+        role = getattr(m, "role", "") or getattr(m, "type", "")
+        content = getattr(m, "content", "") or getattr(m, "text", "")
+        ts = getattr(m, "created_at", None)
+    if not content:
+        return None
+    return {"role": str(role), "content": str(content), "ts": ts}
+
+
+def _missing_from(remote: List[Dict[str, Any]], local: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Lokal gemerkte Appends, die im Remote-Stand (noch) fehlen. Lokale Nachrichten haben
+    keine ID → Abgleich über (Rolle, Inhalt) gegen das Remote-Ende (Länge 2×lokal).
+    """
+    if not local:
+        return []
+    tail = Counter((str(m.get("role", "")), str(m.get("content", "")).strip()) for m in remote[-2 * len(local):])
+    out: List[Dict[str, Any]] = []
+    for m in local:
+        key = (str(m.get("role", "")), str(m.get("content", "")).strip())
+        if tail[key]:
+            tail[key] -= 1
+        else:
+            out.append(m)
+    return out
+
+
 class ZepThreadMemory:
     def __init__(
         self,
@@ -31,11 +90,51 @@ class ZepThreadMemory:
         thread_id: Optional[str] = None,
         *,
         default_context_mode: str = "basic",
+        context_timeout: Optional[float] = None,
+        write_behind: Optional[bool] = None,
     ) -> None:
         self._client = client
         self._user_id = user_id
         self._thread_id = thread_id
         self._default_context_mode = default_context_mode
+        # Zeitbudget pro Kontextquelle (Sekunden); langsame Quellen fallen aus dem Block
+        self._context_timeout = float(
+            context_timeout if context_timeout is not None else os.getenv("ZEP_CONTEXT_TIMEOUT", "1.5")
+        )
+        # Zusätzliche Kontextquellen: name → (async fn → Textblock, timeout|None)
+        self._context_sources: Dict[str, Tuple[Callable[[], Awaitable[Optional[str]]], Optional[float]]] = {}
+        # user_context-Cache: (thread_id, mode) → Eintrag; TTL 0 deaktiviert
+        self._ctx_ttl = float(os.getenv("ZEP_CONTEXT_CACHE_TTL", "30"))
+        self._ctx_cache: Dict[Tuple[str, str], _CtxEntry] = {}
+        self._ctx_inflight: Dict[Tuple[str, str], "asyncio.Task[str]"] = {}
+        self._ctx_stats: Dict[str, int] = {"hits": 0, "stale_hits": 0, "misses": 0, "refreshes": 0, "invalidations": 0}
+        # Recent-Ringpuffer pro Thread (lokal bedient; Resync-Probe nach ZEP_RECENT_RESYNC Sekunden)
+        self._recent_cap = max(1, int(os.getenv("ZEP_RECENT_BUFFER", "50")))
+        self._recent_resync = float(os.getenv("ZEP_RECENT_RESYNC", "30"))
+        self._recent: Dict[str, Deque[Dict[str, Any]]] = {}
+        self._recent_synced: Dict[str, float] = {}
+        self._recent_locks: Dict[str, asyncio.Lock] = {}
+        self._recent_seeding: Dict[str, List[Dict[str, Any]]] = {}   # Appends während eines Seeds
+        # Write-behind-Queue (bounded → Backpressure statt unbegrenztem Speicher)
+        self._wb_enabled = (
+            write_behind if write_behind is not None
+            else os.getenv("ZEP_WRITE_BEHIND", "false").lower() == "true"
+        )
+        self._wb_batch = max(1, int(os.getenv("ZEP_WB_BATCH", "30")))
+        self._wb_linger = float(os.getenv("ZEP_WB_LINGER_MS", "50")) / 1000.0
+        self._wb_retries = max(0, int(os.getenv("ZEP_WB_RETRIES", "3")))
+        self._wb_queue: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue(maxsize=max(1, int(os.getenv("ZEP_WB_MAX_PENDING", "1000"))))
+        self._wb_task: Optional["asyncio.Task[None]"] = None
+        self._wb_stats: Dict[str, int] = {"enqueued": 0, "sent": 0, "batches": 0, "failed": 0}
+        # Kontext-Version (Single-Flight-Key): zählt Nicht-User-Appends
+        self._ctx_version = 0
+        # Suchindex pro Thread (einmaliger Backfill, danach inkrementell; auf Platte persistiert)
+        self._index_dir = os.getenv("ZEP_THREAD_INDEX_DIR", os.path.join("data", "thread_index"))
+        self._indexes: Dict[str, ThreadSearchIndex] = {}
+        self._index_lock = asyncio.Lock()        # Backfill (Remote-Fetch)
+        self._index_load_lock = asyncio.Lock()   # Laden von Platte
+        self._index_backlog: Dict[str, List[Dict[str, Any]]] = {}   # Appends während eines Backfills
+        self._index_flushes: Dict[str, "asyncio.Task[None]"] = {}
 
     # -------------------------
     # Properties / accessors
@@ -44,6 +143,18 @@ class ZepThreadMemory:
     def thread_id(self) -> Optional[str]:
         return self._thread_id
 
+    @property
+    def context_version(self) -> int:
+        return self._ctx_version
+
+    @property
+    def client(self) -> Any:
+        return self._client
+
+    @property
+    def user_id(self) -> str:
+        return self._user_id
+
     def set_thread(self, thread_id: str) -> None:
         self._thread_id = thread_id
 
@@ -110,14 +221,36 @@ class ZepThreadMemory:
         if name:
             msg["name"] = name
 
+        # Antwortrelevanter Kontext ändert sich erst mit abgeschlossenen Turns
+        if role != "user":
+            self._ctx_version += 1
+
+        if self._wb_enabled:
+            # Write-behind: lokal sofort sichtbar, Remote-Write im Hintergrund
+            if self._thread_id:
+                self._remember_recent(self._thread_id, msg)
+                await self._index_append(self._thread_id, msg)
+            self._ensure_wb_worker()
+            await self._wb_queue.put(msg)
+            self._wb_stats["enqueued"] += 1
+            return
+
+        thread_id = await self._send_messages([msg])
+        self._remember_recent(thread_id, msg)
+        await self._index_append(thread_id, msg)
+
+    async def _send_messages(self, msgs: List[Dict[str, Any]]) -> str:
+        """Ein `add_messages`-Call; bei 404 genau 1x Thread neu ermitteln. Gibt die Thread-ID zurück."""
         # Kein Preflight: direkt senden, bei 404 genau 1x reparieren
         for attempt in (1, 2):
             thread_id = await self.ensure_thread(force_check=(attempt == 2))
             try:
                 # {}-Style wie im Rest deines Logs
-                logger.debug("add_message: using thread_id={} (cached={})", thread_id, self._thread_id)
-                await self._client.thread.add_messages(thread_id=thread_id, messages=[msg])
-                return
+                logger.debug("add_message: using thread_id={} (cached={}) n={}", thread_id, self._thread_id, len(msgs))
+                await self._client.thread.add_messages(thread_id=thread_id, messages=msgs)
+                # wie `_ctx_version`: erst ein abgeschlossener Turn lohnt den Remote-Refresh
+                self._invalidate_user_context(thread_id, refresh=any(m.get("role") != "user" for m in msgs))
+                return thread_id
             except ApiError as e:
                 status = getattr(e, "status_code", None)
                 body = (getattr(e, "body", "") or "").lower()
@@ -126,30 +259,265 @@ class ZepThreadMemory:
                     self._thread_id = None  # erzwingt Neuermittlung im 2. Versuch
                     continue
                 raise
+        raise RuntimeError("add_messages: unreachable")
+
+    # -------------------------
+    # Write-behind
+    # -------------------------
+    def _ensure_wb_worker(self) -> None:
+        if self._wb_task is None or self._wb_task.done():
+            self._wb_task = asyncio.ensure_future(self._wb_worker())
+
+    async def _wb_worker(self) -> None:
+        """Ein Worker pro Instanz → Reihenfolge bleibt erhalten; Batches bis `_wb_batch` Nachrichten."""
+        q = self._wb_queue
+        while True:
+            first = await q.get()
+            batch = [first]
+            deadline = time.monotonic() + self._wb_linger
+            while len(batch) < self._wb_batch:
+                try:
+                    if q.empty():
+                        left = deadline - time.monotonic()
+                        if left <= 0:
+                            break
+                        batch.append(await asyncio.wait_for(q.get(), timeout=left))
+                    else:
+                        batch.append(q.get_nowait())
+                except (asyncio.TimeoutError, asyncio.QueueEmpty):
+                    break
+            try:
+                await self._wb_send(batch)
+            finally:
+                for _ in batch:
+                    q.task_done()
+
+    async def _wb_send(self, batch: List[Dict[str, Any]]) -> None:
+        delay = 0.5
+        for attempt in range(self._wb_retries + 1):
+            try:
+                await self._send_messages(batch)
+                self._wb_stats["sent"] += len(batch)
+                self._wb_stats["batches"] += 1
+                return
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if attempt >= self._wb_retries:
+                    self._wb_stats["failed"] += len(batch)
+                    logger.error("write-behind: {} Nachricht(en) verworfen: {}", len(batch), e)
+                    return
+                logger.warning("write-behind: Versuch {} fehlgeschlagen ({}), retry in {}s", attempt + 1, e, delay)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 8.0)
+
+    async def flush(self, timeout: Optional[float] = 10.0) -> None:
+        """Wartet, bis alle gepufferten Nachrichten gesendet (oder verworfen) sind."""
+        if self._wb_task is None:
+            return
+        try:
+            await asyncio.wait_for(self._wb_queue.join(), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning("write-behind: flush timeout, {} Nachricht(en) offen", self._wb_queue.qsize())
+
+    async def aclose(self, timeout: Optional[float] = 10.0) -> None:
+        await self.flush(timeout=timeout)
+        for idx in list(self._indexes.values()):
+            if idx.pending:
+                await asyncio.to_thread(idx.flush)
+        task, self._wb_task = self._wb_task, None
+        if task is not None and not task.done():
+            task.cancel()
+            try:
+                await task
+            except (asyncio.CancelledError, Exception):
+                pass
+
+    def _wb_pending(self) -> int:
+        st = self._wb_stats
+        return st["enqueued"] - st["sent"] - st["failed"]
+
+    def write_behind_stats(self) -> Dict[str, Any]:
+        return {**self._wb_stats, "enabled": self._wb_enabled, "pending": self._wb_pending()}
 
     async def list_recent_messages(self, limit: int = 10) -> List[Dict[str, Any]]:
         if not self._thread_id or self._is_local():
             return []
+        tid = self._thread_id
         try:
-            resp = await self._client.thread.get(thread_id=self._thread_id)
-            raw = getattr(resp, "messages", None) or []
-            out: List[Dict[str, Any]] = []
-            for m in raw[-limit:]:
-                if isinstance(m, dict):
-                    role = m.get("role") or ""
-                    content = m.get("content") or ""
-                    ts = m.get("created_at") or m.get("ts")
-                else:
-                    role = getattr(m, "role", "") or getattr(m, "type", "")
-                    content = getattr(m, "content", "") or getattr(m, "text", "")
-                    ts = getattr(m, "created_at", None)
-                if not content:
-                    continue
-                out.append({"role": str(role), "content": str(content), "ts": ts})
-            return out
+            if limit > self._recent_cap:
+                # Mehr als der Puffer hält → direkt (aber nur last-N) holen
+                return await self._fetch_lastn(tid, limit)
+            async with self._recent_locks.setdefault(tid, asyncio.Lock()):
+                buf = self._recent.get(tid)
+                if buf is None:
+                    buf = await self._seed_recent(tid)
+                elif (
+                    time.monotonic() - self._recent_synced.get(tid, 0.0) > self._recent_resync
+                    and not self._wb_pending()  # ungesendete Writes würden sonst als fremd gelten
+                ):
+                    buf = await self._resync_recent(tid, buf)
+            return list(buf)[-limit:] if limit > 0 else []
         except Exception:
             return []
 
+    # -------------------------
+    # Recent ring buffer
+    # -------------------------
+    async def _fetch_lastn(self, thread_id: str, n: int) -> List[Dict[str, Any]]:
+        try:
+            resp = await self._client.thread.get(thread_id=thread_id, lastn=n)
+        except TypeError:
+            # ältere SDKs ohne `lastn`
+            resp = await self._client.thread.get(thread_id=thread_id)
+        raw = getattr(resp, "messages", None) or []
+        out: List[Dict[str, Any]] = []
+        for m in raw[-n:]:
+            nm = _normalize_message(m)
+            if nm:
+                out.append(nm)
+        return out
+
+    async def _seed_recent(self, thread_id: str) -> Deque[Dict[str, Any]]:
+        """last-N holen (Aufrufer hält das Thread-Lock); Appends während des Fetches danach mergen."""
+        self._recent_seeding[thread_id] = []
+        try:
+            fetched = await self._fetch_lastn(thread_id, self._recent_cap)
+        finally:
+            local = self._recent_seeding.pop(thread_id, [])
+        buf: Deque[Dict[str, Any]] = deque(fetched + _missing_from(fetched, local), maxlen=self._recent_cap)
+        self._recent[thread_id] = buf
+        self._recent_synced[thread_id] = time.monotonic()
+        return buf
+
+    async def _resync_recent(self, thread_id: str, buf: Deque[Dict[str, Any]]) -> Deque[Dict[str, Any]]:
+        """Billige Probe (last 1): weicht das Remote-Ende ab, hat ein anderer Prozess geschrieben → neu seeden."""
+        probe = await self._fetch_lastn(thread_id, 1)
+        self._recent_synced[thread_id] = time.monotonic()
+        remote = (probe[-1]["role"], probe[-1]["content"].strip()) if probe else None
+        local = (buf[-1]["role"], buf[-1]["content"].strip()) if buf else None
+        if remote != local:
+            logger.debug("recent buffer: foreign write on {} detected, re-seeding", thread_id)
+            return await self._seed_recent(thread_id)
+        return buf
+
+    def _remember_recent(self, thread_id: str, msg: Dict[str, Any]) -> None:
+        entry = {"role": msg.get("role", ""), "content": msg.get("content", ""), "ts": None}
+        seeding = self._recent_seeding.get(thread_id)
+        if seeding is not None:
+            seeding.append(entry)
+        buf = self._recent.get(thread_id)
+        if buf is not None:
+            buf.append(entry)
+
+    # -------------------------
+    # Search index
+    # -------------------------
+    def _load_index(self, thread_id: str) -> ThreadSearchIndex:
+        try:
+            return ThreadSearchIndex(index_path(self._index_dir, thread_id))
+        except OSError as e:
+            logger.warning("thread index: load failed ({}), using in-memory index", e)
+            return ThreadSearchIndex()
+
+    async def _index_for(self, thread_id: str) -> ThreadSearchIndex:
+        """Index aus dem Speicher bzw. einmalig im Worker-Thread von Platte laden."""
+        idx = self._indexes.get(thread_id)
+        if idx is not None:
+            return idx
+        async with self._index_load_lock:
+            idx = self._indexes.get(thread_id)
+            if idx is None:
+                idx = self._indexes[thread_id] = await asyncio.to_thread(self._load_index, thread_id)
+        return idx
+
+    async def _index_append(self, thread_id: str, msg: Dict[str, Any]) -> None:
+        backlog = self._index_backlog.get(thread_id)
+        if backlog is not None:
+            # Backfill läuft: nach dem Fetch gegen den Remote-Stand abgleichen
+            backlog.append(msg)
+            return
+        try:
+            idx = await self._index_for(thread_id)
+        except Exception as e:
+            logger.warning("thread index: unavailable: {}", e)
+            return
+        if not idx.backfilled:
+            return  # der spätere Backfill holt die Nachricht remote
+        idx.add(str(msg.get("role", "")), str(msg.get("content", "")), defer=True)
+        self._schedule_index_flush(thread_id, idx)
+
+    def _schedule_index_flush(self, thread_id: str, idx: ThreadSearchIndex) -> None:
+        """Gepufferte Index-Zeilen gebündelt im Worker-Thread schreiben (max. ein Flush je Thread)."""
+        task = self._index_flushes.get(thread_id)
+        if task is not None and not task.done():
+            return
+        task = asyncio.ensure_future(self._flush_index(idx))
+        self._index_flushes[thread_id] = task
+
+        def _done(t: "asyncio.Task[None]") -> None:
+            if self._index_flushes.get(thread_id) is t:
+                self._index_flushes.pop(thread_id, None)
+            if idx.pending and self._indexes.get(thread_id) is idx:
+                self._schedule_index_flush(thread_id, idx)
+
+        task.add_done_callback(_done)
+
+    async def _flush_index(self, idx: ThreadSearchIndex) -> None:
+        try:
+            await asyncio.to_thread(idx.flush)
+        except OSError as e:
+            logger.warning("thread index: append failed: {}", e)
+
+    async def _fetch_all(self, thread_id: str, page: int = 500) -> List[Dict[str, Any]]:
+        """Gesamten Thread seitenweise holen (nur für den einmaligen Index-Backfill)."""
+        out: List[Dict[str, Any]] = []
+        cursor = 0
+        while True:
+            try:
+                resp = await self._client.thread.get(thread_id=thread_id, limit=page, cursor=cursor)
+            except TypeError:
+                resp = await self._client.thread.get(thread_id=thread_id)
+                page = 0  # kein Paging verfügbar → ein Durchlauf
+            raw = getattr(resp, "messages", None) or []
+            for m in raw:
+                nm = _normalize_message(m)
+                if nm:
+                    out.append(nm)
+            if not page or len(raw) < page:
+                return out
+            cursor += len(raw)
+
+    def _build_index(self, thread_id: str, msgs: List[Dict[str, Any]]) -> ThreadSearchIndex:
+        idx = self._load_index(thread_id)
+        idx.reset()
+        idx.add_many(msgs, backfilled=True)
+        return idx
+
+    async def _ensure_index(self, thread_id: str) -> ThreadSearchIndex:
+        idx = await self._index_for(thread_id)
+        if idx.backfilled:
+            return idx
+        async with self._index_lock:
+            idx = await self._index_for(thread_id)
+            if idx.backfilled:
+                return idx
+            # Appends ab jetzt puffern: sie können im Fetch fehlen oder schon enthalten sein
+            self._index_backlog[thread_id] = []
+            try:
+                msgs = await self._fetch_all(thread_id)
+                idx = await asyncio.to_thread(self._build_index, thread_id, msgs)
+            finally:
+                backlog = self._index_backlog.pop(thread_id, [])
+            late = _missing_from(msgs, backlog)
+            for m in late:
+                idx.add(str(m.get("role", "")), str(m.get("content", "")), defer=True)
+            self._indexes[thread_id] = idx
+            if late:
+                self._schedule_index_flush(thread_id, idx)
+            logger.info("thread index: {} Nachrichten für {} indiziert", len(msgs) + len(late), thread_id)
+        return idx
+
     async def search_text(
         self,
         query: str,
@@ -161,81 +529,168 @@ class ZepThreadMemory:
         max_scan: int = 200,
     ) -> List[Dict[str, Any]]:
         """
-        Einfache Thread-Volltextsucht:
-        - Holt die letzten `max_scan` Nachrichten des Threads
-        - Filtert NEUESTE → ÄLTERE nach `query`
-        - Optional: Rollenfilter, „Merke:“ ausblenden, Dedupe
-        Rückgabe: [{\"role\",\"content\",\"ts\"}, ...]
+        Thread-Volltextsuche über den lokalen Index (Rückgabe wie bisher:
+        [{\"role\",\"content\",\"ts\"}, ...]). Teilstring-Treffer unter den neuesten
+        `max_scan` Nachrichten kommen zuerst (neueste → ältere, wie bisher), danach
+        BM25-Treffer einzelner Terme aus dem ganzen Thread.
+        """
+        page = await self.search_text_page(
+            query, limit=limit, roles=roles, exclude_notes=exclude_notes, dedupe=dedupe, max_scan=max_scan
+        )
+        return page["results"]
+
+    async def search_text_page(
+        self,
+        query: str,
+        *,
+        limit: int = 5,
+        roles: Optional[List[str]] = None,
+        exclude_notes: bool = False,
+        dedupe: bool = True,
+        cursor: Optional[str] = None,
+        max_scan: int = 200,
+    ) -> Dict[str, Any]:
+        """
+        Wie `search_text`, aber mit Paging:
+        Rückgabe {"results": [...], "next_cursor": str|None}
         """
         if not self._thread_id or self._is_local():
-           return []
-        qcf = (query or "").strip().casefold()
+            return {"results": [], "next_cursor": None}
         try:
-            resp = await self._client.thread.get(thread_id=self._thread_id)
-            raw = getattr(resp, "messages", None) or []
-        except Exception:
-            raw = []
-
-        msgs = raw[-max_scan:] if max_scan else raw
+            idx = await self._ensure_index(self._thread_id)
+        except Exception as e:
+            logger.warning("thread index unavailable: {}", e)
+            return {"results": [], "next_cursor": None}
         want_roles: Optional[Set[str]] = {r.lower() for r in roles} if roles else None
-        results: List[Dict[str, Any]] = []
-        seen: Set[str] = set()
-
-        for m in reversed(msgs):  # neueste → ältere
-            if isinstance(m, dict):
-                role = str(m.get("role") or "")
-                text = str(m.get("content") or "")
-                ts = m.get("created_at") or m.get("ts")
-            else:
-                role = str(getattr(m, "role", "") or getattr(m, "type", ""))
-                text = str(getattr(m, "content", "") or getattr(m, "text", ""))
-                ts = getattr(m, "created_at", None)
-            if not text:
-                continue
-            if want_roles and role.lower() not in want_roles:
-                continue
-            if exclude_notes and text.strip().lower().startswith("merke:"):
-                continue
-            if qcf and qcf not in text.casefold():
-                continue
-            key = text.strip().casefold()
-            if dedupe and key in seen:
-                continue
-            seen.add(key)
-            results.append({"role": role or "user", "content": text, "ts": ts})
-            if len(results) >= limit:
-                break
-        return results
+        results, next_cursor = idx.search(
+            query or "",
+            limit=limit,
+            roles=want_roles,
+            exclude_notes=exclude_notes,
+            dedupe=dedupe,
+            cursor=cursor,
+            substring_scan=max_scan,
+        )
+        return {"results": results, "next_cursor": next_cursor}
 
     async def get_user_context(self, mode: Optional[str] = None) -> str:
         if not self._thread_id or self._is_local():
             return ""
+        key = (self._thread_id, mode or self._default_context_mode)
+        entry = self._ctx_cache.get(key)
+        if entry is not None and self._ctx_ttl > 0 and time.monotonic() - entry.fetched_at < self._ctx_ttl:
+            self._ctx_stats["stale_hits" if entry.stale else "hits"] += 1
+            return entry.value
+        self._ctx_stats["misses"] += 1
+        return await self._fetch_user_context(key)
+
+    async def _fetch_user_context(self, key: Tuple[str, str]) -> str:
+        """Remote-Fetch; parallele Fetches desselben Keys teilen sich einen Task."""
+        task = self._ctx_inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._load_user_context(key))
+            self._ctx_inflight[key] = task
+            task.add_done_callback(lambda _t, k=key: self._ctx_inflight.pop(k, None))
         try:
-            ctx = await self._client.thread.get_user_context(
-                thread_id=self._thread_id, mode=mode or self._default_context_mode
-            )
-            return str(getattr(ctx, "context", "") or "")
+            return await asyncio.shield(task)
         except Exception:
             return ""
 
-    async def build_context_block(self, *, include_recent: bool = True, recent_limit: int = 10) -> str:
-        parts: List[str] = []
+    async def _load_user_context(self, key: Tuple[str, str]) -> str:
+        thread_id, mode = key
+        ctx = await self._client.thread.get_user_context(thread_id=thread_id, mode=mode)
+        value = str(getattr(ctx, "context", "") or "")
+        if self._ctx_ttl > 0:
+            self._ctx_cache[key] = _CtxEntry(value=value, fetched_at=time.monotonic())
+        return value
+
+    def _invalidate_user_context(self, thread_id: str, *, refresh: bool = True) -> None:
+        """Nach Append: Einträge des Threads als stale markieren, mit `refresh` im Hintergrund neu laden."""
+        for key, entry in list(self._ctx_cache.items()):
+            if key[0] != thread_id:
+                continue
+            entry.stale = True
+            self._ctx_stats["invalidations"] += 1
+            if refresh and key not in self._ctx_inflight:
+                self._ctx_stats["refreshes"] += 1
+                task = asyncio.ensure_future(self._fetch_user_context(key))
+                task.add_done_callback(lambda t: t.exception() if not t.cancelled() else None)
+
+    def context_cache_stats(self) -> Dict[str, Any]:
+        lookups = self._ctx_stats["hits"] + self._ctx_stats["stale_hits"] + self._ctx_stats["misses"]
+        hit_rate = (lookups - self._ctx_stats["misses"]) / lookups if lookups else 0.0
+        return {**self._ctx_stats, "entries": len(self._ctx_cache), "ttl": self._ctx_ttl, "hit_rate": round(hit_rate, 3)}
+
+    # -------------------------
+    # Context assembly
+    # -------------------------
+    def register_context_source(
+        self,
+        name: str,
+        fn: Callable[[], Awaitable[Optional[str]]],
+        *,
+        timeout: Optional[float] = None,
+    ) -> None:
+        """Weitere Kontextquelle anmelden; `fn` liefert einen fertigen Textblock (oder leer)."""
+        self._context_sources[name] = (fn, timeout)
+
+    async def _ctx_user_context(self) -> str:
         ctx = await self.get_user_context()
-        if ctx:
-            parts.append(f"Memory context: {ctx}")
+        return f"Memory context: {ctx}" if ctx else ""
+
+    async def _ctx_recent(self, limit: int) -> str:
+        recent = await self.list_recent_messages(limit=limit)
+        lines: List[str] = []
+        for m in recent:
+            role = (m.get("role") or "").strip() if isinstance(m, dict) else ""
+            content = (m.get("content") or "").strip() if isinstance(m, dict) else ""
+            if not content:
+                continue
+            content = str(content).strip()
+            if len(content) > 2000:
+                content = content[:2000] + " …"
+            lines.append(f"{role}: {content}")
+        return ("Recent conversation:\n" + "\n".join(lines)) if lines else ""
+
+    async def build_context(
+        self,
+        *,
+        include_recent: bool = True,
+        recent_limit: int = 10,
+        timeout: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        """
+        Holt alle Kontextquellen **parallel** (je eigenes Timeout).
+        Rückgabe: {"block": str, "sources": [genutzt], "dropped": [Timeout/Fehler]}
+        """
+        budget = self._context_timeout if timeout is None else timeout
+        jobs: List[Tuple[str, Callable[[], Awaitable[Optional[str]]], float]] = [
+            ("user_context", self._ctx_user_context, budget),
+        ]
         if include_recent:
-            recent = await self.list_recent_messages(limit=recent_limit)
-            if recent:
-                lines: List[str] = []
-                for m in recent:
-                    role = (m.get("role") or "").strip() if isinstance(m, dict) else ""
-                    content = (m.get("content") or "").strip() if isinstance(m, dict) else ""
-                    if not content:
-                        continue
-                    content = str(content).strip()
-                    if len(content) > 2000:
-                        content = content[:2000] + " …"
-                    lines.append(f"{role}: {content}")
-                if lines:
-                    parts.append("Recent conversation:\n" + "\n".join(lines))
-        return "\n\n".join(parts)
+            jobs.append(("recent", lambda: self._ctx_recent(recent_limit), budget))
+        for name, (fn, t) in self._context_sources.items():
+            jobs.append((name, fn, t if t is not None else budget))
+
+        async def _one(fn: Callable[[], Awaitable[Optional[str]]], t: float) -> Optional[str]:
+            return await asyncio.wait_for(fn(), timeout=t)
+
+        with timed("context"):
+            results = await asyncio.gather(*(_one(fn, t) for _, fn, t in jobs), return_exceptions=True)
+
+        parts: List[str] = []
+        used: List[str] = []
+        dropped: List[str] = []
+        for (name, _, _), res in zip(jobs, results):
+            if isinstance(res, BaseException):
+                logger.debug("build_context: source {} dropped ({})", name, type(res).__name__)
+                dropped.append(name)
+                continue
+            if res:
+                parts.append(str(res))
+                used.append(name)
+        return {"block": "\n\n".join(parts), "sources": used, "dropped": dropped}
+
+    async def build_context_block(self, *, include_recent: bool = True, recent_limit: int = 10) -> str:
+        res = await self.build_context(include_recent=include_recent, recent_limit=recent_limit)
+        return res["block"]
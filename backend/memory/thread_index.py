@@ -0,0 +1,242 @@
+"""
+ThreadSearchIndex
+-----------------
+Inkrementeller invertierter Index für die Thread-Suche (`scope: "thread"`).
+
+- Postings term → {doc_id: tf}, BM25-Ranking (k1/b klassisch)
+- Multi-Term-Queries; Präfix-Treffer (`deplo` → `deployment`) mit reduziertem Gewicht
+- Teilstring-Treffer (alte Suchsemantik, auch innerhalb von Wörtern) über die neuesten
+  `substring_scan` Nachrichten werden vor den reinen BM25-Treffern geliefert
+- Rollenfilter, „Merke:“-Ausschluss, Dedupe, Cursor-Paging
+- Persistenz als Append-only-JSONL pro Thread → kein Remote-Rebuild nach Restart;
+  `add(..., defer=True)` puffert Log-Zeilen, `flush()` schreibt sie (z. B. im Worker-Thread)
+"""
+from __future__ import annotations
+
+import json
+import math
+import os
+import re
+import threading
+from bisect import bisect_left, insort
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+_SAFE_RE = re.compile(r"[^A-Za-z0-9_.-]")
+
+K1 = 1.2
+B = 0.75
+PREFIX_WEIGHT = 0.6
+MIN_PREFIX = 2
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN_RE.findall((text or "").casefold())
+
+
+class ThreadSearchIndex:
+    def __init__(self, path: Optional[str] = None) -> None:
+        self._path = path
+        self._docs: List[Tuple[str, str, Any]] = []    # doc_id → (role, content, ts)
+        self._lens: List[int] = []
+        self._postings: Dict[str, Dict[int, int]] = {}
+        self._terms: List[str] = []                     # sortiert, für Präfix-Suche
+        self._total_len = 0
+        self._pending: List[Dict[str, Any]] = []       # noch nicht geschriebene Log-Zeilen
+        self._io_lock = threading.Lock()
+        self.backfilled = False
+        if path and os.path.exists(path):
+            self._load(path)
+
+    # -------------------------
+    # Persistenz
+    # -------------------------
+    def _load(self, path: str) -> None:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    continue  # abgeschnittene letzte Zeile nach Crash
+                if rec.get("backfilled"):
+                    self.backfilled = True
+                    continue
+                self._add(str(rec.get("r") or ""), str(rec.get("c") or ""), rec.get("ts"))
+
+    def _append_log(self, recs: Iterable[Dict[str, Any]]) -> None:
+        if not self._path:
+            return
+        os.makedirs(os.path.dirname(self._path) or ".", exist_ok=True)
+        with open(self._path, "a", encoding="utf-8") as f:
+            for rec in recs:
+                f.write(json.dumps(rec, ensure_ascii=False, default=str) + "\n")
+
+    # -------------------------
+    # Schreiben
+    # -------------------------
+    def _add(self, role: str, content: str, ts: Any) -> int:
+        doc_id = len(self._docs)
+        toks = tokenize(content)
+        self._docs.append((role, content, ts))
+        self._lens.append(len(toks))
+        self._total_len += len(toks)
+        tf: Dict[str, int] = {}
+        for t in toks:
+            tf[t] = tf.get(t, 0) + 1
+        for t, n in tf.items():
+            post = self._postings.get(t)
+            if post is None:
+                post = self._postings[t] = {}
+                insort(self._terms, t)
+            post[doc_id] = n
+        return doc_id
+
+    def add(self, role: str, content: str, ts: Any = None, *, defer: bool = False) -> None:
+        if not content:
+            return
+        self._add(role, content, ts)
+        rec = {"r": role, "c": content, "ts": ts}
+        if defer:
+            with self._io_lock:
+                self._pending.append(rec)
+        else:
+            self._append_log([rec])
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def flush(self) -> int:
+        """Gepufferte Log-Zeilen anhängen (Reihenfolge bleibt erhalten); Rückgabe = Anzahl."""
+        with self._io_lock:
+            recs, self._pending = self._pending, []
+            if recs:
+                self._append_log(recs)
+        return len(recs)
+
+    def add_many(self, msgs: Iterable[Dict[str, Any]], *, backfilled: bool = False) -> None:
+        recs: List[Dict[str, Any]] = []
+        for m in msgs:
+            content = str(m.get("content") or "")
+            if not content:
+                continue
+            role = str(m.get("role") or "")
+            self._add(role, content, m.get("ts"))
+            recs.append({"r": role, "c": content, "ts": m.get("ts")})
+        if backfilled:
+            self.backfilled = True
+            recs.append({"backfilled": True})
+        self._append_log(recs)
+
+    def reset(self) -> None:
+        """Index leeren (auch auf Platte), z. B. vor einem vollständigen Backfill."""
+        self._docs.clear()
+        self._lens.clear()
+        self._postings.clear()
+        self._terms.clear()
+        self._total_len = 0
+        self.backfilled = False
+        if self._path and os.path.exists(self._path):
+            os.remove(self._path)
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    # -------------------------
+    # Suche
+    # -------------------------
+    def _expand(self, term: str) -> List[Tuple[str, float]]:
+        out: List[Tuple[str, float]] = []
+        if term in self._postings:
+            out.append((term, 1.0))
+        if len(term) >= MIN_PREFIX:
+            i = bisect_left(self._terms, term)
+            while i < len(self._terms) and self._terms[i].startswith(term):
+                if self._terms[i] != term:
+                    out.append((self._terms[i], PREFIX_WEIGHT))
+                i += 1
+        return out
+
+    def _score(self, query: str) -> List[Tuple[float, int]]:
+        n = len(self._docs)
+        if not n:
+            return []
+        terms = tokenize(query)
+        if not terms:
+            # Leere Query → neueste zuerst
+            return [(0.0, d) for d in range(n - 1, -1, -1)]
+        avgdl = self._total_len / n if n else 1.0
+        scores: Dict[int, float] = {}
+        for qt in dict.fromkeys(terms):
+            for term, w in self._expand(qt):
+                post = self._postings[term]
+                idf = math.log(1.0 + (n - len(post) + 0.5) / (len(post) + 0.5))
+                for doc_id, tf in post.items():
+                    dl = self._lens[doc_id] or 1
+                    s = idf * (tf * (K1 + 1)) / (tf + K1 * (1 - B + B * dl / (avgdl or 1.0)))
+                    scores[doc_id] = scores.get(doc_id, 0.0) + w * s
+        # Score absteigend, bei Gleichstand neuere zuerst
+        return sorted(((sc, d) for d, sc in scores.items()), key=lambda t: (-t[0], -t[1]))
+
+    def _substring_first(self, query: str, ranked: List[Tuple[float, int]], scan: int) -> List[Tuple[float, int]]:
+        """Teilstring-Treffer der neuesten `scan` Nachrichten (neueste zuerst) vor die BM25-Rangliste."""
+        q = (query or "").strip().casefold()
+        n = len(self._docs)
+        if not q or not n or scan <= 0:
+            return ranked
+        hits = [d for d in range(n - 1, max(-1, n - 1 - scan), -1) if q in self._docs[d][1].casefold()]
+        if not hits:
+            return ranked
+        bm25 = {d: sc for sc, d in ranked}
+        head = set(hits)
+        return [(bm25.get(d, 0.0), d) for d in hits] + [(sc, d) for sc, d in ranked if d not in head]
+
+    def search(
+        self,
+        query: str,
+        *,
+        limit: int = 5,
+        roles: Optional[Set[str]] = None,
+        exclude_notes: bool = False,
+        dedupe: bool = True,
+        cursor: Optional[str] = None,
+        substring_scan: int = 0,
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Rückgabe: (Treffer, next_cursor). Der Cursor ist ein opakes Offset in die Rangliste."""
+        try:
+            start = max(0, int(cursor)) if cursor else 0
+        except ValueError:
+            start = 0
+        ranked = self._substring_first(query, self._score(query), substring_scan)
+        seen: Set[str] = set()
+        results: List[Dict[str, Any]] = []
+        pos = 0
+        next_cursor: Optional[str] = None
+        for sc, doc_id in ranked:
+            role, text, ts = self._docs[doc_id]
+            if roles and role.lower() not in roles:
+                continue
+            if exclude_notes and text.strip().lower().startswith("merke:"):
+                continue
+            key = text.strip().casefold()
+            if dedupe:
+                if key in seen:
+                    continue
+                seen.add(key)
+            if pos >= start:
+                if len(results) >= limit:
+                    next_cursor = str(pos)
+                    break
+                results.append({"role": role or "user", "content": text, "ts": ts, "score": round(sc, 4)})
+            pos += 1
+        return results, next_cursor
+
+
+def index_path(base_dir: str, thread_id: str) -> str:
+    return os.path.join(base_dir, _SAFE_RE.sub("_", thread_id) + ".jsonl")
+
+
+__all__ = ["ThreadSearchIndex", "index_path", "tokenize"]
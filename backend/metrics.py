@@ -0,0 +1,202 @@
+"""
+Metrics
+-------
+Leichtgewichtige Latenz-Histogramme pro Phase des Chat-Pfads (ohne externe Abhängigkeit).
+
+- `timed("llm")` misst einen Block (sync/async nutzbar, da reiner Context-Manager)
+- Labels `route` / `engine` kommen aus einem ContextVar (`metric_labels(...)`),
+  damit tiefe Schichten (Memory, LLM-Client) nichts über die Route wissen müssen
+- Export im Prometheus-Textformat: Histogramm (bucket/sum/count) + p50/p95/p99
+  aus einem begrenzten Reservoir der letzten Messwerte
+- weitere Familien (eigener Metrikname, z. B. ZEP-Mirror-Lag) über `register`;
+  `/metrics` rendert alle registrierten Familien (`render_prometheus`)
+- Ereignisse ohne Dauer (Fallback-Zweig, Client-Disconnect) zählt `EVENTS` als Counter
+  statt 0-Sekunden-Messwerten in den Histogrammen
+"""
+from __future__ import annotations
+
+import bisect
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Deque, Dict, Iterator, List, Optional, Tuple, TypeVar, Union
+
+BUCKETS: Tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+QUANTILES: Tuple[float, ...] = (0.5, 0.95, 0.99)
+RESERVOIR = 1024
+METRIC = "gateway_chat_phase_seconds"
+
+_LABELS: ContextVar[Dict[str, str]] = ContextVar("metric_labels", default={})
+
+LabelKey = Tuple[str, str, str]  # (phase, route, engine)
+
+
+class _Histogram:
+    __slots__ = ("counts", "total", "n", "recent")
+
+    def __init__(self) -> None:
+        self.counts: List[int] = [0] * (len(BUCKETS) + 1)
+        self.total = 0.0
+        self.n = 0
+        self.recent: Deque[float] = deque(maxlen=RESERVOIR)
+
+    def observe(self, v: float) -> None:
+        self.counts[bisect.bisect_left(BUCKETS, v)] += 1
+        self.total += v
+        self.n += 1
+        self.recent.append(v)
+
+    def quantile(self, q: float) -> float:
+        if not self.recent:
+            return 0.0
+        xs = sorted(self.recent)
+        return xs[min(len(xs) - 1, int(q * len(xs)))]
+
+
+class PhaseMetrics:
+    def __init__(
+        self,
+        name: str = METRIC,
+        *,
+        help: str = "Latenz der Chat-Pfad-Phasen in Sekunden.",
+        phase_label: str = "phase",
+    ) -> None:
+        self.name = name
+        self.help = help
+        self.phase_label = phase_label
+        self._lock = threading.Lock()
+        self._hists: Dict[LabelKey, _Histogram] = {}
+
+    def observe(self, phase: str, seconds: float, *, route: Optional[str] = None, engine: Optional[str] = None) -> None:
+        ctx = _LABELS.get()
+        key = (phase, route or ctx.get("route", ""), engine or ctx.get("engine", ""))
+        with self._lock:
+            h = self._hists.get(key)
+            if h is None:
+                h = self._hists[key] = _Histogram()
+            h.observe(seconds)
+
+    @contextmanager
+    def timed(self, phase: str, **labels: str) -> Iterator[None]:
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(phase, time.perf_counter() - t0, **labels)
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """Kompakte Sicht (z. B. für _diag): {"phase|route|engine": {count, p50, p95, p99}}."""
+        with self._lock:
+            return {
+                "|".join(k): {
+                    "count": h.n,
+                    **{f"p{int(q * 100)}": round(h.quantile(q), 4) for q in QUANTILES},
+                }
+                for k, h in self._hists.items()
+            }
+
+    def render_prometheus(self) -> str:
+        name = self.name
+        lines: List[str] = [
+            f"# HELP {name} {self.help}",
+            f"# TYPE {name} histogram",
+        ]
+        qlines: List[str] = [
+            f"# HELP {name}_quantile Quantile der letzten {RESERVOIR} Messwerte je {self.phase_label}.",
+            f"# TYPE {name}_quantile gauge",
+        ]
+        with self._lock:
+            items = sorted(self._hists.items())
+            for (phase, route, engine), h in items:
+                base = f'{self.phase_label}="{_esc(phase)}",route="{_esc(route)}",engine="{_esc(engine)}"'
+                cum = 0
+                for le, c in zip(BUCKETS, h.counts):
+                    cum += c
+                    lines.append(f'{name}_bucket{{{base},le="{le}"}} {cum}')
+                lines.append(f'{name}_bucket{{{base},le="+Inf"}} {h.n}')
+                lines.append(f"{name}_sum{{{base}}} {h.total:.6f}")
+                lines.append(f"{name}_count{{{base}}} {h.n}")
+                for q in QUANTILES:
+                    qlines.append(f'{name}_quantile{{{base},quantile="{q}"}} {h.quantile(q):.6f}')
+        return "\n".join(lines + qlines) + "\n"
+
+
+class EventCounters:
+    """Monoton steigende Zähler je (event, route, engine); Labels wie bei `PhaseMetrics`."""
+
+    def __init__(self, name: str = "gateway_chat_events_total", *, help: str = "Ereignisse im Chat-Pfad.") -> None:
+        self.name = name
+        self.help = help
+        self._lock = threading.Lock()
+        self._counts: Dict[LabelKey, int] = {}
+
+    def inc(self, event: str, n: int = 1, *, route: Optional[str] = None, engine: Optional[str] = None) -> None:
+        ctx = _LABELS.get()
+        key = (event, route or ctx.get("route", ""), engine or ctx.get("engine", ""))
+        with self._lock:
+            self._counts[key] = self._counts.get(key, 0) + n
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return {"|".join(k): v for k, v in self._counts.items()}
+
+    def render_prometheus(self) -> str:
+        lines: List[str] = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for (event, route, engine), v in sorted(self._counts.items()):
+                lines.append(f'{self.name}{{event="{_esc(event)}",route="{_esc(route)}",engine="{_esc(engine)}"}} {v}')
+        return "\n".join(lines) + "\n"
+
+
+def _esc(v: str) -> str:
+    return v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+@contextmanager
+def metric_labels(**labels: str) -> Iterator[None]:
+    """Setzt route/engine für alle Messungen im aktuellen (async) Kontext."""
+    token = _LABELS.set({**_LABELS.get(), **labels})
+    try:
+        yield
+    finally:
+        _LABELS.reset(token)
+
+
+def set_metric_labels(**labels: str) -> None:
+    """Wie `metric_labels`, aber ohne Reset (für Verzweigungen innerhalb eines Requests)."""
+    _LABELS.set({**_LABELS.get(), **labels})
+
+
+_Family = TypeVar("_Family", PhaseMetrics, EventCounters)
+_FAMILIES: List[Union[PhaseMetrics, EventCounters]] = []
+
+
+def register(family: _Family) -> _Family:
+    """Familie für den `/metrics`-Export anmelden."""
+    _FAMILIES.append(family)
+    return family
+
+
+def render_prometheus() -> str:
+    """Alle registrierten Familien im Prometheus-Textformat."""
+    return "".join(f.render_prometheus() for f in _FAMILIES)
+
+
+# Prozessweite Instanzen
+METRICS = register(PhaseMetrics())
+timed = METRICS.timed
+EVENTS = register(EventCounters())
+
+# ZEP-Mirror: Enqueue→Send-Latenz je Ziel (thread/graph), bewusst nicht unter den Chat-Phasen
+MIRROR_LAG = register(PhaseMetrics(
+    "gateway_zep_mirror_lag_seconds",
+    help="Enqueue→Send-Latenz des ZEP-Mirrors in Sekunden.",
+    phase_label="target",
+))
+
+__all__ = [
+    "METRICS", "MIRROR_LAG", "EVENTS", "PhaseMetrics", "EventCounters", "timed", "metric_labels", "set_metric_labels",
+    "register", "render_prometheus",
+]
@@ -19,14 +19,22 @@ def _split_semis(s: str | None):
     return [x.strip() for x in s.split(";") if x.strip()]
 
 # -------- Orchestrator REST --------
-def start(goal, deliverables=None, constraints=None, nested=False):
+def start(goal, deliverables=None, constraints=None, nested=False, priority=0, retries=3):
     payload = {
         "goal": goal,
         "deliverables": deliverables or [],
         "constraints": constraints or [],
         "nested": nested,
+        "priority": priority,
     }
     r = httpx.post(f"{BASE}/start", json=payload, timeout=30)
+    # Run-Queue voll → Retry-After respektieren
+    while r.status_code == 429 and retries > 0:
+        wait = int(r.headers.get("Retry-After", "2") or 2)
+        print(f"[Orch] queue full, retry in {wait}s")
+        time.sleep(wait)
+        retries -= 1
+        r = httpx.post(f"{BASE}/start", json=payload, timeout=30)
     r.raise_for_status()
     return r.json()
 
@@ -35,6 +43,56 @@ def status(run_id):
     r.raise_for_status()
     return r.json()
 
+def cancel(run_id, reason=None):
+    r = httpx.post(f"{BASE}/cancel", json={"run_id": run_id, "reason": reason}, timeout=30)
+    r.raise_for_status()
+    return r.json()
+
+def follow(run_id, offset=0):
+    """Folgt dem SSE-Event-Stream eines Runs bis `run_done`; Rückgabe = Result-Record."""
+    url = f"{BASE}/runs/{run_id}/events"
+    event, result = None, None
+    with httpx.stream("GET", url, params={"offset": offset}, headers={"Accept": "text/event-stream"},
+                      timeout=httpx.Timeout(30, read=None)) as r:
+        r.raise_for_status()
+        for line in r.iter_lines():
+            if line.startswith("event:"):
+                event = line[6:].strip()
+            elif line.startswith("data:"):
+                ev = json.loads(line[5:].strip())
+                data = ev.get("data") or {}
+                if event == "step_out":
+                    print(f"[{data.get('role')}] {data.get('content')}")
+                elif event == "run_done":
+                    result = data
+                    print(json.dumps(data, ensure_ascii=False))
+                    break
+                else:
+                    print(f"[Orch] {event}: {json.dumps(data, ensure_ascii=False)}")
+    return result
+
+def _follow_or_poll(run_id):
+    print("[Orch] following events... (Ctrl+C to stop)")
+    try:
+        follow(run_id)
+        return
+    except KeyboardInterrupt:
+        print("Aborted by user."); return
+    except Exception as e:
+        print(f"[Orch] event stream unavailable ({e}), polling status...")
+    # Fallback: Polling (ältere Server ohne Event-Stream)
+    try:
+        while True:
+            time.sleep(2)
+            st = status(run_id)
+            print(json.dumps(st, ensure_ascii=False))
+            if st.get("state") == "done":
+                break
+    except KeyboardInterrupt:
+        print("Aborted by user.")
+    except Exception as e:
+        print(f"[Error] {e}")
+
 def diag():
     try:
         r = httpx.get(f"{BASE}/_diag", timeout=10)
@@ -87,18 +145,7 @@ def chat_loop():
             goal = line.split(" ", 1)[1].strip()
             s = start(goal, deliverables=[], constraints=[], nested=False)
             run_id = s.get("run_id"); print(f"[Orch] run_id={run_id}")
-            print("[Orch] polling status... (Ctrl+C to stop)")
-            try:
-                while True:
-                    time.sleep(2)
-                    st = status(run_id)
-                    print(json.dumps(st, ensure_ascii=False))
-                    if st.get("result", {}).get("success") is True:
-                        break
-            except KeyboardInterrupt:
-                print("Aborted by user.")
-            except Exception as e:
-                print(f"[Error] {e}")
+            _follow_or_poll(run_id)
             continue
 
         # Default: CHAT
@@ -130,6 +177,9 @@ def main():
     # Status/Diag/Health
     p_status = sub.add_parser("status", help="Status eines Runs abfragen")
     p_status.add_argument("run_id")
+    p_cancel = sub.add_parser("cancel", help="Run (oder Batch) abbrechen")
+    p_cancel.add_argument("run_id")
+    p_cancel.add_argument("--reason")
     sub.add_parser("diag", help="Diagnose")
     p_health = sub.add_parser("health", help="ZEP-Health (optional --deep)")
     p_health.add_argument("--deep", action="store_true")
@@ -151,19 +201,11 @@ def main():
         print(f"[Orch] start: goal='{args.goal}' nested={args.nested}")
         s = start(args.goal, deliverables=dels, constraints=cons, nested=args.nested)
         run_id = s.get("run_id"); print(f"[Orch] run_id={run_id}")
-        print("[Orch] polling status... (Ctrl+C to stop)")
-        while True:
-            time.sleep(2)
-            try:
-                st = status(run_id); print(json.dumps(st, ensure_ascii=False))
-                if st.get("result", {}).get("success") is True:
-                    break
-            except KeyboardInterrupt:
-                print("Aborted by user."); break
-            except Exception as e:
-                print(f"[Error] {e}"); break
+        _follow_or_poll(run_id)
     elif args.cmd == "status":
         st = status(args.run_id); print(json.dumps(st, ensure_ascii=False, indent=2))
+    elif args.cmd == "cancel":
+        res = cancel(args.run_id, reason=args.reason); print(json.dumps(res, ensure_ascii=False, indent=2))
     elif args.cmd == "diag":
         diag()
     elif args.cmd == "health":
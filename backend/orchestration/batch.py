@@ -0,0 +1,43 @@
+"""
+Batch-Planung
+-------------
+Mehrere Planner-Prompts in **einem** LLM-Request bündeln und die Pläne wieder aufteilen.
+
+- `pack_planner_prompts`: nummerierte Aufgaben + feste Antwort-Marker (`### PLAN <n>`)
+- `split_packed_plans`: Antwort an den Markern zerlegen; fehlende/leere Abschnitte → None
+  (der Ticket-Run plant dann einzeln wie bisher)
+"""
+from __future__ import annotations
+
+import re
+from typing import List, Optional, Sequence
+
+_MARKER_RE = re.compile(r"^\s*#{2,}\s*PLAN\s+(\d+)\s*:?\s*$", re.IGNORECASE | re.MULTILINE)
+
+_HEADER = (
+    "Du erhältst {n} voneinander unabhängige Planungsaufgaben.\n"
+    "Bearbeite jede Aufgabe separat. Beginne jede Antwort mit einer eigenen Zeile "
+    "'### PLAN <Nummer>' (z. B. '### PLAN 1') und gib danach nur den Plan aus.\n\n"
+)
+
+
+def pack_planner_prompts(prompts: Sequence[str]) -> str:
+    parts = [_HEADER.format(n=len(prompts))]
+    for i, p in enumerate(prompts, start=1):
+        parts.append(f"=== AUFGABE {i} ===\n{p.strip()}\n\n")
+    return "".join(parts).rstrip() + "\n"
+
+
+def split_packed_plans(text: str, n: int) -> List[Optional[str]]:
+    out: List[Optional[str]] = [None] * n
+    matches = list(_MARKER_RE.finditer(text or ""))
+    for k, m in enumerate(matches):
+        idx = int(m.group(1)) - 1
+        end = matches[k + 1].start() if k + 1 < len(matches) else len(text)
+        body = text[m.end():end].strip()
+        if 0 <= idx < n and body and out[idx] is None:
+            out[idx] = body
+    return out
+
+
+__all__ = ["pack_planner_prompts", "split_packed_plans"]
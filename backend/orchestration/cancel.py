@@ -0,0 +1,213 @@
+"""
+Cancel-Tokens
+-------------
+Abbruch und Gesamt-Deadline für Orchestrierungs-Runs (/api/orch/cancel, Client-Disconnect).
+
+- `CancelToken`: thread-safe Flag + Grund + optionale Deadline (monotonic)
+  - Sync-Pipeline (Worker-Thread): prüft an Checkpoints (`check()` → `RunCancelled`)
+  - Async-Pipeline: angehängte Tasks werden bei `cancel()` sofort abgebrochen
+  - LLM-Client begrenzt Timeouts auf die Restzeit (`clamp`)
+- `run_cancellable`: Coroutine als eigenen Task starten, Token anhängen, Deadline scharf schalten
+- ContextVar `current_token()` für Aufrufer ohne expliziten Token (z. B. `Impl.run`)
+- `RUN_CANCELS`: prozessweite Registry run_id → Token
+
+ENV: ORCH_RUN_DEADLINE (Sekunden pro Run, default 0 = keine Deadline; gilt für /start, /batch
+     und /chat, sofern der Request kein eigenes `deadline_s` setzt)
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Dict, Iterator, Optional, Set, TypeVar
+
+T = TypeVar("T")
+
+_CURRENT: ContextVar[Optional["CancelToken"]] = ContextVar("orch_cancel_token", default=None)
+
+
+class RunCancelled(Exception):
+    def __init__(self, reason: str = "cancelled") -> None:
+        super().__init__(reason)
+        self.reason = reason
+
+
+class CancelToken:
+    def __init__(self, *, timeout: Optional[float] = None) -> None:
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._tasks: Set["asyncio.Task[Any]"] = set()
+        self.reason: Optional[str] = None
+        self.deadline: Optional[float] = None
+        if timeout:
+            self.arm(timeout)
+
+    # -------------------------
+    # Zustand
+    # -------------------------
+    def arm(self, timeout: Optional[float]) -> None:
+        """Deadline ab jetzt setzen (None/0 → keine)."""
+        self.deadline = time.monotonic() + timeout if timeout and timeout > 0 else None
+
+    @property
+    def cancelled(self) -> bool:
+        if self._event.is_set():
+            return True
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            self.cancel("deadline exceeded")
+            return True
+        return False
+
+    def remaining(self) -> Optional[float]:
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
+
+    def clamp(self, timeout: float) -> float:
+        """Timeout eines Einzel-Calls auf die Restzeit begrenzen."""
+        rest = self.remaining()
+        return timeout if rest is None else max(0.0, min(timeout, rest))
+
+    def check(self) -> None:
+        if self.cancelled:
+            raise RunCancelled(self.reason or "cancelled")
+
+    # -------------------------
+    # Abbruch
+    # -------------------------
+    def cancel(self, reason: str = "cancelled") -> bool:
+        """Idempotent; bricht angehängte Tasks ab (auch aus fremden Threads). False, wenn schon abgebrochen."""
+        with self._lock:
+            if self._event.is_set():
+                return False
+            self.reason = reason
+            self._event.set()
+            tasks = list(self._tasks)
+        for t in tasks:
+            try:
+                t.get_loop().call_soon_threadsafe(t.cancel)
+            except RuntimeError:
+                # Loop bereits geschlossen
+                pass
+        return True
+
+    def attach(self, task: "asyncio.Task[Any]") -> None:
+        with self._lock:
+            self._tasks.add(task)
+            already = self._event.is_set()
+        if already:
+            task.cancel()
+
+    def detach(self, task: "asyncio.Task[Any]") -> None:
+        with self._lock:
+            self._tasks.discard(task)
+
+
+# --- Kontext -------------------------------------------------------------------
+def current_token() -> Optional[CancelToken]:
+    return _CURRENT.get()
+
+
+@contextmanager
+def use_token(token: Optional[CancelToken]) -> Iterator[None]:
+    """Token für den aktuellen Kontext setzen (None → unverändert lassen)."""
+    if token is None:
+        yield
+        return
+    ctx = _CURRENT.set(token)
+    try:
+        yield
+    finally:
+        _CURRENT.reset(ctx)
+
+
+def check_cancelled(token: Optional[CancelToken] = None) -> None:
+    """Checkpoint: expliziter Token oder der aus dem Kontext."""
+    tok = token or _CURRENT.get()
+    if tok is not None:
+        tok.check()
+
+
+def default_deadline() -> Optional[float]:
+    try:
+        v = float(os.getenv("ORCH_RUN_DEADLINE", "0") or 0)
+    except ValueError:
+        v = 0.0
+    return v if v > 0 else None
+
+
+async def run_cancellable(aw: Awaitable[T], token: CancelToken, *, timeout: Optional[float] = None) -> T:
+    """
+    `aw` als eigenen Task ausführen, der bei `token.cancel()` bzw. nach `timeout` abgebrochen wird.
+    Abbruch durch den Token → `RunCancelled`; Abbruch des Aufrufers → CancelledError wie gewohnt
+    (Token wird dabei ebenfalls abgebrochen).
+    """
+    if timeout:
+        token.arm(timeout)
+    task = asyncio.ensure_future(aw)
+    token.attach(task)
+    handle = None
+    rest = token.remaining()
+    if rest is not None:
+        handle = asyncio.get_running_loop().call_later(rest, token.cancel, "deadline exceeded")
+    try:
+        return await task
+    except asyncio.CancelledError:
+        if token.cancelled and task.cancelled():
+            raise RunCancelled(token.reason or "cancelled") from None
+        # Aufrufer abgebrochen: Token setzen, damit auch eine Sync-Pipeline im Thread stoppt
+        token.cancel("caller cancelled")
+        raise
+    finally:
+        if handle is not None:
+            handle.cancel()
+        token.detach(task)
+
+
+# --- Registry ------------------------------------------------------------------
+class CancelRegistry:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._tokens: Dict[str, CancelToken] = {}
+        self._stats: Dict[str, int] = {"registered": 0, "cancelled": 0, "deadline": 0}
+
+    def register(self, run_id: str, token: Optional[CancelToken] = None) -> CancelToken:
+        tok = token or CancelToken()
+        with self._lock:
+            self._tokens[run_id] = tok
+            self._stats["registered"] += 1
+        return tok
+
+    def get(self, run_id: str) -> Optional[CancelToken]:
+        with self._lock:
+            return self._tokens.get(run_id)
+
+    def cancel(self, run_id: str, reason: str = "cancelled") -> bool:
+        tok = self.get(run_id)
+        if tok is None or not tok.cancel(reason):
+            return False
+        with self._lock:
+            self._stats["cancelled"] += 1
+        return True
+
+    def discard(self, run_id: str) -> None:
+        with self._lock:
+            tok = self._tokens.pop(run_id, None)
+            if tok is not None and (tok.reason or "").startswith("deadline"):
+                self._stats["deadline"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self._stats, "active": len(self._tokens)}
+
+
+RUN_CANCELS = CancelRegistry()
+
+
+__all__ = [
+    "CancelToken", "RunCancelled", "CancelRegistry", "RUN_CANCELS",
+    "current_token", "use_token", "check_cancelled", "default_deadline", "run_cancellable",
+]
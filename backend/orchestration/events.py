@@ -0,0 +1,174 @@
+"""
+RunEventBus
+-----------
+In-Process-Eventbus für Orchestrierungs-Runs (Workcell start/step_out/done, Run-Lifecycle).
+
+- Pro run_id ein begrenztes, geordnetes Event-Log mit absoluten Offsets
+  → späte Subscriber können ab Offset nachspielen (Replay)
+- `publish` ist thread-safe (Sync-Pipeline im Threadpool), Subscriber werden
+  über ihren Event-Loop geweckt (`call_soon_threadsafe`)
+- LRU über Runs + Limit pro Run → Speicher bleibt begrenzt
+
+ENV: ORCH_EVENTS_MAX_RUNS (default 256), ORCH_EVENTS_MAX_PER_RUN (default 512)
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+# Events, nach denen ein Run-Stream endet
+TERMINAL = frozenset({"run_done"})
+
+
+@dataclass
+class _RunLog:
+    events: List[Dict[str, Any]] = field(default_factory=list)
+    base: int = 0                  # absoluter Offset von events[0]
+    closed: bool = False
+    waiters: List[Tuple[asyncio.AbstractEventLoop, asyncio.Event]] = field(default_factory=list)
+
+    @property
+    def end(self) -> int:
+        return self.base + len(self.events)
+
+
+class RunEventBus:
+    def __init__(self, *, max_runs: int = 256, max_per_run: int = 512) -> None:
+        self.max_runs = max(1, max_runs)
+        self.max_per_run = max(1, max_per_run)
+        self._lock = threading.Lock()
+        self._logs: "OrderedDict[str, _RunLog]" = OrderedDict()
+        self._stats: Dict[str, int] = {"published": 0, "subscribers": 0, "evicted_runs": 0}
+
+    @classmethod
+    def from_env(cls) -> "RunEventBus":
+        return cls(
+            max_runs=int(os.getenv("ORCH_EVENTS_MAX_RUNS", "256")),
+            max_per_run=int(os.getenv("ORCH_EVENTS_MAX_PER_RUN", "512")),
+        )
+
+    # -------------------------
+    # Publish
+    # -------------------------
+    def publish(self, run_id: str, type: str, data: Optional[Dict[str, Any]] = None) -> int:
+        """Hängt ein Event an und weckt Subscriber; Rückgabe = Offset des Events."""
+        with self._lock:
+            log = self._log(run_id)
+            offset = log.end
+            log.events.append({"offset": offset, "run_id": run_id, "type": type, "ts": time.time(), "data": data or {}})
+            if len(log.events) > self.max_per_run:
+                drop = len(log.events) - self.max_per_run
+                del log.events[:drop]
+                log.base += drop
+            if type in TERMINAL:
+                log.closed = True
+            waiters, log.waiters = log.waiters, []
+            self._stats["published"] += 1
+        for loop, ev in waiters:
+            try:
+                loop.call_soon_threadsafe(ev.set)
+            except RuntimeError:
+                pass  # Loop bereits geschlossen
+        return offset
+
+    # -------------------------
+    # Subscribe
+    # -------------------------
+    def known(self, run_id: str) -> bool:
+        with self._lock:
+            return run_id in self._logs
+
+    async def subscribe(
+        self,
+        run_id: str,
+        offset: int = 0,
+        *,
+        heartbeat: Optional[float] = None,
+        create: bool = False,
+    ) -> AsyncIterator[Optional[Dict[str, Any]]]:
+        """
+        Liefert Events ab `offset` (Replay) und danach live, bis ein Terminal-Event kam.
+        Mit `heartbeat` wird nach so vielen Sekunden Stille `None` geliefert (Keep-Alive).
+        Unbekannte run_id → sofort leer; nur mit `create=True` (Run ist anderweitig bekannt,
+        hat aber noch nichts publiziert) wird ein Log angelegt.
+        """
+        loop = asyncio.get_running_loop()
+        pos = max(0, offset)
+        with self._lock:
+            # Referenz halten: Verdrängung schließt genau dieses Log
+            log = self._logs.get(run_id)
+            if log is None:
+                if not create:
+                    return
+                log = self._log(run_id)
+            self._stats["subscribers"] += 1
+        try:
+            while True:
+                with self._lock:
+                    start = max(pos, log.base)
+                    batch = log.events[start - log.base:]
+                    done = log.closed
+                    ev: Optional[asyncio.Event] = None
+                    if not batch and not done:
+                        ev = asyncio.Event()
+                        log.waiters.append((loop, ev))
+                for e in batch:
+                    yield e
+                    pos = e["offset"] + 1
+                if batch:
+                    continue
+                if done:
+                    return
+                assert ev is not None
+                try:
+                    await asyncio.wait_for(ev.wait(), timeout=heartbeat)
+                except asyncio.TimeoutError:
+                    with self._lock:
+                        if (loop, ev) in log.waiters:
+                            log.waiters.remove((loop, ev))
+                    yield None
+        finally:
+            with self._lock:
+                self._stats["subscribers"] -= 1
+
+    def last_type(self, run_id: str) -> Optional[str]:
+        """Typ des letzten Events eines Runs (ohne LRU-Effekt), None wenn unbekannt."""
+        with self._lock:
+            log = self._logs.get(run_id)
+            return log.events[-1]["type"] if log and log.events else None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self._stats, "runs": len(self._logs), "max_runs": self.max_runs}
+
+    # -------------------------
+    # Intern
+    # -------------------------
+    def _log(self, run_id: str) -> _RunLog:
+        log = self._logs.get(run_id)
+        if log is None:
+            log = self._logs[run_id] = _RunLog()
+            while len(self._logs) > self.max_runs:
+                _, old = self._logs.popitem(last=False)
+                self._stats["evicted_runs"] += 1
+                # wartende Subscriber eines verdrängten Runs nicht hängen lassen
+                old.closed = True
+                for lp, e in old.waiters:
+                    try:
+                        lp.call_soon_threadsafe(e.set)
+                    except RuntimeError:
+                        pass
+        else:
+            self._logs.move_to_end(run_id)
+        return log
+
+
+# Prozessweite Instanz (WorkcellIO publiziert hierhin, /api/orch/runs/{id}/events liest)
+RUN_EVENTS = RunEventBus.from_env()
+
+__all__ = ["RunEventBus", "RUN_EVENTS", "TERMINAL"]
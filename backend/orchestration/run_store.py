@@ -0,0 +1,288 @@
+"""
+RunStore
+--------
+Begrenzte, persistente Run-Registry für /api/orch (ersetzt das frühere `_RUNS`-Dict).
+
+- Vorne: In-Memory-LRU mit TTL und Größenlimit → O(1)-Lookups für frische Runs
+- Hinten: SQLite (WAL, PRIMARY KEY run_id) → übersteht `--reload`/Restarts und
+  ist für alle Worker-Prozesse sichtbar
+- Platten-Retention: alte Runs werden periodisch gelöscht → Speicher bleibt flach
+- Write-Behind: `put` aktualisiert nur Cache + Pending-Map; INSERT und Retention laufen
+  in einem Writer-Thread (mehrfache Updates eines Runs werden zusammengefasst).
+  Cache-Misses gehen in async Handlern über `aget` → `asyncio.to_thread`
+
+ENV:
+  ORCH_RUN_DB          (default data/runs.sqlite3; "" → nur In-Memory)
+  ORCH_RUN_CACHE_MAX   (Einträge im Speicher, default 256)
+  ORCH_RUN_CACHE_TTL   (Sekunden im Speicher, default 600)
+  ORCH_RUN_RETENTION   (Sekunden auf Platte, default 7 Tage)
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from loguru import logger
+
+_PRUNE_EVERY = 200  # Schreibvorgänge zwischen zwei Retention-Läufen
+
+
+class RunStore:
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        *,
+        cache_max: int = 256,
+        cache_ttl: float = 600.0,
+        retention: float = 7 * 86400.0,
+    ) -> None:
+        self.path = path or None
+        self.cache_max = max(1, cache_max)
+        self.cache_ttl = cache_ttl
+        self.retention = retention
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()          # SQLite-Zugriffe; Cache-Hits warten nie darauf
+        self._cache: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._db: Optional[sqlite3.Connection] = None
+        self._writes = 0
+        # run_id -> (updated, record, json) noch nicht geschrieben; Einfüge-Reihenfolge = Schreib-Reihenfolge
+        self._pending: "OrderedDict[str, Tuple[float, Dict[str, Any], str]]" = OrderedDict()
+        self._wake = threading.Condition(self._lock)
+        self._writing = False
+        self._writer: Optional[threading.Thread] = None
+        self._stats: Dict[str, int] = {"hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0, "pruned": 0}
+        if self.path:
+            try:
+                self._db = self._open(self.path)
+            except Exception as e:
+                logger.warning("RunStore: SQLite {} nicht nutzbar ({}), nur In-Memory", self.path, e)
+                self._db = None
+
+    @classmethod
+    def from_env(cls) -> "RunStore":
+        return cls(
+            os.getenv("ORCH_RUN_DB", os.path.join("data", "runs.sqlite3")),
+            cache_max=int(os.getenv("ORCH_RUN_CACHE_MAX", "256")),
+            cache_ttl=float(os.getenv("ORCH_RUN_CACHE_TTL", "600")),
+            retention=float(os.getenv("ORCH_RUN_RETENTION", str(7 * 86400))),
+        )
+
+    @staticmethod
+    def _open(path: str) -> sqlite3.Connection:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        db = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=5.0)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS runs ("
+            " run_id TEXT PRIMARY KEY,"
+            " updated REAL NOT NULL,"
+            " data TEXT NOT NULL)"
+        )
+        db.execute("CREATE INDEX IF NOT EXISTS runs_updated ON runs(updated)")
+        return db
+
+    # -------------------------
+    # API
+    # -------------------------
+    def put(self, run_id: str, record: Dict[str, Any]) -> None:
+        """Nicht blockierend: Cache sofort, Platte über den Writer-Thread."""
+        now = time.time()
+        data = json.dumps(record, ensure_ascii=False, default=str) if self._db is not None else ""
+        with self._lock:
+            self._cache[run_id] = (time.monotonic(), record)
+            self._cache.move_to_end(run_id)
+            self._evict()
+            if self._db is None:
+                return
+            self._pending.pop(run_id, None)
+            self._pending[run_id] = (now, record, data)
+            self._ensure_writer()
+            self._wake.notify()
+
+    def get(self, run_id: str) -> Optional[Dict[str, Any]]:
+        """Synchron (Threadpool/Tests); in async Handlern `aget` verwenden."""
+        found, rec = self._get_cached(run_id)
+        return rec if found else self._get_disk(run_id)
+
+    async def aget(self, run_id: str) -> Optional[Dict[str, Any]]:
+        """Cache-Hits direkt, SQLite-Lookup im Threadpool → Event-Loop blockiert nicht."""
+        found, rec = self._get_cached(run_id)
+        if found:
+            return rec
+        return await asyncio.to_thread(self._get_disk, run_id)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wartet, bis alle ausstehenden Schreibvorgänge auf Platte sind."""
+        end = None if timeout is None else time.monotonic() + timeout
+        with self._lock:
+            while self._pending or self._writing:
+                left = None if end is None else end - time.monotonic()
+                if left is not None and left <= 0:
+                    return False
+                self._wake.wait(left)
+        return True
+
+    def close(self) -> None:
+        self.flush(timeout=5.0)
+        with self._lock:
+            writer, self._writer = self._writer, None
+            db, self._db = self._db, None
+            self._wake.notify_all()
+        if writer is not None:
+            writer.join(timeout=5.0)
+        if db is not None:
+            with self._db_lock:
+                try:
+                    db.close()
+                except Exception:
+                    pass
+
+    def stats(self) -> Dict[str, Any]:
+        """Enthält ein SELECT COUNT → aus async Handlern per Threadpool aufrufen."""
+        rows = None
+        with self._db_lock:
+            if self._db is not None:
+                try:
+                    rows = self._db.execute("SELECT COUNT(*) FROM runs").fetchone()[0]
+                except Exception:
+                    rows = None
+        with self._lock:
+            return {
+                **self._stats,
+                "cached": len(self._cache),
+                "cache_max": self.cache_max,
+                "pending": len(self._pending),
+                "disk_rows": rows,
+                "path": self.path if self._db is not None else None,
+            }
+
+    # -------------------------
+    # Intern
+    # -------------------------
+    def _get_cached(self, run_id: str) -> Tuple[bool, Optional[Dict[str, Any]]]:
+        """(gefunden, Record) aus Cache bzw. Pending-Map; (False, None) → Platte fragen."""
+        with self._lock:
+            hit = self._cache.get(run_id)
+            if hit is not None:
+                ts, rec = hit
+                fresh = self.cache_ttl <= 0 or time.monotonic() - ts < self.cache_ttl
+                if fresh or self._db is None:
+                    self._cache.move_to_end(run_id)
+                    self._stats["hits"] += 1
+                    return True, rec
+                self._cache.pop(run_id, None)
+            pend = self._pending.get(run_id)
+            if pend is not None:
+                # verdrängt, aber noch nicht geschrieben
+                self._stats["hits"] += 1
+                return True, pend[1]
+            if self._db is None:
+                self._stats["misses"] += 1
+                return True, None
+        return False, None
+
+    def _get_disk(self, run_id: str) -> Optional[Dict[str, Any]]:
+        with self._db_lock:
+            if self._db is None:
+                row = None
+            else:
+                try:
+                    row = self._db.execute("SELECT data FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+                except Exception as e:
+                    logger.warning("RunStore: Lesen von {} fehlgeschlagen: {}", run_id, e)
+                    row = None
+        with self._lock:
+            if row is None:
+                pend = self._pending.get(run_id)
+                if pend is not None:
+                    # parallel per `put` angelegt
+                    self._stats["hits"] += 1
+                    return pend[1]
+                self._stats["misses"] += 1
+                return None
+            self._stats["disk_hits"] += 1
+        return json.loads(row[0])
+
+    def _ensure_writer(self) -> None:
+        # unter self._lock
+        if self._writer is None or not self._writer.is_alive():
+            self._writer = threading.Thread(target=self._write_loop, name="run-store-writer", daemon=True)
+            self._writer.start()
+
+    def _write_loop(self) -> None:
+        me = threading.current_thread()
+        while True:
+            with self._lock:
+                while not self._pending and self._writer is me:
+                    self._wake.wait()
+                if not self._pending:
+                    return      # close()
+                batch = list(self._pending.items())
+                self._pending.clear()
+                self._writing = True
+            try:
+                self._write_batch(batch)
+            finally:
+                with self._lock:
+                    self._writing = False
+                    self._wake.notify_all()
+
+    def _write_batch(self, batch: list) -> None:
+        with self._db_lock:
+            db = self._db
+            if db is None:
+                return
+            try:
+                db.execute("BEGIN")
+                db.executemany(
+                    "INSERT OR REPLACE INTO runs(run_id, updated, data) VALUES (?, ?, ?)",
+                    [(rid, now, data) for rid, (now, _, data) in batch],
+                )
+                db.execute("COMMIT")
+            except Exception as e:
+                try:
+                    db.execute("ROLLBACK")
+                except Exception:
+                    pass
+                logger.warning("RunStore: Schreiben von {} Runs fehlgeschlagen: {}", len(batch), e)
+                return
+            before = self._writes
+            self._writes += len(batch)
+            if self._writes // _PRUNE_EVERY != before // _PRUNE_EVERY:
+                try:
+                    self._prune(time.time())
+                except Exception as e:
+                    logger.warning("RunStore: Retention fehlgeschlagen: {}", e)
+
+    def _evict(self) -> None:
+        # Ohne Platte ist der Cache die einzige Kopie → nur nach Größe verdrängen
+        while len(self._cache) > self.cache_max:
+            self._cache.popitem(last=False)
+            self._stats["evictions"] += 1
+        if self._db is None or self.cache_ttl <= 0:
+            return
+        cutoff = time.monotonic() - self.cache_ttl
+        while self._cache:
+            rid, (ts, _) = next(iter(self._cache.items()))
+            if ts >= cutoff:
+                break
+            self._cache.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def _prune(self, now: float) -> None:
+        if self._db is None or self.retention <= 0:
+            return
+        # unter self._db_lock
+        cur = self._db.execute("DELETE FROM runs WHERE updated < ?", (now - self.retention,))
+        with self._lock:
+            self._stats["pruned"] += max(0, cur.rowcount or 0)
+
+
+__all__ = ["RunStore"]
@@ -0,0 +1,256 @@
+"""
+RunScheduler
+------------
+Begrenzte Ausführung von Orchestrierungs-Runs (/api/orch/start).
+
+- Feste Anzahl Worker (asyncio-Tasks) → planbarer Durchsatz unter Last
+- Bounded Priority-Queue; voll → `SchedulerFull` (Route antwortet 429 + Retry-After)
+- Fairness pro Aufrufer: virtuelle Startzeit je Caller (Fair Queueing), damit ein
+  Skript-Burst eines Callers andere nicht aushungert
+- Client-Priorität ist nur ein Gewicht: auf ±ORCH_PRIORITY_MAX begrenzt und als
+  virtuelle Kosten (2**priority) in die Startzeit gefaltet → niedrigere Werte kommen
+  häufiger dran, können aber andere Caller nicht überholen
+- Queue-Position/Status pro run_id für /api/orch/status
+- Gewichtete Jobs (Batch-Chunks mit mehreren Runs): ein Job belegt `weight` Worker-Slots,
+  `ORCH_WORKERS` begrenzt also Runs, nicht Jobs; die Runs eines wartenden Chunks melden
+  dessen Queue-Position
+- `cancel(run_id)` entfernt noch wartende Jobs (/api/orch/cancel)
+
+ENV: ORCH_WORKERS (default 4), ORCH_QUEUE_MAX (default 100), ORCH_PRIORITY_MAX (default 2)
+"""
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+from loguru import logger
+
+
+class SchedulerFull(Exception):
+    def __init__(self, retry_after: int) -> None:
+        super().__init__(f"run queue full, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+@dataclass(order=True)
+class _Job:
+    sort_key: Tuple[float, int]                 # (virtuelle Startzeit, Sequenz)
+    run_id: str = field(compare=False)
+    caller: str = field(compare=False)
+    fn: Callable[[], Awaitable[Any]] = field(compare=False)
+    enqueued: float = field(compare=False, default_factory=time.monotonic)
+    weight: int = field(compare=False, default=1)               # belegte Worker-Slots
+    members: Tuple[str, ...] = field(compare=False, default=())  # run_ids eines Chunks
+
+# (job_id, fn) oder (job_id, fn, member_run_ids)
+JobSpec = Union[Tuple[str, Callable[[], Awaitable[Any]]], Tuple[str, Callable[[], Awaitable[Any]], Sequence[str]]]
+
+
+class RunScheduler:
+    def __init__(self, *, workers: int = 4, max_queue: int = 100, priority_max: int = 2) -> None:
+        self.workers = max(1, workers)
+        self.max_queue = max(1, max_queue)
+        self.priority_max = max(0, priority_max)
+        self._heap: List[_Job] = []
+        self._queued: Dict[str, _Job] = {}
+        self._members: Dict[str, _Job] = {}         # run_id eines wartenden Chunks → Chunk-Job
+        self._running: Dict[str, str] = {}          # run_id → caller
+        self._busy = 0                              # belegte Worker-Slots (Summe der Gewichte)
+        self._finish: Dict[str, float] = {}         # caller → letzte virtuelle Startzeit
+        self._vclock = 0.0
+        self._seq = itertools.count()
+        self._cond: Optional[asyncio.Condition] = None
+        self._tasks: List["asyncio.Task[None]"] = []
+        self._avg_run = 10.0                        # EMA der Laufzeit (Sekunden) für Retry-After
+        self._stats: Dict[str, int] = {"submitted": 0, "rejected": 0, "completed": 0, "failed": 0, "cancelled": 0}
+
+    @classmethod
+    def from_env(cls) -> "RunScheduler":
+        return cls(
+            workers=int(os.getenv("ORCH_WORKERS", "4")),
+            max_queue=int(os.getenv("ORCH_QUEUE_MAX", "100")),
+            priority_max=int(os.getenv("ORCH_PRIORITY_MAX", "2")),
+        )
+
+    # -------------------------
+    # Lifecycle
+    # -------------------------
+    def _ensure_started(self) -> asyncio.Condition:
+        if self._cond is None:
+            self._cond = asyncio.Condition()
+        if not self._tasks:
+            self._tasks = [asyncio.ensure_future(self._worker(i)) for i in range(self.workers)]
+        return self._cond
+
+    async def shutdown(self) -> None:
+        tasks, self._tasks = self._tasks, []
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    # -------------------------
+    # API
+    # -------------------------
+    async def submit(
+        self,
+        run_id: str,
+        fn: Callable[[], Awaitable[Any]],
+        *,
+        caller: str = "anon",
+        priority: int = 0,
+    ) -> int:
+        """Reiht einen Run ein; Rückgabe = Queue-Position (0 = als nächster). Voll → SchedulerFull."""
+        cond = self._ensure_started()
+        async with cond:
+            if len(self._heap) >= self.max_queue:
+                self._stats["rejected"] += 1
+                raise SchedulerFull(self.retry_after())
+            vstart = self._vstart(caller, priority)
+            job = _Job(sort_key=(vstart, next(self._seq)), run_id=run_id, caller=caller, fn=fn)
+            heapq.heappush(self._heap, job)
+            self._queued[run_id] = job
+            self._stats["submitted"] += 1
+            cond.notify()
+        return self.position(run_id) or 0
+
+    async def submit_many(
+        self,
+        jobs: List[JobSpec],
+        *,
+        caller: str = "anon",
+        priority: int = 0,
+    ) -> List[int]:
+        """
+        Alles oder nichts: alle Jobs unter einer Lock-Übernahme einreihen oder `SchedulerFull`.
+        Ein Job mit Mitglieds-run_ids (Chunk) belegt je Mitglied einen Worker-Slot (max. `workers`);
+        `fn` muss seine Nebenläufigkeit entsprechend begrenzen (siehe `weight_for`).
+        """
+        cond = self._ensure_started()
+        async with cond:
+            if len(self._heap) + len(jobs) > self.max_queue:
+                self._stats["rejected"] += 1
+                raise SchedulerFull(self.retry_after())
+            for spec in jobs:
+                run_id, fn = spec[0], spec[1]
+                members = tuple(spec[2]) if len(spec) > 2 else ()  # type: ignore[misc]
+                job = _Job(
+                    sort_key=(self._vstart(caller, priority), next(self._seq)), run_id=run_id, caller=caller, fn=fn,
+                    weight=self.weight_for(len(members) or 1), members=members,
+                )
+                heapq.heappush(self._heap, job)
+                self._queued[run_id] = job
+                for m in members:
+                    self._members[m] = job
+                self._stats["submitted"] += 1
+            cond.notify(len(jobs))
+        return [self.position(spec[0]) or 0 for spec in jobs]
+
+    def weight_for(self, runs: int) -> int:
+        """Worker-Slots eines Jobs mit `runs` Runs (= erlaubte Nebenläufigkeit innerhalb des Jobs)."""
+        return max(1, min(int(runs), self.workers))
+
+    def _vstart(self, caller: str, priority: int) -> float:
+        # Fair Queueing: jeder Job eines Callers startet virtuell nach seinem vorherigen;
+        # die (begrenzte) Priorität skaliert nur die virtuellen Kosten des Jobs
+        prio = max(-self.priority_max, min(self.priority_max, int(priority)))
+        vstart = max(self._vclock, self._finish.get(caller, 0.0)) + 2.0 ** prio
+        self._finish[caller] = vstart
+        return vstart
+
+    def state(self, run_id: str) -> Optional[str]:
+        if run_id in self._queued or run_id in self._members:
+            return "queued"
+        if run_id in self._running:
+            return "running"
+        return None
+
+    def position(self, run_id: str) -> Optional[int]:
+        job = self._queued.get(run_id) or self._members.get(run_id)
+        if job is None:
+            return None
+        return sum(1 for j in self._heap if j.sort_key < job.sort_key)
+
+    def cancel(self, run_id: str) -> bool:
+        """
+        Wartenden Job aus der Queue nehmen; False, wenn er schon läuft oder unbekannt ist.
+        Mitglieder eines Chunks werden nicht einzeln entfernt (→ Cancel-Token des Runs).
+        """
+        job = self._queued.pop(run_id, None)
+        if job is None:
+            return False
+        self._drop_members(job)
+        self._heap.remove(job)
+        heapq.heapify(self._heap)
+        self._stats["cancelled"] += 1
+        return True
+
+    def free_capacity(self) -> int:
+        return max(0, self.max_queue - len(self._heap))
+
+    def retry_after(self) -> int:
+        backlog = len(self._heap) + len(self._running)
+        return max(1, int(self._avg_run * backlog / self.workers))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self._stats,
+            "workers": self.workers,
+            "queued": len(self._heap),
+            "running": len(self._running),
+            "busy_slots": self._busy,
+            "max_queue": self.max_queue,
+            "avg_run_s": round(self._avg_run, 3),
+            "callers": len(self._finish),
+        }
+
+    # -------------------------
+    # Worker
+    # -------------------------
+    async def _worker(self, idx: int) -> None:
+        cond = self._cond
+        assert cond is not None
+        while True:
+            async with cond:
+                # Kopf der Queue erst starten, wenn seine Slots frei sind (kein Überholen → fair)
+                while not self._heap or not self._fits(self._heap[0]):
+                    await cond.wait()
+                job = heapq.heappop(self._heap)
+                self._queued.pop(job.run_id, None)
+                self._drop_members(job)
+                self._busy += job.weight
+                self._vclock = max(self._vclock, job.sort_key[0])
+                # Caller, deren letzter Job virtuell schon begonnen hat, starten ohnehin bei _vclock
+                for c in [c for c, v in self._finish.items() if v <= self._vclock]:
+                    del self._finish[c]
+                self._running[job.run_id] = job.caller
+            t0 = time.monotonic()
+            try:
+                await job.fn()
+                self._stats["completed"] += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._stats["failed"] += 1
+                logger.warning("scheduler[{}]: run {} failed: {}", idx, job.run_id, e)
+            finally:
+                self._running.pop(job.run_id, None)
+                self._avg_run = 0.8 * self._avg_run + 0.2 * (time.monotonic() - t0)
+                async with cond:
+                    self._busy -= job.weight
+                    cond.notify_all()
+
+    def _fits(self, job: _Job) -> bool:
+        return self._busy + job.weight <= self.workers
+
+    def _drop_members(self, job: _Job) -> None:
+        for m in job.members:
+            if self._members.get(m) is job:
+                del self._members[m]
+
+
+__all__ = ["RunScheduler", "SchedulerFull"]
@@ -0,0 +1,180 @@
+"""
+SpaceArchive
+------------
+Komprimiertes Platten-Archiv für verdrängte Workcell-Teilbäume des `ZepMemoryAdapter`
+(Retention: LRU/TTL/Byte-Budget im Speicher → beim Verdrängen hierher).
+
+- SQLite (WAL): ein zlib-komprimierter JSON-Blob pro Workcell-Teilbaum
+- ID-Index: jede Space-ID des Teilbaums (Workcell + ST) → Wurzel-ID
+  → `get(space_id)` liefert den Teilbaum bzw. den passenden Knoten darin
+- Platten-Retention: alte Einträge werden periodisch gelöscht
+
+ENV:
+  ORCH_SPACE_ARCHIVE            (SQLite-Pfad, default "" → kein Archiv)
+  ORCH_SPACE_ARCHIVE_RETENTION  (Sekunden auf Platte, default 7 Tage)
+"""
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any, Dict, Iterator, List, Optional
+
+from loguru import logger
+
+_PRUNE_EVERY = 200  # Schreibvorgänge zwischen zwei Retention-Läufen
+
+
+def _walk(node: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    stack: List[Dict[str, Any]] = [node]
+    while stack:
+        n = stack.pop()
+        yield n
+        stack.extend(n.get("children") or [])
+
+
+class SpaceArchive:
+    def __init__(self, path: str, *, retention: float = 7 * 86400.0) -> None:
+        self.path = path
+        self.retention = retention
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._stats: Dict[str, int] = {"archived": 0, "bytes": 0, "hits": 0, "misses": 0, "pruned": 0, "failed": 0}
+        self._db: Optional[sqlite3.Connection] = self._open(path)
+
+    @classmethod
+    def from_env(cls) -> Optional["SpaceArchive"]:
+        path = os.getenv("ORCH_SPACE_ARCHIVE", "")
+        if not path:
+            return None
+        try:
+            return cls(path, retention=float(os.getenv("ORCH_SPACE_ARCHIVE_RETENTION", str(7 * 86400))))
+        except Exception as e:
+            logger.warning("SpaceArchive: SQLite {} nicht nutzbar ({}), kein Archiv", path, e)
+            return None
+
+    @staticmethod
+    def _open(path: str) -> sqlite3.Connection:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        db = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=5.0)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS spaces ("
+            " root_id TEXT PRIMARY KEY,"
+            " closed REAL NOT NULL,"
+            " data BLOB NOT NULL)"
+        )
+        db.execute("CREATE INDEX IF NOT EXISTS spaces_closed ON spaces(closed)")
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS space_ids ("
+            " space_id TEXT PRIMARY KEY,"
+            " root_id TEXT NOT NULL)"
+        )
+        db.execute("CREATE INDEX IF NOT EXISTS space_ids_root ON space_ids(root_id)")
+        return db
+
+    # -------------------------
+    # API
+    # -------------------------
+    def put(self, snapshot: Dict[str, Any], *, closed: Optional[float] = None) -> bool:
+        """Teilbaum-Snapshot (`SpaceStore.subtree`) archivieren; False bei Fehler/ohne DB."""
+        root_id = snapshot["space_id"]
+        blob = zlib.compress(json.dumps(snapshot, ensure_ascii=False, default=str).encode("utf-8"), 6)
+        now = closed if closed is not None else time.time()
+        ids = [(n["space_id"], root_id) for n in _walk(snapshot)]
+        with self._lock:
+            if self._db is None:
+                return False
+            try:
+                self._db.execute("BEGIN")
+                self._db.execute(
+                    "INSERT OR REPLACE INTO spaces(root_id, closed, data) VALUES (?, ?, ?)",
+                    (root_id, now, blob),
+                )
+                self._db.executemany("INSERT OR REPLACE INTO space_ids(space_id, root_id) VALUES (?, ?)", ids)
+                self._db.execute("COMMIT")
+            except Exception as e:
+                try:
+                    self._db.execute("ROLLBACK")
+                except Exception:
+                    pass
+                self._stats["failed"] += 1
+                logger.warning("SpaceArchive: Schreiben von {} fehlgeschlagen: {}", root_id, e)
+                return False
+            self._stats["archived"] += 1
+            self._stats["bytes"] += len(blob)
+            self._writes += 1
+            if self._writes % _PRUNE_EVERY == 0:
+                self._prune(time.time())
+            return True
+
+    def get(self, space_id: str) -> Optional[Dict[str, Any]]:
+        """Archivierten Space (inkl. Kinder) per beliebiger Space-ID des Teilbaums laden."""
+        with self._lock:
+            if self._db is None:
+                return None
+            try:
+                row = self._db.execute(
+                    "SELECT s.data FROM space_ids i JOIN spaces s ON s.root_id = i.root_id WHERE i.space_id = ?",
+                    (space_id,),
+                ).fetchone()
+            except Exception as e:
+                logger.warning("SpaceArchive: Lesen von {} fehlgeschlagen: {}", space_id, e)
+                row = None
+            if row is None:
+                self._stats["misses"] += 1
+                return None
+            self._stats["hits"] += 1
+        root = json.loads(zlib.decompress(row[0]))
+        for node in _walk(root):
+            if node.get("space_id") == space_id:
+                return node
+        return root
+
+    def close(self) -> None:
+        with self._lock:
+            db, self._db = self._db, None
+            if db is not None:
+                try:
+                    db.close()
+                except Exception:
+                    pass
+
+    def stats(self) -> Dict[str, Any]:
+        rows = None
+        with self._lock:
+            if self._db is not None:
+                try:
+                    rows = self._db.execute("SELECT COUNT(*) FROM spaces").fetchone()[0]
+                except Exception:
+                    rows = None
+            return {**self._stats, "disk_rows": rows, "path": self.path if self._db is not None else None}
+
+    # -------------------------
+    # Intern
+    # -------------------------
+    def _prune(self, now: float) -> None:
+        if self._db is None or self.retention <= 0:
+            return
+        cutoff = now - self.retention
+        try:
+            self._db.execute("BEGIN")
+            self._db.execute(
+                "DELETE FROM space_ids WHERE root_id IN (SELECT root_id FROM spaces WHERE closed < ?)", (cutoff,)
+            )
+            cur = self._db.execute("DELETE FROM spaces WHERE closed < ?", (cutoff,))
+            self._db.execute("COMMIT")
+            self._stats["pruned"] += max(0, cur.rowcount or 0)
+        except Exception as e:
+            try:
+                self._db.execute("ROLLBACK")
+            except Exception:
+                pass
+            logger.warning("SpaceArchive: Retention fehlgeschlagen: {}", e)
+
+
+__all__ = ["SpaceArchive"]
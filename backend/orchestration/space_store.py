@@ -0,0 +1,342 @@
+"""
+SpaceStore
+----------
+Kompakter, thread-sicherer In-Memory-Speicher für die Spaces des `ZepMemoryAdapter`
+(Hub läuft parallel in Threadpool-Workern: `run_in_threadpool(hub.run_ticket)`).
+
+- Lock-Striping: N Shards (dict + Lock), Shard = hash(space_id) → parallele Tickets
+  blockieren sich nicht gegenseitig; es wird nie mehr als ein Shard-Lock gehalten
+- kompakte Records (`__slots__`) statt Dict pro Nachricht/Event; leere Metadaten → None
+- Rollen/Event-Typen/Kinds/Status werden interniert (ein String-Objekt pro Wert)
+- große Inhalte/Payloads (> ORCH_SPACE_COMPRESS_BYTES) werden zlib-komprimiert
+  abgelegt und erst beim Lesen (Snapshot) entpackt
+- Parent→Children-Index, GC in O(Teilbaum), Live-Zähler pro Shard
+
+ENV:
+  ORCH_SPACE_STRIPES         (Anzahl Shards, auf Zweierpotenz gerundet, default 16)
+  ORCH_SPACE_COMPRESS_BYTES  (Schwelle für Kompression, default 4096; 0 = aus)
+"""
+from __future__ import annotations
+
+import json
+import os
+import sys
+import threading
+import zlib
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+_REC_OVERHEAD = 72          # grobe Objektgröße eines Slot-Records (Bytes)
+_SPACE_OVERHEAD = 240       # Space-Objekt + Dict-Eintrag
+
+
+def _intern(s: Optional[str]) -> Optional[str]:
+    return sys.intern(s) if isinstance(s, str) else s
+
+
+class MessageRecord:
+    __slots__ = ("ts", "role", "body", "meta")
+
+    def __init__(self, ts: float, role: str, body: Union[str, bytes], meta: Optional[Dict[str, Any]]) -> None:
+        self.ts = ts
+        self.role = role
+        self.body = body              # str oder zlib-komprimierte UTF-8-Bytes
+        self.meta = meta
+
+    @property
+    def content(self) -> str:
+        b = self.body
+        return zlib.decompress(b).decode("utf-8") if isinstance(b, bytes) else b
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"ts": self.ts, "role": self.role, "content": self.content, "meta": dict(self.meta or {})}
+
+
+class EventRecord:
+    __slots__ = ("ts", "type", "data")
+
+    def __init__(self, ts: float, type: str, data: Union[Dict[str, Any], bytes]) -> None:
+        self.ts = ts
+        self.type = type
+        self.data = data              # Dict oder zlib-komprimiertes JSON
+
+    @property
+    def payload(self) -> Dict[str, Any]:
+        d = self.data
+        return json.loads(zlib.decompress(d)) if isinstance(d, bytes) else d
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"ts": self.ts, "type": self.type, "payload": self.payload}
+
+
+class Space:
+    __slots__ = ("space_id", "kind", "name", "parent_id", "status", "messages", "events", "children", "nbytes",
+                 "compressed")
+
+    def __init__(self, space_id: str, kind: str, name: Optional[str] = None, parent_id: Optional[str] = None) -> None:
+        self.space_id = space_id
+        self.kind = kind
+        self.name = name
+        self.parent_id = parent_id
+        self.status = "open"
+        self.messages: List[MessageRecord] = []
+        self.events: List[EventRecord] = []
+        # Kinder als geordnetes Set (dict-Keys) → O(1) Aushängen beim GC
+        self.children: Dict[str, None] = {}
+        self.nbytes = _SPACE_OVERHEAD
+        self.compressed = 0           # Anzahl komprimierter Records (für Shard-Zähler beim GC)
+
+
+class _Shard:
+    __slots__ = ("lock", "spaces", "nbytes", "by_kind", "compressed")
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.spaces: Dict[str, Space] = {}
+        self.nbytes = 0
+        self.compressed = 0
+        self.by_kind: Dict[str, int] = {}
+
+    def add(self, sp: Space) -> None:
+        self.spaces[sp.space_id] = sp
+        self.nbytes += sp.nbytes
+        self.compressed += sp.compressed
+        self.by_kind[sp.kind] = self.by_kind.get(sp.kind, 0) + 1
+
+    def remove(self, space_id: str) -> Optional[Space]:
+        sp = self.spaces.pop(space_id, None)
+        if sp is not None:
+            self.nbytes -= sp.nbytes
+            self.compressed -= sp.compressed
+            left = self.by_kind.get(sp.kind, 1) - 1
+            if left > 0:
+                self.by_kind[sp.kind] = left
+            else:
+                self.by_kind.pop(sp.kind, None)
+        return sp
+
+
+class SpaceStore:
+    def __init__(self, *, stripes: int = 16, compress_threshold: int = 4096) -> None:
+        n = 1
+        while n < max(1, stripes):
+            n <<= 1
+        self._shards: Tuple[_Shard, ...] = tuple(_Shard() for _ in range(n))
+        self._mask = n - 1
+        self.compress_threshold = max(0, compress_threshold)
+        self._gc_lock = threading.Lock()
+        self._gc_stats: Dict[str, int] = {"calls": 0, "freed": 0, "freed_bytes": 0}
+
+    @classmethod
+    def from_env(cls) -> "SpaceStore":
+        return cls(
+            stripes=int(os.getenv("ORCH_SPACE_STRIPES", "16")),
+            compress_threshold=int(os.getenv("ORCH_SPACE_COMPRESS_BYTES", "4096")),
+        )
+
+    def _shard(self, space_id: str) -> _Shard:
+        return self._shards[hash(space_id) & self._mask]
+
+    # -------------------------
+    # Spaces
+    # -------------------------
+    def create(self, space_id: str, kind: str, name: Optional[str] = None, parent_id: Optional[str] = None) -> Space:
+        sp = Space(space_id, _intern(kind) or "", name, parent_id)
+        shard = self._shard(space_id)
+        with shard.lock:
+            shard.add(sp)
+        if parent_id:
+            pshard = self._shard(parent_id)
+            with pshard.lock:
+                parent = pshard.spaces.get(parent_id)
+                if parent is not None:
+                    parent.children[space_id] = None
+        return sp
+
+    def get(self, space_id: str) -> Optional[Space]:
+        shard = self._shard(space_id)
+        with shard.lock:
+            return shard.spaces.get(space_id)
+
+    def __contains__(self, space_id: str) -> bool:
+        return self.get(space_id) is not None
+
+    def __len__(self) -> int:
+        return sum(len(s.spaces) for s in self._shards)
+
+    def root_of(self, space_id: str) -> str:
+        """Oberste bekannte Vorfahren-ID (bzw. die externe Parent-ID, falls nicht im Store)."""
+        sid = space_id
+        while True:
+            sp = self.get(sid)
+            if sp is None or not sp.parent_id:
+                return sid
+            sid = sp.parent_id
+
+    # -------------------------
+    # Schreiben
+    # -------------------------
+    def append_message(self, space_id: str, ts: float, role: str, content: str,
+                       meta: Optional[Dict[str, Any]] = None) -> Space:
+        body: Union[str, bytes] = content
+        size = len(content)
+        if self.compress_threshold and size > self.compress_threshold:
+            body = zlib.compress(content.encode("utf-8"), 6)
+            size = len(body)
+        rec = MessageRecord(ts, _intern(role) or "", body, meta or None)
+        size += _REC_OVERHEAD + (_json_len(meta) if meta else 0)
+        return self._append(space_id, rec, size, events=False, compressed=isinstance(body, bytes))
+
+    def append_event(self, space_id: str, ts: float, type: str, payload: Dict[str, Any]) -> Space:
+        data: Union[Dict[str, Any], bytes] = payload
+        size = _json_len(payload)
+        if self.compress_threshold and size > self.compress_threshold:
+            data = zlib.compress(json.dumps(payload, default=str).encode("utf-8"), 6)
+            size = len(data)
+        rec = EventRecord(ts, _intern(type) or "", data)
+        return self._append(space_id, rec, size + _REC_OVERHEAD, events=True, compressed=isinstance(data, bytes))
+
+    def _append(self, space_id: str, rec: Any, size: int, *, events: bool, compressed: bool) -> Space:
+        shard = self._shard(space_id)
+        with shard.lock:
+            sp = shard.spaces.get(space_id)
+            if sp is None:
+                raise KeyError(f"unknown space_id {space_id}")
+            (sp.events if events else sp.messages).append(rec)
+            sp.nbytes += size
+            shard.nbytes += size
+            sp.compressed += compressed
+            shard.compressed += compressed
+        return sp
+
+    def set_status(self, space_id: str, status: str) -> Space:
+        shard = self._shard(space_id)
+        with shard.lock:
+            sp = shard.spaces.get(space_id)
+            if sp is None:
+                raise KeyError(f"unknown space_id {space_id}")
+            sp.status = _intern(status) or ""
+        return sp
+
+    # -------------------------
+    # GC / Lesen
+    # -------------------------
+    def gc(self, space_id: str) -> int:
+        """Space samt Teilbaum entfernen (O(Teilbaum)); Rückgabe = Anzahl freigegebener Spaces."""
+        shard = self._shard(space_id)
+        with shard.lock:
+            sp = shard.remove(space_id)
+        if sp is None:
+            return 0
+        if sp.parent_id:
+            pshard = self._shard(sp.parent_id)
+            with pshard.lock:
+                parent = pshard.spaces.get(sp.parent_id)
+                if parent is not None:
+                    parent.children.pop(space_id, None)
+        freed, freed_bytes = 0, 0
+        stack = [sp]
+        while stack:
+            node = stack.pop()
+            freed += 1
+            freed_bytes += node.nbytes
+            for cid in list(node.children):
+                cshard = self._shard(cid)
+                with cshard.lock:
+                    child = cshard.remove(cid)
+                if child is not None:
+                    stack.append(child)
+        with self._gc_lock:
+            self._gc_stats["calls"] += 1
+            self._gc_stats["freed"] += freed
+            self._gc_stats["freed_bytes"] += freed_bytes
+        return freed
+
+    def snapshot(self, space_id: str) -> Dict[str, Any]:
+        return self._snapshot(space_id)[0]
+
+    def _snapshot(self, space_id: str) -> Tuple[Dict[str, Any], List[str]]:
+        shard = self._shard(space_id)
+        with shard.lock:
+            sp = shard.spaces.get(space_id)
+            if sp is None:
+                raise KeyError(f"unknown space_id {space_id}")
+            msgs, evs, kids = list(sp.messages), list(sp.events), list(sp.children)
+            head = {k: getattr(sp, k) for k in ("space_id", "kind", "name", "parent_id", "status")}
+        # Entpacken außerhalb des Locks
+        snap = {
+            **head,
+            "messages": [m.to_dict() for m in msgs],
+            "events": [e.to_dict() for e in evs],
+        }
+        return snap, kids
+
+    def subtree(self, space_id: str) -> Dict[str, Any]:
+        """Snapshot inkl. aller Nachfahren (verschachtelt unter "children")."""
+        root, kids = self._snapshot(space_id)
+        stack: List[Tuple[Dict[str, Any], List[str]]] = [(root, kids)]
+        while stack:
+            node, kids = stack.pop()
+            node["children"] = []
+            for cid in kids:
+                try:
+                    child, grandkids = self._snapshot(cid)
+                except KeyError:
+                    continue   # parallel per GC entfernt
+                node["children"].append(child)
+                stack.append((child, grandkids))
+        return root
+
+    def subtree_bytes(self, space_id: str) -> Optional[int]:
+        """Geschätzte Bytes eines Teilbaums (None, wenn der Space unbekannt ist)."""
+        total, first = 0, True
+        stack = [space_id]
+        while stack:
+            sid = stack.pop()
+            shard = self._shard(sid)
+            with shard.lock:
+                sp = shard.spaces.get(sid)
+                if sp is None:
+                    if first:
+                        return None
+                    continue
+                total += sp.nbytes
+                stack.extend(sp.children)
+            first = False
+        return total
+
+    def iter_ids(self) -> Iterator[str]:
+        for shard in self._shards:
+            with shard.lock:
+                ids = list(shard.spaces)
+            yield from ids
+
+    def stats(self) -> Dict[str, Any]:
+        spaces, nbytes, compressed = 0, 0, 0
+        by_kind: Dict[str, int] = {}
+        for shard in self._shards:
+            with shard.lock:
+                spaces += len(shard.spaces)
+                nbytes += shard.nbytes
+                compressed += shard.compressed
+                for k, v in shard.by_kind.items():
+                    by_kind[k] = by_kind.get(k, 0) + v
+        with self._gc_lock:
+            gc = dict(self._gc_stats)
+        return {
+            "spaces": spaces,
+            "by_kind": by_kind,
+            "bytes": nbytes,
+            "stripes": len(self._shards),
+            "compressed": compressed,
+            "gc": gc,
+        }
+
+
+def _json_len(obj: Any) -> int:
+    try:
+        return len(json.dumps(obj, default=str))
+    except Exception:
+        return 64
+
+
+__all__ = ["SpaceStore", "Space", "MessageRecord", "EventRecord"]
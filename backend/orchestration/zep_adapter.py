@@ -11,37 +11,52 @@ gearbeitet werden kann.
 
 Minimal-Implementierung:
 - Bietet das **Memory-Protokoll** (create_space, write_message, write_event,
-  set_status, gc) synchron an.
-- Default-Persistenz ist **in-memory**; spätere Routen zu ZEP-Graph/Thread
-  können hier ergänzt werden (TODOs markiert).
+  set_status, gc) synchron an, dazu Bulk-Varianten für WorkcellIO
+  (create_spaces, write_messages, finish_space): ein Aufruf und ein
+  Mirror-Enqueue pro open/step/close.
+- Default-Persistenz ist **in-memory**; Targets "thread"/"graph" werden per
+  Write-behind (`ZepMirror`, orchestration/zep_mirror.py) nach ZEP gespiegelt:
+  Nachrichten nach Space-Art (workcell → "workcell", st → "agent_st"),
+  Space-Anlage/Status/Events → "orch". Der Sync-Pfad legt nur in die Queue.
+- Ablage in `SpaceStore` (orchestration/space_store.py): lock-gestreift und
+  thread-sicher (Hub läuft in Threadpool-Workern), kompakte Slot-Records,
+  große Artefakte zlib-komprimiert.
+- Parent→Children-Index: `gc` räumt den ganzen Teilbaum in O(Teilbaum) ab
+  (Workcell + ST-Spaces), `subtree_snapshot` liefert ihn verschachtelt.
+- Live-Zähler (Spaces je Art, geschätzte Bytes) für /api/orch/_diag.
+- Retention: `gc` löscht nicht sofort, sondern hält geschlossene Teilbäume in
+  einem LRU (TTL + globales Byte-Budget); beim Verdrängen optional Spill in
+  ein komprimiertes SQLite-Archiv (`SpaceArchive`) → `inspect_space` findet
+  frische Runs im Speicher, ältere im Archiv.
+- Verdrängen/Archivieren übernimmt ein Hintergrund-Thread ("reaper"): `gc` selbst
+  bleibt billig (auch auf dem Event-Loop), TTL und Budget greifen sofort bzw. zur
+  Ablaufzeit – auch in einem sonst untätigen Prozess.
+
+ENV: ORCH_RETAIN_TTL (Sekunden, default 300; 0 = sofort löschen),
+     ORCH_RETAIN_MAX_MB (default 64), ORCH_SPACE_ARCHIVE (siehe space_archive.py)
 
 Hinweis: Dieser Adapter ist bewusst leichtgewichtig, damit Pylance die
 strukturelle Typkompatibilität zu "Memory" erkennt und CaptainHub ohne
 Type-Errors instanziiert werden kann.
 """
 
-from typing import Any, Dict, Optional, Literal
-from dataclasses import dataclass, field
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Literal, Tuple
+import asyncio
+import os
+import threading
 import uuid
 import time
 
+from backend.orchestration.space_archive import SpaceArchive
+from backend.orchestration.space_store import Space, SpaceStore
+from backend.orchestration.zep_mirror import MirrorRecord, ZepMirror
+
 
 PersistTarget = Literal["inmem", "thread", "graph"]
 ThreadMode = Literal["isolated", "shared"]
 
-
-@dataclass
-class _Space:
-    space_id: str
-    kind: str
-    name: Optional[str] = None
-    parent_id: Optional[str] = None
-    status: str = "open"
-    # Rohspeicher für Nachrichten und Events (minimal, für v2 ausreichend)
-    messages: list = field(default_factory=list)
-    events: list = field(default_factory=list)
-
-from typing import Mapping
+from typing import Callable, Mapping
 class ZepMemoryAdapter:
     def __init__(
         self,
@@ -49,7 +64,12 @@ class ZepMemoryAdapter:
         zep_facade: Any,
         thread_mode: ThreadMode = "isolated",
         targets: Optional[Mapping[str, PersistTarget]
-                          ] = None
+                          ] = None,
+        mirror: Optional[ZepMirror] = None,
+        store: Optional[SpaceStore] = None,
+        archive: Optional[SpaceArchive] = None,
+        retain_ttl: Optional[float] = None,
+        retain_max_bytes: Optional[int] = None,
         ) -> None:
 
         self._zep = zep_facade
@@ -62,8 +82,35 @@ class ZepMemoryAdapter:
         if targets:
             self._targets.update(dict(targets))
 
-        # In-Memory Ablage (für inmem/graph Defaults in dieser Minimalversion)
-        self._spaces: Dict[str, _Space] = {}
+        # In-Memory Ablage (Arbeitskopie; dauerhafte Ablage über den Mirror)
+        self._spaces: SpaceStore = store if store is not None else SpaceStore.from_env()
+        self._mirror: Optional[ZepMirror] = mirror if mirror is not None else self._mirror_from_env()
+
+        # Retention geschlossener Teilbäume: Wurzel-ID → (monotonic, wall-clock, Bytes), LRU-Reihenfolge
+        self._retain_ttl = float(retain_ttl if retain_ttl is not None else os.getenv("ORCH_RETAIN_TTL", "300"))
+        self._retain_max = int(
+            retain_max_bytes if retain_max_bytes is not None
+            else float(os.getenv("ORCH_RETAIN_MAX_MB", "64")) * 1024 * 1024
+        )
+        self._retained: "OrderedDict[str, Tuple[float, float, int]]" = OrderedDict()
+        self._retained_bytes = 0
+        self._retain_lock = threading.Lock()
+        self._retain_stats: Dict[str, int] = {"retained": 0, "expired": 0, "over_budget": 0, "archived": 0}
+        self._archive: Optional[SpaceArchive] = archive if archive is not None else SpaceArchive.from_env()
+        # Reaper: wartet auf gc-Signal bzw. die nächste TTL-Ablaufzeit (teilt sich das Retention-Lock)
+        self._reap_cv = threading.Condition(self._retain_lock)
+        self._reap_queue: List[Tuple[str, float]] = []
+        self._reaper: Optional[threading.Thread] = None
+        self._reap_stop = False
+
+    def _mirror_from_env(self) -> Optional[ZepMirror]:
+        if all(t == "inmem" for t in self._targets.values()):
+            return None
+        client = getattr(self._zep, "client", None)
+        user_id = getattr(self._zep, "user_id", None)
+        if client is None or not user_id:
+            return None
+        return ZepMirror.from_env(client=client, user_id=user_id, thread_source=self._zep, thread_mode=self._thread_mode)
 
     # ---------------------------------------------------------------------
     # Synchrones Memory-Protokoll (structural typing für CaptainHub)
@@ -71,41 +118,237 @@ class ZepMemoryAdapter:
     def create_space(self, kind: str, name: Optional[str] = None, parent_id: Optional[str] = None) -> str:
         """Erzeugt einen Space und gibt dessen ID zurück (synchron)."""
         sid = str(uuid.uuid4())
-        self._spaces[sid] = _Space(space_id=sid, kind=kind, name=name, parent_id=parent_id)
-        # TODO: Bei target == "graph" könnte hier ein ZEP-Graph-Space angelegt werden.
+        sp = self._spaces.create(sid, kind, name, parent_id)
+        self._mirror_write(sp, "space", lambda: {"name": name, "parent_id": parent_id})
         return sid
 
     def write_message(self, space_id: str, role: str, content: str, metadata: Optional[Dict[str, Any]] = None) -> None:
         """Schreibt eine Nachricht in den Space (synchron)."""
-        sp = self._spaces.get(space_id)
-        if not sp:
-            raise KeyError(f"unknown space_id {space_id}")
-        sp.messages.append({
-            "ts": time.time(),
-            "role": role,
-            "content": content,
-            "meta": metadata or {},
-        })
-        # TODO: Bei target == "thread"/"graph" hier in ZEP spiegeln (async → fire/forget).
+        ts = time.time()
+        sp = self._spaces.append_message(space_id, ts, role, content, metadata)
+        self._mirror_write(sp, "message", lambda: {"ts": ts, "role": role, "content": content, "meta": metadata or {}})
 
     # 2) write_event keyword-only + richtiger Param-Name
     def write_event(self, *, space_id: str, type: str, payload: Dict[str, Any]) -> None:
-        sp = self._spaces.get(space_id)
-        if not sp:
-            raise KeyError(f"unknown space_id {space_id}")
-        sp.events.append({"ts": time.time(), "type": type, "payload": payload})
-        # TODO: optional nach ZEP spiegeln
+        ts = time.time()
+        sp = self._spaces.append_event(space_id, ts, type, payload)
+        self._mirror_write(sp, "event", lambda: {"ts": ts, "type": type, "payload": payload})
 
     def set_status(self, space_id: str, status: str) -> None:
-        sp = self._spaces.get(space_id)
-        if not sp:
-            raise KeyError(f"unknown space_id {space_id}")
-        sp.status = status
+        sp = self._spaces.set_status(space_id, status)
+        self._mirror_write(sp, "status", lambda: {"ts": time.time(), "status": status})
+
+    # ---------------------------------------------------------------------
+    # Bulk-Varianten (WorkcellIO: ein Aufruf pro open/step_out/close)
+    # ---------------------------------------------------------------------
+    def create_spaces(self, specs: List[Dict[str, Any]]) -> List[str]:
+        """
+        Mehrere Spaces in einem Aufruf anlegen. Spec-Keys: kind, name, status,
+        parent_id (ID) oder parent (Index eines früheren Specs derselben Liste).
+        """
+        ids: List[str] = []
+        recs: List[MirrorRecord] = []
+        for spec in specs:
+            parent = spec.get("parent")
+            parent_id = ids[parent] if isinstance(parent, int) else spec.get("parent_id")
+            kind, name, status = spec["kind"], spec.get("name"), spec.get("status")
+            sid = str(uuid.uuid4())
+            sp = self._spaces.create(sid, kind, name, parent_id)
+            ids.append(sid)
+            self._mirror_add(recs, sp, "space", lambda: {"name": name, "parent_id": parent_id})
+            if status:
+                self._spaces.set_status(sid, status)
+                self._mirror_add(recs, sp, "status", lambda: {"ts": time.time(), "status": status})
+        self._mirror_enqueue(recs)
+        return ids
+
+    def write_messages(self, writes: List[Dict[str, Any]]) -> None:
+        """Mehrere Nachrichten (auch in verschiedene Spaces) schreiben. Keys: space_id, role, content, metadata."""
+        ts = time.time()
+        recs: List[MirrorRecord] = []
+        for w in writes:
+            role, content, metadata = w["role"], w["content"], w.get("metadata")
+            sp = self._spaces.append_message(w["space_id"], ts, role, content, metadata)
+            self._mirror_add(recs, sp, "message", lambda: {"ts": ts, "role": role, "content": content, "meta": metadata or {}})
+        self._mirror_enqueue(recs)
+
+    def finish_space(
+        self,
+        space_id: str,
+        *,
+        status: str,
+        event: Optional[str] = None,
+        payload: Optional[Dict[str, Any]] = None,
+        gc: bool = True,
+    ) -> None:
+        """Abschluss in einem Aufruf: Status setzen, optional Event schreiben, optional GC."""
+        ts = time.time()
+        recs: List[MirrorRecord] = []
+        sp = self._spaces.set_status(space_id, status)
+        self._mirror_add(recs, sp, "status", lambda: {"ts": ts, "status": status})
+        if event:
+            self._spaces.append_event(space_id, ts, event, payload or {})
+            self._mirror_add(recs, sp, "event", lambda: {"ts": ts, "type": event, "payload": payload or {}})
+        self._mirror_enqueue(recs)
+        if gc:
+            self.gc(space_id)
 
     def gc(self, space_id: str) -> None:
-        """Aufräumen (synchron). In der Minimalversion wird der Space gelöscht."""
-        # TODO: Bei persistenten Targets ggf. Soft-GC/TTL
-        self._spaces.pop(space_id, None)
+        """
+        Space samt Teilbaum freigeben (synchron). Mit Retention wandert der Teilbaum
+        ins LRU und wird erst nach TTL/Budget gelöscht (bzw. archiviert).
+        """
+        if self._retain_ttl <= 0 or self._retain_max <= 0:
+            if self._archive is None:
+                if not self._spaces.gc(space_id):
+                    return
+            elif space_id not in self._spaces:
+                return
+            else:
+                # Archiv-I/O nicht im Aufrufer (ggf. Event-Loop), sondern im Reaper
+                with self._retain_lock:
+                    self._reap_queue.append((space_id, time.time()))
+                    self._wake_reaper_locked()
+        else:
+            size = self._spaces.subtree_bytes(space_id)
+            if size is None:
+                return
+            with self._retain_lock:
+                if space_id not in self._retained:
+                    self._retained[space_id] = (time.monotonic(), time.time(), size)
+                    self._retained_bytes += size
+                    self._retain_stats["retained"] += 1
+                self._wake_reaper_locked()
+        # Records liegen bereits in der Mirror-Queue → nur sofortigen Versand anstoßen
+        if self._mirror is not None:
+            self._mirror.kick()
+
+    # ---------------------------------------------------------------------
+    # Retention / Archiv
+    # ---------------------------------------------------------------------
+    def _evict_locked(self, *, everything: bool = False) -> List[Tuple[str, float]]:
+        """Abgelaufene bzw. über Budget liegende Einträge (älteste zuerst) aus dem LRU nehmen."""
+        victims: List[Tuple[str, float]] = []
+        cutoff = time.monotonic() - self._retain_ttl
+        while self._retained:
+            sid, (mono, closed, size) = next(iter(self._retained.items()))
+            if everything:
+                pass
+            elif mono < cutoff:
+                self._retain_stats["expired"] += 1
+            elif self._retained_bytes > self._retain_max:
+                self._retain_stats["over_budget"] += 1
+            else:
+                break
+            self._retained.popitem(last=False)
+            self._retained_bytes -= size
+            victims.append((sid, closed))
+        return victims
+
+    def _wake_reaper_locked(self) -> None:
+        if self._reap_stop:
+            return
+        if self._reaper is None:
+            self._reaper = threading.Thread(target=self._reap_loop, name="space-reaper", daemon=True)
+            self._reaper.start()
+        self._reap_cv.notify()
+
+    def _reap_loop(self) -> None:
+        with self._retain_lock:
+            while not self._reap_stop:
+                victims, self._reap_queue = self._reap_queue + self._evict_locked(), []
+                if victims:
+                    self._retain_lock.release()
+                    try:
+                        for sid, closed in victims:
+                            self._drop(sid, closed)
+                    finally:
+                        self._retain_lock.acquire()
+                    continue
+                head = next(iter(self._retained.values()), None)
+                timeout = None if head is None else max(0.0, head[0] + self._retain_ttl - time.monotonic()) + 0.01
+                self._reap_cv.wait(timeout)
+
+    def _drop(self, space_id: str, closed: float) -> bool:
+        """Teilbaum endgültig aus dem Speicher entfernen, vorher ggf. archivieren."""
+        if self._archive is not None:
+            try:
+                if self._archive.put(self._spaces.subtree(space_id), closed=closed):
+                    with self._retain_lock:
+                        self._retain_stats["archived"] += 1
+            except KeyError:
+                pass
+        return bool(self._spaces.gc(space_id))
+
+    def expire(self) -> int:
+        """Abgelaufene Retention-Einträge sofort im Aufrufer freigeben (sonst erledigt das der Reaper)."""
+        with self._retain_lock:
+            victims = self._evict_locked()
+        for sid, closed in victims:
+            self._drop(sid, closed)
+        return len(victims)
+
+    def inspect_space(self, space_id: str) -> Optional[Dict[str, Any]]:
+        """Space inkl. Kinder: live/retained aus dem Speicher, sonst aus dem Archiv (None = unbekannt)."""
+        try:
+            return {"source": "memory", **self._spaces.subtree(space_id)}
+        except KeyError:
+            pass
+        snap = self._archive.get(space_id) if self._archive is not None else None
+        return {"source": "archive", **snap} if snap is not None else None
+
+    def close(self) -> None:
+        """Reaper stoppen, Retention-LRU ins Archiv entleeren (falls vorhanden) und Archiv schließen."""
+        with self._retain_lock:
+            self._reap_stop = True
+            self._reap_cv.notify()
+            reaper = self._reaper
+        if reaper is not None:
+            reaper.join(timeout=10.0)
+        if self._archive is None:
+            return
+        with self._retain_lock:
+            victims, self._reap_queue = self._reap_queue + self._evict_locked(everything=True), []
+        for sid, closed in victims:
+            self._drop(sid, closed)
+        self._archive.close()
+
+    # ---------------------------------------------------------------------
+    # Write-behind nach ZEP
+    # ---------------------------------------------------------------------
+    def _mirror_write(self, sp: Space, op: str, data: Callable[[], Dict[str, Any]]) -> None:
+        recs: List[MirrorRecord] = []
+        self._mirror_add(recs, sp, op, data)
+        self._mirror_enqueue(recs)
+
+    def _mirror_enqueue(self, recs: List[MirrorRecord]) -> None:
+        if recs and self._mirror is not None:
+            self._mirror.enqueue(*recs)
+
+    def _mirror_add(self, recs: List[MirrorRecord], sp: Space, op: str, data: Callable[[], Dict[str, Any]]) -> None:
+        # data lazy: ohne Mirror/bei inmem wird kein Record-Dict gebaut
+        if self._mirror is None:
+            return
+        if op == "message":
+            key = {"workcell": "workcell", "st": "agent_st"}.get(sp.kind, "orch")
+        else:
+            key = "orch"
+        target = self._targets.get(key, "inmem")
+        if target == "inmem":
+            return
+        recs.append(MirrorRecord(
+            target=target, root_id=self._spaces.root_of(sp.space_id), space_id=sp.space_id,
+            kind=sp.kind, op=op, data=data(),
+        ))
+
+    async def aclose(self, timeout: Optional[float] = 10.0) -> None:
+        """Offene Mirror-Records senden, Worker stoppen, Retention archivieren (Lifespan-Shutdown)."""
+        if self._mirror is not None:
+            await self._mirror.aclose(timeout=timeout)
+        await asyncio.to_thread(self.close)
+
+    def mirror_stats(self) -> Optional[Dict[str, Any]]:
+        return self._mirror.stats() if self._mirror is not None else None
 
     # ---------------------------------------------------------------------
     # Optionale Hilfen/Diag
@@ -119,15 +362,24 @@ class ZepMemoryAdapter:
         return dict(self._targets)
 
     def space_snapshot(self, space_id: str) -> Dict[str, Any]:
-        sp = self._spaces.get(space_id)
-        if not sp:
-            raise KeyError(f"unknown space_id {space_id}")
+        return self._spaces.snapshot(space_id)
+
+    def subtree_snapshot(self, space_id: str) -> Dict[str, Any]:
+        """Snapshot eines Spaces inkl. aller Nachfahren (verschachtelt unter "children")."""
+        return self._spaces.subtree(space_id)
+
+    def space_stats(self) -> Dict[str, Any]:
+        """Live-Zähler für /api/orch/_diag."""
+        with self._retain_lock:
+            retention = {
+                **self._retain_stats,
+                "entries": len(self._retained),
+                "bytes": self._retained_bytes,
+                "ttl": self._retain_ttl,
+                "max_bytes": self._retain_max,
+            }
         return {
-            "space_id": sp.space_id,
-            "kind": sp.kind,
-            "name": sp.name,
-            "parent_id": sp.parent_id,
-            "status": sp.status,
-            "messages": list(sp.messages),
-            "events": list(sp.events),
+            **self._spaces.stats(),
+            "retention": retention,
+            "archive": self._archive.stats() if self._archive is not None else None,
         }
@@ -0,0 +1,372 @@
+"""
+ZepMirror
+---------
+Write-behind-Spiegel für `ZepMemoryAdapter`: Workcell-/ST-Nachrichten und Orchestrierungs-Events
+werden dauerhaft in ZEP abgelegt, ohne den Sync-Pfad (`step_out`) zu verlangsamen.
+
+- `enqueue()` ist sync, thread-safe und blockiert nie (Hub läuft auch in Worker-Threads)
+- begrenzte Queue (Anzahl + Bytes); voll → ältester Record fliegt (Stat `dropped`)
+- ein Async-Worker im Server-Loop bündelt pro Ziel (Reihenfolge bleibt erhalten):
+  - thread: `thread.add_messages` (isolated: ein Thread pro Workcell, shared: Chat-Thread)
+  - graph: JSON-Episoden via `graph.add` (mehrere Records pro Episode)
+- Retries mit Backoff; `kick()` (bei gc) sendet sofort ohne Linger, `aclose()` wartet auf Leerlauf
+- Lag-Metriken: Alter des ältesten offenen Records und Enqueue→Send-Latenz
+  (eigene Familie `gateway_zep_mirror_lag_seconds`, Label `target`)
+
+ENV:
+  ORCH_MIRROR                 (default false → nur In-Memory wie bisher; true → Spiegel nach ZEP)
+  ORCH_MIRROR_MAX_PENDING     (Records, default 5000)
+  ORCH_MIRROR_MAX_PENDING_MB  (default 16)
+  ORCH_MIRROR_BATCH           (Records pro Call, default 50)
+  ORCH_MIRROR_LINGER_MS       (default 200)
+  ORCH_MIRROR_RETRIES         (default 3)
+  ORCH_MIRROR_EPISODE_CHARS   (max. Zeichen pro Graph-Episode, default 9000)
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+from backend.metrics import MIRROR_LAG
+
+_MSG_MAX_CHARS = 4000            # ZEP-Limit pro Thread-Nachricht (mit Reserve)
+_THREAD_ROLES = {"user", "assistant", "system", "tool", "function"}
+
+
+@dataclass
+class MirrorRecord:
+    target: str                 # "thread" | "graph"
+    root_id: str                # oberster Space (Workcell) → Ziel-Thread bzw. Episode-Gruppe
+    space_id: str
+    kind: str
+    op: str                     # "space" | "message" | "event" | "status"
+    data: Dict[str, Any]
+    size: int = 0
+    enqueued: float = field(default_factory=time.monotonic)
+
+
+class ZepMirror:
+    def __init__(
+        self,
+        client: Any,
+        user_id: str,
+        *,
+        thread_source: Any = None,
+        thread_mode: str = "isolated",
+        thread_prefix: str = "orch_",
+        max_pending: int = 5000,
+        max_pending_bytes: int = 16 * 1024 * 1024,
+        batch: int = 50,
+        linger: float = 0.2,
+        retries: int = 3,
+        episode_chars: int = 9000,
+    ) -> None:
+        self._client = client
+        self._user_id = user_id
+        self._thread_source = thread_source   # ZepThreadMemory (shared: dessen Thread)
+        self.thread_mode = thread_mode
+        self.thread_prefix = thread_prefix
+        self.max_pending = max(1, max_pending)
+        self.max_pending_bytes = max(1, max_pending_bytes)
+        self.batch = max(1, batch)
+        self.linger = max(0.0, linger)
+        self.retries = max(0, retries)
+        self.episode_chars = max(500, episode_chars)
+        self._lock = threading.Lock()
+        self._pending: Deque[MirrorRecord] = deque()
+        self._pending_bytes = 0
+        self._inflight = 0
+        self._threads: "OrderedDict[str, None]" = OrderedDict()   # bereits angelegte Workcell-Threads
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._kick: Optional[asyncio.Event] = None   # beendet das Linger vorzeitig
+        self._task: Optional["asyncio.Task[None]"] = None
+        self._closed = False
+        self._last_lag = 0.0
+        self._max_lag = 0.0
+        self._stats: Dict[str, int] = {
+            "enqueued": 0, "sent": 0, "batches": 0, "failed": 0, "dropped": 0, "retries": 0,
+        }
+
+    @classmethod
+    def from_env(cls, *, client: Any, user_id: str, thread_source: Any = None, thread_mode: str = "isolated") -> Optional["ZepMirror"]:
+        if os.getenv("ORCH_MIRROR", "false").lower() != "true":
+            return None
+        mirror = cls(
+            client,
+            user_id,
+            thread_source=thread_source,
+            thread_mode=thread_mode,
+            max_pending=int(os.getenv("ORCH_MIRROR_MAX_PENDING", "5000")),
+            max_pending_bytes=int(float(os.getenv("ORCH_MIRROR_MAX_PENDING_MB", "16")) * 1024 * 1024),
+            batch=int(os.getenv("ORCH_MIRROR_BATCH", "50")),
+            linger=float(os.getenv("ORCH_MIRROR_LINGER_MS", "200")) / 1000.0,
+            retries=int(os.getenv("ORCH_MIRROR_RETRIES", "3")),
+            episode_chars=int(os.getenv("ORCH_MIRROR_EPISODE_CHARS", "9000")),
+        )
+        mirror.bind_loop()
+        return mirror
+
+    # -------------------------
+    # Lifecycle
+    # -------------------------
+    def bind_loop(self, loop: Optional[asyncio.AbstractEventLoop] = None) -> None:
+        """Server-Loop merken; Enqueues aus Threads wecken den Worker dort."""
+        try:
+            self._loop = loop or asyncio.get_running_loop()
+        except RuntimeError:
+            self._loop = None
+
+    def _ensure_worker(self, kick: bool = False) -> None:
+        # läuft immer im Loop-Thread
+        if self._wake is None or self._kick is None:
+            self._wake, self._kick = asyncio.Event(), asyncio.Event()
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._worker())
+        self._wake.set()
+        if kick:
+            self._kick.set()
+
+    def _signal(self, kick: bool = False) -> None:
+        loop = self._loop
+        if loop is None or self._closed:
+            return
+        try:
+            on_loop = asyncio.get_running_loop() is loop
+        except RuntimeError:
+            on_loop = False
+        if on_loop:
+            self._ensure_worker(kick)
+        elif loop.is_running():
+            loop.call_soon_threadsafe(self._ensure_worker, kick)
+
+    def kick(self) -> None:
+        """Sofort senden (ohne Linger), z. B. wenn ein Workcell-Baum per gc verschwindet."""
+        self._signal(kick=True)
+
+    async def flush(self, timeout: Optional[float] = 10.0) -> bool:
+        """Wartet, bis alle offenen Records gesendet (oder verworfen) sind; False bei Timeout."""
+        if self._loop is None:
+            self.bind_loop()
+        end = time.monotonic() + timeout if timeout is not None else None
+        while self.pending():
+            self.kick()
+            if end is not None and time.monotonic() >= end:
+                logger.warning("ZEP-Mirror: flush timeout, {} Record(s) offen", self.pending())
+                return False
+            await asyncio.sleep(0.02)
+        return True
+
+    async def aclose(self, timeout: Optional[float] = 10.0) -> None:
+        await self.flush(timeout=timeout)
+        self._closed = True
+        task, self._task = self._task, None
+        if task is not None and not task.done():
+            task.cancel()
+            try:
+                await task
+            except (asyncio.CancelledError, Exception):
+                pass
+
+    # -------------------------
+    # API
+    # -------------------------
+    def enqueue(self, *recs: MirrorRecord) -> None:
+        """Ein oder mehrere Records einreihen (Bulk-Writes: ein Lock, ein Wake-up)."""
+        if self._closed or not recs:
+            return
+        for rec in recs:
+            rec.size = rec.size or len(json.dumps(rec.data, ensure_ascii=False, default=str))
+        with self._lock:
+            for rec in recs:
+                self._pending.append(rec)
+                self._pending_bytes += rec.size
+            self._stats["enqueued"] += len(recs)
+            # Begrenzter Speicher: älteste Records verwerfen statt den Hub zu blockieren
+            while len(self._pending) > self.max_pending or (
+                self._pending_bytes > self.max_pending_bytes and len(self._pending) > 1
+            ):
+                old = self._pending.popleft()
+                self._pending_bytes -= old.size
+                self._stats["dropped"] += 1
+                if self._stats["dropped"] % 1000 == 1:
+                    logger.warning("ZEP-Mirror: Queue voll, {} Record(s) verworfen", self._stats["dropped"])
+            full = len(self._pending) >= self.batch
+        self._signal(kick=full)
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._pending) + self._inflight
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            oldest = self._pending[0].enqueued if self._pending else None
+            return {
+                **self._stats,
+                "pending": len(self._pending) + self._inflight,
+                "pending_bytes": self._pending_bytes,
+                "lag_s": round(time.monotonic() - oldest, 3) if oldest is not None else 0.0,
+                "last_lag_s": round(self._last_lag, 3),
+                "max_lag_s": round(self._max_lag, 3),
+                "thread_mode": self.thread_mode,
+            }
+
+    # -------------------------
+    # Worker
+    # -------------------------
+    async def _worker(self) -> None:
+        assert self._wake is not None and self._kick is not None
+        while True:
+            await self._wake.wait()
+            if self.linger and not self._kick.is_set():
+                # Linger: kurz sammeln, damit mehrere Schritte ein Call werden (kick/volle Batch → sofort)
+                try:
+                    await asyncio.wait_for(self._kick.wait(), timeout=self.linger)
+                except asyncio.TimeoutError:
+                    pass
+            self._wake.clear()
+            self._kick.clear()
+            while True:
+                batch = self._take()
+                if not batch:
+                    break
+                try:
+                    for (target, root_id), recs in _group(batch):
+                        await self._send(target, root_id, recs)
+                finally:
+                    with self._lock:
+                        self._inflight -= len(batch)
+
+    def _take(self) -> List[MirrorRecord]:
+        with self._lock:
+            n = min(self.batch, len(self._pending))
+            batch = [self._pending.popleft() for _ in range(n)]
+            for r in batch:
+                self._pending_bytes -= r.size
+            self._inflight += n
+            return batch
+
+    async def _send(self, target: str, root_id: str, recs: List[MirrorRecord]) -> None:
+        delay = 0.5
+        for attempt in range(self.retries + 1):
+            try:
+                if target == "thread":
+                    await self._send_thread(root_id, recs)
+                else:
+                    await self._send_graph(root_id, recs)
+                lag = time.monotonic() - recs[0].enqueued
+                self._last_lag = lag
+                self._max_lag = max(self._max_lag, lag)
+                MIRROR_LAG.observe(target, lag)
+                self._stats["sent"] += len(recs)
+                self._stats["batches"] += 1
+                return
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if attempt >= self.retries:
+                    self._stats["failed"] += len(recs)
+                    logger.error("ZEP-Mirror: {} Record(s) für {} verworfen: {}", len(recs), target, e)
+                    return
+                self._stats["retries"] += 1
+                logger.warning("ZEP-Mirror: Versuch {} ({}) fehlgeschlagen ({}), retry in {}s", attempt + 1, target, e, delay)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 8.0)
+
+    # --- thread ----------------------------------------------------------------
+    async def _thread_id(self, root_id: str) -> str:
+        if self.thread_mode == "shared" and self._thread_source is not None:
+            return await self._thread_source.ensure_thread()
+        tid = f"{self.thread_prefix}{root_id}"
+        if tid not in self._threads:
+            try:
+                await self._client.thread.create(thread_id=tid, user_id=self._user_id)
+            except Exception as e:
+                # 400/409 = existiert bereits; alles andere beim add_messages sichtbar
+                if getattr(e, "status_code", None) not in (400, 409):
+                    raise
+            self._threads[tid] = None
+            while len(self._threads) > 4096:
+                self._threads.popitem(last=False)
+        return tid
+
+    async def _send_thread(self, root_id: str, recs: List[MirrorRecord]) -> None:
+        msgs = [m for m in (_thread_message(r) for r in recs) if m]
+        if not msgs:
+            return
+        tid = await self._thread_id(root_id)
+        await self._client.thread.add_messages(thread_id=tid, messages=msgs)
+
+    # --- graph -----------------------------------------------------------------
+    async def _send_graph(self, root_id: str, recs: List[MirrorRecord]) -> None:
+        for episode in _episodes(root_id, recs, self.episode_chars):
+            await self._client.graph.add(user_id=self._user_id, type="json", data=episode)
+
+
+# --- Formatierung ----------------------------------------------------------------
+def _group(batch: List[MirrorRecord]) -> List[Tuple[Tuple[str, str], List[MirrorRecord]]]:
+    """Aufeinanderfolgende Records mit gleichem (Ziel, Root) zusammenfassen (Reihenfolge bleibt)."""
+    out: List[Tuple[Tuple[str, str], List[MirrorRecord]]] = []
+    for r in batch:
+        key = (r.target, r.root_id)
+        if out and out[-1][0] == key:
+            out[-1][1].append(r)
+        else:
+            out.append((key, [r]))
+    return out
+
+
+def _clip(text: str, limit: int) -> str:
+    return text if len(text) <= limit else text[: limit - 2] + " …"
+
+
+def _thread_message(r: MirrorRecord) -> Optional[Dict[str, Any]]:
+    if r.op == "message":
+        role = str(r.data.get("role") or "")
+        content = str(r.data.get("content") or "").strip()
+        if not content:
+            return None
+        msg: Dict[str, Any] = {"role": role if role in _THREAD_ROLES else "assistant", "content": _clip(content, _MSG_MAX_CHARS)}
+        if role not in _THREAD_ROLES:
+            msg["name"] = role   # planner/coder/critic
+        return msg
+    if r.op == "event":
+        body = json.dumps(r.data.get("payload") or {}, ensure_ascii=False, default=str)
+        return {"role": "system", "name": r.kind, "content": _clip(f"[{r.data.get('type')}] {body}", _MSG_MAX_CHARS)}
+    return None
+
+
+def _episodes(root_id: str, recs: List[MirrorRecord], limit: int) -> List[str]:
+    """Records als JSON-Episoden (je ≤ `limit` Zeichen); übergroße Einzel-Records werden gekürzt."""
+    out: List[str] = []
+    items: List[Dict[str, Any]] = []
+    size = 0
+    for r in recs:
+        item = {"space_id": r.space_id, "kind": r.kind, "op": r.op, **r.data}
+        raw = json.dumps(item, ensure_ascii=False, default=str)
+        if len(raw) > limit - 200:
+            item.pop("meta", None)
+            if "content" in item:
+                item["content"] = _clip(str(item["content"] or ""), max(100, limit - 600))
+            if "payload" in item:
+                item["payload"] = _clip(json.dumps(item["payload"], ensure_ascii=False, default=str), 400)
+            raw = json.dumps(item, ensure_ascii=False, default=str)
+        if items and size + len(raw) > limit - 100:
+            out.append(json.dumps({"workcell": root_id, "records": items}, ensure_ascii=False, default=str))
+            items, size = [], 0
+        items.append(item)
+        size += len(raw) + 2
+    if items:
+        out.append(json.dumps({"workcell": root_id, "records": items}, ensure_ascii=False, default=str))
+    return out
+
+
+__all__ = ["ZepMirror", "MirrorRecord"]
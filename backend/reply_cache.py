@@ -0,0 +1,186 @@
+"""
+ReplyCache
+----------
+Opt-in Antwort-Cache für `HubChatFacade` bei (nahezu) wiederholten Prompts.
+
+- Lokaler, abhängigkeitsarmer Vektorisierer: gehashte Zeichen-n-Gramme → NumPy-Vektor
+- Treffer = gleicher Thread + gleicher Kontext-Fingerprint + Kosinus ≥ Schwelle
+- TTL, globale LRU-Verdrängung, Scoping pro Thread
+
+ENV:
+  CHAT_REPLY_CACHE=true          aktivieren
+  CHAT_REPLY_CACHE_THRESHOLD     (default 0.92)
+  CHAT_REPLY_CACHE_TTL           (Sekunden, default 600)
+  CHAT_REPLY_CACHE_MAX           (Einträge gesamt, default 512)
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+import re
+import time
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import numpy as np
+except Exception:  # pragma: no cover
+    np = None  # type: ignore[assignment]
+
+_WS_RE = re.compile(r"\s+")
+_PUNCT_RE = re.compile(r"[^\w\s]", re.UNICODE)
+
+
+def normalize_prompt(text: str) -> str:
+    """Casefold, Satzzeichen raus, Whitespace zusammenziehen."""
+    t = _PUNCT_RE.sub(" ", (text or "").casefold())
+    return _WS_RE.sub(" ", t).strip()
+
+
+def fingerprint(text: str) -> str:
+    return hashlib.sha1((text or "").encode("utf-8")).hexdigest()[:16]
+
+
+class HashedNgramVectorizer:
+    """Zeichen-n-Gramme (inkl. Wortgrenzen) per CRC32 in `dim` Buckets, signiert, L2-normiert."""
+
+    def __init__(self, dim: int = 2048, ngram_range: Tuple[int, int] = (3, 5)) -> None:
+        self.dim = dim
+        self.ngram_range = ngram_range
+
+    def transform(self, text: str) -> Any:
+        vec = np.zeros(self.dim, dtype=np.float32)
+        t = f" {normalize_prompt(text)} "
+        lo, hi = self.ngram_range
+        for n in range(lo, hi + 1):
+            for i in range(max(0, len(t) - n + 1)):
+                h = zlib.crc32(t[i:i + n].encode("utf-8"))
+                vec[h % self.dim] += 1.0 if (h >> 31) & 1 else -1.0
+        norm = float(np.linalg.norm(vec))
+        return vec / norm if norm else vec
+
+
+@dataclass
+class _Entry:
+    vec: Any
+    ctx_fp: str
+    reply: str
+    steps: List[Any]
+    created: float
+    hits: int = 0
+
+
+@dataclass
+class _ThreadBucket:
+    entries: "OrderedDict[int, _Entry]" = field(default_factory=OrderedDict)
+
+
+class ReplyCache:
+    def __init__(
+        self,
+        *,
+        threshold: float = 0.92,
+        ttl: float = 600.0,
+        max_entries: int = 512,
+        vectorizer: Optional[HashedNgramVectorizer] = None,
+    ) -> None:
+        if np is None:
+            raise RuntimeError("ReplyCache benötigt numpy")
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max(1, max_entries)
+        self._vec = vectorizer or HashedNgramVectorizer()
+        self._threads: Dict[str, _ThreadBucket] = {}
+        self._lru: "OrderedDict[Tuple[str, int], None]" = OrderedDict()
+        self._seq = 0
+        self._stats: Dict[str, int] = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0, "expired": 0}
+
+    @classmethod
+    def from_env(cls) -> Optional["ReplyCache"]:
+        if os.getenv("CHAT_REPLY_CACHE", "false").lower() != "true":
+            return None
+        return cls(
+            threshold=float(os.getenv("CHAT_REPLY_CACHE_THRESHOLD", "0.92")),
+            ttl=float(os.getenv("CHAT_REPLY_CACHE_TTL", "600")),
+            max_entries=int(os.getenv("CHAT_REPLY_CACHE_MAX", "512")),
+        )
+
+    # -------------------------
+    # API
+    # -------------------------
+    def lookup(self, thread_id: str, prompt: str, ctx_fp: str) -> Optional[Dict[str, Any]]:
+        bucket = self._threads.get(thread_id)
+        if not bucket or not bucket.entries:
+            self._stats["misses"] += 1
+            return None
+        self._expire(thread_id, bucket)
+        cands = [(eid, e) for eid, e in bucket.entries.items() if e.ctx_fp == ctx_fp]
+        if not cands:
+            self._stats["misses"] += 1
+            return None
+        q = self._vec.transform(prompt)
+        mat = np.stack([e.vec for _, e in cands])
+        sims = mat @ q
+        best = int(np.argmax(sims))
+        sim = float(sims[best])
+        if sim < self.threshold:
+            self._stats["misses"] += 1
+            return None
+        eid, entry = cands[best]
+        entry.hits += 1
+        self._lru.move_to_end((thread_id, eid))
+        self._stats["hits"] += 1
+        return {"reply": entry.reply, "steps": list(entry.steps), "similarity": round(sim, 4)}
+
+    def store(self, thread_id: str, prompt: str, ctx_fp: str, reply: str, steps: Optional[List[Any]] = None) -> None:
+        if not reply:
+            return
+        self._seq += 1
+        eid = self._seq
+        bucket = self._threads.setdefault(thread_id, _ThreadBucket())
+        bucket.entries[eid] = _Entry(
+            vec=self._vec.transform(prompt), ctx_fp=ctx_fp, reply=reply,
+            steps=list(steps or []), created=time.monotonic(),
+        )
+        self._lru[(thread_id, eid)] = None
+        self._stats["stores"] += 1
+        while len(self._lru) > self.max_entries:
+            (tid, old), _ = self._lru.popitem(last=False)
+            b = self._threads.get(tid)
+            if b is not None:
+                b.entries.pop(old, None)
+                if not b.entries:
+                    self._threads.pop(tid, None)
+            self._stats["evictions"] += 1
+
+    def invalidate(self, thread_id: Optional[str] = None) -> None:
+        tids = [thread_id] if thread_id else list(self._threads)
+        for tid in tids:
+            b = self._threads.pop(tid, None)
+            if b:
+                for eid in b.entries:
+                    self._lru.pop((tid, eid), None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self._stats, "entries": len(self._lru), "threshold": self.threshold, "ttl": self.ttl}
+
+    # -------------------------
+    # Intern
+    # -------------------------
+    def _expire(self, thread_id: str, bucket: _ThreadBucket) -> None:
+        if self.ttl <= 0:
+            return
+        cutoff = time.monotonic() - self.ttl
+        # Einträge sind in Einfüge-Reihenfolge → vorne die ältesten
+        while bucket.entries:
+            eid, e = next(iter(bucket.entries.items()))
+            if e.created >= cutoff:
+                break
+            bucket.entries.popitem(last=False)
+            self._lru.pop((thread_id, eid), None)
+            self._stats["expired"] += 1
+
+
+__all__ = ["ReplyCache", "HashedNgramVectorizer", "normalize_prompt", "fingerprint"]
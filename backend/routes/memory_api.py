@@ -27,6 +27,7 @@ class SearchIn(BaseModel):
     min_fact_rating: Optional[float] = None
     reranker: Optional[str] = None
     center_node_uuid: Optional[str] = None
+    cursor: Optional[str] = Field(None, description="Paging-Cursor (nur scope: thread)")
 
 # ──────────────────────────────────────────────────────────────────────────────
 # Utils
@@ -169,15 +170,28 @@ async def memory_search(req: Request, body: SearchIn):
         dedupe = bool(sf.get("dedupe", True))
         max_scan = int(sf.get("max_scan", max(200, body.limit * 10)))
 
+        next_cursor = None
         try:
-            msgs = await mem_thread.search_text(
-                body.query,
-                limit=body.limit,
-                roles=roles,
-                exclude_notes=exclude_notes,
-                dedupe=dedupe,
-                max_scan=max_scan
-            )
+            if hasattr(mem_thread, "search_text_page"):
+                page = await mem_thread.search_text_page(
+                    body.query,
+                    limit=body.limit,
+                    roles=roles,
+                    exclude_notes=exclude_notes,
+                    dedupe=dedupe,
+                    cursor=body.cursor,
+                    max_scan=max_scan,
+                )
+                msgs, next_cursor = page.get("results"), page.get("next_cursor")
+            else:
+                msgs = await mem_thread.search_text(
+                    body.query,
+                    limit=body.limit,
+                    roles=roles,
+                    exclude_notes=exclude_notes,
+                    dedupe=dedupe,
+                    max_scan=max_scan
+                )
         except Exception as e:
             logger.error("THREAD SEARCH failed: {}", e)
             return {"results": []}
@@ -186,10 +200,11 @@ async def memory_search(req: Request, body: SearchIn):
             "results": [
                 {
                     "text": m.get("content"),
-                    "meta": {"source": "thread", "role": m.get("role"), "ts": m.get("ts")},
+                    "meta": {"source": "thread", "role": m.get("role"), "ts": m.get("ts"), "score": m.get("score")},
                 }
                 for m in (msgs or [])
-            ]
+            ],
+            "next_cursor": next_cursor,
         }
 
     # 2) Standard: Graph/Knowledge-Scope wie bisher
@@ -1,20 +1,35 @@
 # backend/routes/orch_api.py
 from __future__ import annotations
 
+import asyncio
 import uuid
+import json
 import inspect
-from typing import Optional, List, Dict, Any, Callable, cast
+from typing import Optional, List, Dict, Any, AsyncIterator, Callable, Tuple, cast
 
-from fastapi import APIRouter, Request, BackgroundTasks
+from fastapi import APIRouter, Request, WebSocket, WebSocketDisconnect
 from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
+from starlette.requests import HTTPConnection
 
 from backend.captain_hub import Ticket, OrchestrationRun
+from backend.reply_cache import normalize_prompt
+from backend.llm_cache import cache_bypass, cache_bypassed
+from backend.singleflight import SingleFlight
+from backend.metrics import EVENTS, METRICS, metric_labels, set_metric_labels, timed
+from backend.orchestration.cancel import RUN_CANCELS, CancelToken, RunCancelled, default_deadline, run_cancellable
+from backend.orchestration.events import RUN_EVENTS
+from backend.orchestration.run_store import RunStore
+from backend.orchestration.scheduler import RunScheduler, SchedulerFull
 
 router = APIRouter()
 
-# In-Memory Run-Registry (leichtgewichtig, für Dev/CLI ausreichend)
-_RUNS: Dict[str, Dict[str, Any]] = {}
+# Gleichzeitige identische Chat-Requests teilen sich eine Ausführung
+_CHAT_FLIGHTS = SingleFlight()
+
+# Intervall (Sekunden), in dem nicht-streamende Chat-Requests auf Client-Disconnect prüfen
+_DISCONNECT_POLL = 0.5
 
 
 # =========================
@@ -25,6 +40,29 @@ class StartIn(BaseModel):
     deliverables: Optional[List[str]] = None
     constraints: Optional[List[str]] = None
     nested: Optional[bool] = False
+    priority: Optional[int] = 0     # kleiner = häufiger; Gewicht, begrenzt auf ±ORCH_PRIORITY_MAX
+    deadline_s: Optional[float] = None  # Gesamt-Deadline ab Ausführungsbeginn (None → ORCH_RUN_DEADLINE)
+
+
+class BatchTicketIn(BaseModel):
+    goal: str
+    deliverables: Optional[List[str]] = None
+    constraints: Optional[List[str]] = None
+
+
+class BatchIn(BaseModel):
+    tickets: List[BatchTicketIn]
+    deliverables: Optional[List[str]] = None   # Default für Tickets ohne eigene Liste
+    constraints: Optional[List[str]] = None
+    priority: Optional[int] = 0
+    pack_planner: Optional[bool] = False       # Planner-Prompts bündeln (ein LLM-Call pro Chunk)
+    pack_size: Optional[int] = 8
+    deadline_s: Optional[float] = None         # pro Run, wie StartIn
+
+
+class CancelIn(BaseModel):
+    run_id: str                                # auch batch_id → alle Runs des Batches
+    reason: Optional[str] = None
 
 
 class ChatIn(BaseModel):
@@ -41,6 +79,9 @@ def _has_any_spokes(hub) -> bool:
         r = getattr(hub, "router", None)
         if r is None:
             return False
+        has = getattr(r, "has_spokes", None)
+        if callable(has):
+            return bool(has())
         roles = ("planner", "coder", "critic")
         for role in roles:
             try:
@@ -54,12 +95,166 @@ def _has_any_spokes(hub) -> bool:
         return False
 
 
+def _scheduler(request: HTTPConnection) -> RunScheduler:
+    """Run-Scheduler aus app.state (Lifespan); lazy angelegt, falls der Router standalone läuft."""
+    sched = getattr(request.app.state, "run_scheduler", None)
+    if sched is None:
+        sched = request.app.state.run_scheduler = RunScheduler.from_env()
+    return sched
+
+
+def _run_store(request: HTTPConnection) -> RunStore:
+    """Run-Registry aus app.state (begrenzter Cache vor SQLite); lazy wie `_scheduler`."""
+    store = getattr(request.app.state, "run_store", None)
+    if store is None:
+        store = request.app.state.run_store = RunStore.from_env()
+    return store
+
+
+def _caller_id(request: Request) -> str:
+    """Fairness-Schlüssel: `X-Caller-Id` oder Client-Host."""
+    cid = request.headers.get("x-caller-id")
+    if cid:
+        return cid.strip()[:128]
+    return request.client.host if request.client else "anon"
+
+
+def _stream_mode(request: Request) -> Optional[str]:
+    """'sse' bei `Accept: text/event-stream`, 'text' bei `?stream=true` ohne SSE-Accept, sonst None."""
+    accept = (request.headers.get("accept") or "").lower()
+    if "text/event-stream" in accept:
+        return "sse"
+    if (request.query_params.get("stream") or "").lower() in ("1", "true", "yes"):
+        return "text" if "text/plain" in accept else "sse"
+    return None
+
+
+def _sse(data: Dict[str, Any], event: Optional[str] = None) -> str:
+    head = f"event: {event}\n" if event else ""
+    return f"{head}data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+async def _stream_chat(goal: str, request: Request, mode: str) -> AsyncIterator[str]:
+    """
+    Token-Stream über die Chat-Fassade (`converse_stream`).
+    Hub-Pipeline/Fallbacks liefern keine Tokens → Endergebnis als ein Chunk.
+    """
+    hub = getattr(request.app.state, "hub", None)
+    chat_obj = getattr(hub, "chat", None) if hub else None
+    stream_fn = getattr(chat_obj, "converse_stream", None)
+
+    if callable(stream_fn) and not _has_any_spokes(hub):
+        parts: List[str] = []
+        # Kontext-Report pro Request (Out-Dict), nicht von der geteilten Fassade lesen
+        context: Dict[str, Any] = {"sources": [], "dropped": []}
+        async for tok in stream_fn(goal, context=context):
+            parts.append(tok)
+            yield _sse({"token": tok}) if mode == "sse" else tok
+        reply = "".join(parts).strip()
+        res: Dict[str, Any] = {"reply": reply, "steps": [["assistant", reply]], "context": context}
+    else:
+        # Disconnect beendet hier die StreamingResponse selbst (Generator wird abgebrochen)
+        res = await _chat_once(goal, request, watch_disconnect=False)
+        if mode == "sse":
+            yield _sse({"token": res.get("reply", "")})
+        else:
+            yield str(res.get("reply", ""))
+
+    if mode == "sse":
+        yield _sse(res, event="done")
+
+
+async def _run_pipeline(hub, run: OrchestrationRun, ticket: Ticket) -> Dict[str, Any]:
+    # Async-Pipeline: wartet auf I/O im Event-Loop statt einen Threadpool-Worker zu belegen
+    if hasattr(hub, "arun_ticket"):
+        return await hub.arun_ticket(run=run, ticket=ticket)
+    return await run_in_threadpool(lambda: hub.run_ticket(run=run, ticket=ticket))
+
+
+def _cancelled_record(run_id: str, goal: Optional[str], reason: Optional[str]) -> Dict[str, Any]:
+    return {"run_id": run_id, "goal": goal, "success": False, "cancelled": True, "error": reason or "cancelled"}
+
+
+async def _execute_run(
+    hub, runs: RunStore, run: OrchestrationRun, ticket: Ticket, *, deadline: Optional[float] = None
+) -> Dict[str, Any]:
+    """
+    Führt einen Run aus (Async-Pipeline bevorzugt), speichert das Ergebnis und publiziert `run_done`.
+    Läuft als eigener Task am Cancel-Token des Runs: /api/orch/cancel bzw. `deadline` brechen ihn ab.
+    """
+    run_id, goal = run.run_id, ticket.goal
+    token = run.cancel or RUN_CANCELS.register(run_id)
+    run.cancel = token
+    if token.cancelled:
+        # schon in der Queue abgebrochen (z. B. Run in einem Batch-Chunk)
+        record = _cancelled_record(run_id, goal, token.reason)
+    else:
+        RUN_EVENTS.publish(run_id, "running", {"goal": goal})
+        try:
+            # Deadline schon gesetzt (z. B. ab gebündelter Planung) → nicht verlängern
+            timeout = deadline if token.deadline is None else None
+            res = await run_cancellable(_run_pipeline(hub, run, ticket), token, timeout=timeout)
+            record = {"run_id": run_id, "goal": goal, "success": True, "artifacts": res}
+        except RunCancelled as e:
+            record = _cancelled_record(run_id, goal, e.reason)
+        except Exception as e:
+            record = {"run_id": run_id, "goal": goal, "success": False, "error": str(e)}
+    runs.put(run_id, record)
+    RUN_EVENTS.publish(run_id, "run_done", record)
+    RUN_CANCELS.discard(run_id)
+    return record
+
+
+async def _plan_chunk(hub, live: List[tuple[OrchestrationRun, Ticket]], deadline: Optional[float]) -> None:
+    """
+    Gebündelte Planung eines Batch-Chunks unter den Cancel-Tokens der Runs: die Run-Deadline
+    läuft ab hier (inkl. Planung), Abbruch eines Runs bzw. Deadline beendet die gemeinsame
+    Planung → die Runs planen dann einzeln (bzw. brechen selbst ab).
+    """
+    tokens = [run.cancel for run, _ in live if run.cancel is not None]
+    for tok in tokens:
+        tok.arm(deadline)
+    task = asyncio.ensure_future(hub.aplan_packed([tk for _, tk in live]))
+    for tok in tokens:
+        tok.attach(task)
+    rests = [r for tok in tokens if (r := tok.remaining()) is not None]
+    try:
+        done, _ = await asyncio.wait({task}, timeout=min(rests) if rests else None)
+    finally:
+        for tok in tokens:
+            tok.detach(task)
+        if not task.done():
+            task.cancel()
+    if task not in done or task.cancelled() or task.exception() is not None:
+        return
+    for (_, tk), plan in zip(live, task.result()):
+        tk.plan = plan
+
+
+async def _run_state(run_id: str, sched: RunScheduler, runs: RunStore) -> str:
+    state = sched.state(run_id)
+    if state:
+        return state
+    last = RUN_EVENTS.last_type(run_id)
+    if last == "run_done" or last is None:
+        record = await runs.aget(run_id)
+        if record is not None and record.get("cancelled"):
+            return "cancelled"
+        return "done" if last == "run_done" or record is not None else "unknown"
+    if last == "queued":
+        return "queued"
+    return "running" if last else "unknown"
+
+
 # =========================
 # Routes
 # =========================
 @router.post("/start")
-async def orch_start(body: StartIn, request: Request, background_tasks: BackgroundTasks):
-    """Startet eine Orchestrierung im Hintergrund und liefert eine run_id zurück."""
+async def orch_start(body: StartIn, request: Request):
+    """
+    Reiht eine Orchestrierung im Run-Scheduler ein und liefert eine run_id zurück.
+    Queue voll → 429 mit Retry-After.
+    """
     hub = getattr(request.app.state, "hub", None)
     if hub is None:
         return {"run_id": None, "error": "hub not ready"}
@@ -69,24 +264,286 @@ async def orch_start(body: StartIn, request: Request, background_tasks: Backgrou
     deliverables = body.deliverables or []
     constraints = body.constraints or []
 
-    run = OrchestrationRun(run_id=run_id)
+    run = OrchestrationRun(run_id=run_id, cancel=RUN_CANCELS.register(run_id))
     ticket = Ticket(ticket_id=str(uuid.uuid4()), goal=goal, deliverables=deliverables, constraints=constraints)
 
-    def _do():
-        try:
-            res = hub.run_ticket(run=run, ticket=ticket)
-            _RUNS[run_id] = {"run_id": run_id, "goal": goal, "success": True, "artifacts": res}
-        except Exception as e:
-            _RUNS[run_id] = {"run_id": run_id, "goal": goal, "success": False, "error": str(e)}
+    runs = _run_store(request)
+    bypass = cache_bypassed()  # Scheduler-Worker erben den Request-Kontext nicht
+    deadline = body.deadline_s if body.deadline_s is not None else default_deadline()
+
+    async def _do():
+        with cache_bypass(bypass):
+            await _execute_run(hub, runs, run, ticket, deadline=deadline)
 
-    background_tasks.add_task(_do)
-    return {"run_id": run_id}
+    try:
+        position = await _scheduler(request).submit(
+            run_id, _do, caller=_caller_id(request), priority=int(body.priority or 0)
+        )
+    except SchedulerFull as e:
+        RUN_CANCELS.discard(run_id)
+        return JSONResponse(
+            status_code=429,
+            content={"run_id": None, "error": "run queue full", "retry_after": e.retry_after},
+            headers={"Retry-After": str(e.retry_after)},
+        )
+    RUN_EVENTS.publish(run_id, "queued", {"goal": goal, "queue_position": position})
+    return {"run_id": run_id, "state": "queued", "queue_position": position}
 
 
 @router.get("/status")
-async def orch_status(run_id: str):
-    """Liefert den zuletzt bekannten Status/Result eines Runs."""
-    return {"run_id": run_id, "result": _RUNS.get(run_id)}
+async def orch_status(run_id: str, request: Request):
+    """Liefert Status (queued/running/done), Queue-Position und ggf. Result eines Runs."""
+    sched = _scheduler(request)
+    runs = _run_store(request)
+    result = await runs.aget(run_id)
+    state = await _run_state(run_id, sched, runs)
+    return {
+        "run_id": run_id,
+        "state": state,
+        "queue_position": sched.position(run_id),
+        "result": result,
+    }
+
+
+@router.post("/batch")
+async def orch_batch(body: BatchIn, request: Request):
+    """
+    Viele Tickets auf einmal: Runs laufen nebenläufig über den Run-Scheduler.
+    `pack_planner`: je Chunk (`pack_size`) ein gebündelter Planner-Call, danach laufen die
+    Tickets des Chunks parallel mit vorab erzeugtem Plan.
+    """
+    hub = getattr(request.app.state, "hub", None)
+    if hub is None:
+        return {"batch_id": None, "error": "hub not ready"}
+    if not body.tickets:
+        return {"batch_id": None, "error": "no tickets"}
+
+    sched = _scheduler(request)
+    runs = _run_store(request)
+    batch_id = f"batch_{uuid.uuid4().hex}"
+    items: List[tuple[OrchestrationRun, Ticket]] = []
+    for t in body.tickets:
+        ticket = Ticket(
+            ticket_id=str(uuid.uuid4()),
+            goal=t.goal.strip(),
+            deliverables=t.deliverables if t.deliverables is not None else list(body.deliverables or []),
+            constraints=t.constraints if t.constraints is not None else list(body.constraints or []),
+        )
+        items.append((OrchestrationRun(run_id=f"run_{uuid.uuid4().hex}"), ticket))
+
+    pack = bool(body.pack_planner) and hasattr(hub, "aplan_packed")
+    size = max(1, int(body.pack_size or 8)) if pack else 1
+    chunks = [items[i:i + size] for i in range(0, len(items), size)]
+
+    bypass = cache_bypassed()
+    deadline = body.deadline_s if body.deadline_s is not None else default_deadline()
+    for run, _ in items:
+        run.cancel = RUN_CANCELS.register(run.run_id)
+
+    def _job(chunk: List[tuple[OrchestrationRun, Ticket]]):
+        # Chunk belegt so viele Worker-Slots, wie Runs gleichzeitig laufen dürfen
+        width = sched.weight_for(len(chunk))
+
+        async def _do():
+            with cache_bypass(bypass):
+                live = [(run, tk) for run, tk in chunk if not (run.cancel and run.cancel.cancelled)]
+                if pack and len(live) > 1:
+                    await _plan_chunk(hub, live, deadline)
+                gate = asyncio.Semaphore(width)
+
+                async def _one(run: OrchestrationRun, tk: Ticket):
+                    async with gate:
+                        return await _execute_run(hub, runs, run, tk, deadline=deadline)
+
+                await asyncio.gather(*(_one(run, tk) for run, tk in chunk))
+        return _do
+
+    # Alles oder nichts: ein halb eingereihter Batch wäre schwer nachzuverfolgen
+    jobs = [
+        (chunk[0][0].run_id, _job(chunk)) if len(chunk) == 1
+        else (f"{batch_id}:{k}", _job(chunk), [run.run_id for run, _ in chunk])
+        for k, chunk in enumerate(chunks)
+    ]
+    try:
+        positions = await sched.submit_many(jobs, caller=_caller_id(request), priority=int(body.priority or 0))
+    except SchedulerFull as e:
+        for run, _ in items:
+            RUN_CANCELS.discard(run.run_id)
+        return JSONResponse(
+            status_code=429,
+            content={"batch_id": None, "error": "run queue full", "retry_after": e.retry_after},
+            headers={"Retry-After": str(e.retry_after)},
+        )
+    for chunk, position in zip(chunks, positions):
+        for run, tk in chunk:
+            RUN_EVENTS.publish(run.run_id, "queued", {"goal": tk.goal, "queue_position": position, "batch_id": batch_id})
+
+    runs.put(batch_id, {
+        "batch_id": batch_id,
+        "packed": pack,
+        "runs": [{"run_id": run.run_id, "goal": tk.goal} for run, tk in items],
+    })
+    return {"batch_id": batch_id, "run_ids": [run.run_id for run, _ in items], "jobs": len(chunks), "packed": pack}
+
+
+@router.get("/batch/{batch_id}")
+async def orch_batch_status(batch_id: str, request: Request):
+    """Aggregierter Batch-Status mit Fortschritt pro Ticket."""
+    sched = _scheduler(request)
+    runs = _run_store(request)
+    batch = await runs.aget(batch_id)
+    if batch is None:
+        return {"batch_id": batch_id, "error": "unknown batch"}
+    counts: Dict[str, int] = {"queued": 0, "running": 0, "done": 0, "failed": 0, "cancelled": 0, "unknown": 0}
+    per_run: List[Dict[str, Any]] = []
+    for item in batch.get("runs", []):
+        rid = item["run_id"]
+        state = await _run_state(rid, sched, runs)
+        entry: Dict[str, Any] = {"run_id": rid, "goal": item.get("goal"), "state": state}
+        if state == "done":
+            rec = await runs.aget(rid) or {}
+            entry["success"] = rec.get("success")
+            if rec.get("success") is False:
+                state = "failed"
+                entry["error"] = rec.get("error")
+        counts[state] = counts.get(state, 0) + 1
+        per_run.append(entry)
+    total = len(per_run)
+    finished = counts["done"] + counts["failed"] + counts["cancelled"]
+    return {
+        "batch_id": batch_id,
+        "packed": batch.get("packed", False),
+        "total": total,
+        "counts": counts,
+        "progress": round(finished / total, 3) if total else 1.0,
+        "state": "done" if finished == total else "running",
+        "runs": per_run,
+    }
+
+
+@router.get("/workcells/{space_id}")
+async def orch_workcell(space_id: str, request: Request):
+    """Workcell-/ST-Space eines (auch beendeten) Runs inkl. Kinder: aus der Retention bzw. dem Archiv."""
+    hub = getattr(request.app.state, "hub", None)
+    inspect_space = getattr(getattr(hub, "memory", None), "inspect_space", None)
+    if inspect_space is None:
+        return {"space_id": space_id, "error": "no space store"}
+    snap = await run_in_threadpool(inspect_space, space_id)
+    if snap is None:
+        return {"space_id": space_id, "error": "unknown space"}
+    return snap
+
+
+@router.post("/cancel")
+async def orch_cancel(body: CancelIn, request: Request):
+    """
+    Bricht einen Run ab: wartende Runs verlassen sofort die Queue, laufende werden über ihr
+    Cancel-Token abgebrochen (Slots/Spaces werden im Hub freigegeben, `run_done` mit
+    `cancelled: true`). Eine batch_id bricht alle noch offenen Runs des Batches ab.
+    """
+    sched = _scheduler(request)
+    runs = _run_store(request)
+    reason = (body.reason or "").strip() or "cancelled by client"
+    batch = await runs.aget(body.run_id) if body.run_id.startswith("batch_") else None
+    run_ids = [item["run_id"] for item in batch.get("runs", [])] if batch else [body.run_id]
+
+    out: List[Dict[str, Any]] = []
+    for rid in run_ids:
+        if sched.cancel(rid):
+            record = _cancelled_record(rid, None, reason)
+            runs.put(rid, record)
+            RUN_EVENTS.publish(rid, "run_done", record)
+            RUN_CANCELS.discard(rid)
+            out.append({"run_id": rid, "state": "cancelled", "was": "queued"})
+        elif RUN_CANCELS.cancel(rid, reason):
+            # läuft bzw. wartet in einem Batch-Chunk → endet mit `run_done` (cancelled)
+            out.append({"run_id": rid, "state": "cancelling", "was": await _run_state(rid, sched, runs)})
+        else:
+            out.append({"run_id": rid, "state": await _run_state(rid, sched, runs), "cancelled": False})
+    if batch:
+        return {"batch_id": body.run_id, "runs": out}
+    return out[0]
+
+
+def _event_offset(raw: Optional[str]) -> int:
+    try:
+        return max(0, int(raw)) if raw else 0
+    except ValueError:
+        return 0
+
+
+def _run_lookup(run_id: str, conn: HTTPConnection) -> Tuple[bool, Optional[Dict[str, Any]]]:
+    """
+    (bekannt, Ergebnis): bekannt = Eventbus, Scheduler, Cancel-Registry oder RunStore kennen
+    die run_id. Ergebnis nur, wenn der Run nicht (mehr) im Bus liegt.
+    """
+    if RUN_EVENTS.known(run_id):
+        return True, None
+    if _scheduler(conn).state(run_id) or RUN_CANCELS.get(run_id) is not None:
+        return True, None
+    record = _run_store(conn).get(run_id)
+    return record is not None, record
+
+
+async def _run_events(
+    run_id: str, offset: int, record: Optional[Dict[str, Any]]
+) -> AsyncIterator[Optional[Dict[str, Any]]]:
+    """
+    Events eines Runs ab `offset`. Ist der Run aus dem Bus verdrängt (oder stammt aus
+    einem früheren Prozess), wird das Ergebnis aus dem RunStore als `run_done` geliefert.
+    """
+    if record is not None:
+        yield {"offset": 0, "run_id": run_id, "type": "run_done", "data": record}
+        return
+    # nur hier ist der Run sicher bekannt → Log ggf. anlegen (queued, noch ohne Events)
+    async for ev in RUN_EVENTS.subscribe(run_id, offset, heartbeat=15.0, create=True):
+        yield ev
+
+
+@router.get("/runs/{run_id}/events")
+async def orch_run_events(run_id: str, request: Request, offset: Optional[str] = None):
+    """SSE-Stream der Run-Events (start/step_out/done/run_done); Replay ab `offset` bzw. Last-Event-ID."""
+    last_id = request.headers.get("last-event-id")
+    start = _event_offset(offset) if offset is not None else (_event_offset(last_id) + 1 if last_id else 0)
+    known, record = await run_in_threadpool(_run_lookup, run_id, request)
+    if not known:
+        return JSONResponse(status_code=404, content={"run_id": run_id, "error": "unknown run"})
+
+    async def _gen() -> AsyncIterator[str]:
+        async for ev in _run_events(run_id, start, record):
+            if await request.is_disconnected():
+                return
+            if ev is None:
+                yield ": keep-alive\n\n"
+                continue
+            yield f"id: {ev['offset']}\n" + _sse(ev, event=ev["type"])
+
+    return StreamingResponse(
+        _gen(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.websocket("/runs/{run_id}/events")
+async def orch_run_events_ws(websocket: WebSocket, run_id: str):
+    """WebSocket-Variante: JSON-Events, `?offset=` für Replay; schließt nach `run_done`."""
+    await websocket.accept()
+    start = _event_offset(websocket.query_params.get("offset"))
+    known, record = await run_in_threadpool(_run_lookup, run_id, websocket)
+    if not known:
+        await websocket.send_json({"type": "error", "run_id": run_id, "error": "unknown run"})
+        await websocket.close(code=4404)
+        return
+    try:
+        async for ev in _run_events(run_id, start, record):
+            if ev is None:
+                await websocket.send_json({"type": "ping"})
+                continue
+            await websocket.send_json(ev)
+        await websocket.close()
+    except WebSocketDisconnect:
+        pass
 
 
 @router.get("/_diag")
@@ -97,6 +554,9 @@ async def orch_diag(request: Request):
     mem = getattr(app.state, "memory", None)
     adapter = getattr(app.state, "adapter", None)
     persist = getattr(app.state, "persist_cfg", {}) or {}
+    llm = getattr(app.state, "llm", None)
+    mem_thread = getattr(app.state, "mem_thread", None)
+    hub_mem = getattr(hub, "memory", None)
 
     # targets können entweder top-level liegen oder unter persist["targets"]
     targets = None
@@ -121,6 +581,20 @@ async def orch_diag(request: Request):
             "thread_mode": getattr(adapter, "thread_mode", None),
             "targets": getattr(adapter, "targets", None),
         },
+        "llm": llm.stats() if llm is not None and hasattr(llm, "stats") else None,
+        "context_cache": mem_thread.context_cache_stats() if hasattr(mem_thread, "context_cache_stats") else None,
+        "write_behind": mem_thread.write_behind_stats() if hasattr(mem_thread, "write_behind_stats") else None,
+        "spaces": hub_mem.space_stats() if hasattr(hub_mem, "space_stats") else None,
+        "mirror": hub_mem.mirror_stats() if hasattr(hub_mem, "mirror_stats") else None,
+        "reply_cache": hub.reply_cache.stats() if getattr(hub, "reply_cache", None) is not None else None,
+        "chat_singleflight": _CHAT_FLIGHTS.stats(),
+        "run_scheduler": _scheduler(request).stats(),
+        "run_store": await run_in_threadpool(_run_store(request).stats),
+        "run_events": RUN_EVENTS.stats(),
+        "cancel": RUN_CANCELS.stats(),
+        "spoke_slots": hub.slot_stats() if hasattr(hub, "slot_stats") else None,
+        "latency": METRICS.snapshot(),
+        "events": EVENTS.snapshot(),
     }
 
 
@@ -136,14 +610,76 @@ async def orch_chat(body: ChatIn, request: Request):
     if not goal:
         return {"reply": "", "steps": []}
 
+    # Route-Label für alle Phasen-Messungen dieses Requests (ContextVar → erbt in Tasks)
+    set_metric_labels(route=request.url.path)
+
+    # Streaming: `Accept: text/event-stream` (SSE) oder `?stream=true`
+    mode = _stream_mode(request)
+    if mode:
+        media = "text/event-stream" if mode == "sse" else "text/plain; charset=utf-8"
+        return StreamingResponse(
+            _stream_chat(goal, request, mode),
+            media_type=media,
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+    return await _chat_once(goal, request)
+
+
+async def _until_disconnect(request: Request, aw: Any) -> Any:
+    """
+    `aw` abwarten und dabei auf Client-Disconnect prüfen. Trennt der Client, wird abgebrochen
+    (`RunCancelled`); die Single-Flight bricht die Kette ab, sobald niemand mehr wartet.
+    """
+    task = asyncio.ensure_future(aw)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=_DISCONNECT_POLL)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                EVENTS.inc("orch_chat_disconnect")
+                raise RunCancelled("client disconnected")
+    finally:
+        if not task.done():
+            task.cancel()
+
+
+async def _chat_once(goal: str, request: Request, *, watch_disconnect: bool = True) -> Dict[str, Any]:
+    """
+    Single-Flight vor der Chat-Kette: Key = (Thread, normalisierter Prompt, Kontext-Version).
+    Duplikate warten auf dieselbe Ausführung → ein LLM-Call, eine Persistierung.
+    Client-Disconnect bzw. Run-Deadline → `cancelled: true` statt Antwort.
+    """
+    state = request.app.state
+    mem_thread = getattr(state, "mem_thread", None)
+    key = (
+        getattr(state, "thread_id", None),
+        normalize_prompt(goal),
+        getattr(mem_thread, "context_version", 0),
+    )
+    flight = _CHAT_FLIGHTS.do(key, lambda: _chat_chain(goal, request))
+    try:
+        with timed("orch_chat"):
+            res, shared = await (_until_disconnect(request, flight) if watch_disconnect else flight)
+    except RunCancelled as e:
+        return {"reply": "", "steps": [], "cancelled": True, "error": e.reason}
+    if shared:
+        res = {**res, "coalesced": True}
+    return res
+
+
+async def _chat_chain(goal: str, request: Request) -> Dict[str, Any]:
+    """Nicht-streamende Chat-Kette (Hub-Pipeline → Bridge → Fassade → Lobby → Fallback)."""
     hub = getattr(request.app.state, "hub", None)
     lobby = getattr(request.app.state, "lobby", None)
 
     # 1) Wenn Spokes registriert sind → volle Hub-Pipeline
     if hub and _has_any_spokes(hub):
-        run = OrchestrationRun(run_id=str(uuid.uuid4()))
-        ticket = Ticket(ticket_id=str(uuid.uuid4()), goal=goal, deliverables=[], constraints=[])
-        res = await run_in_threadpool(hub.run_ticket, run, ticket)
+        with metric_labels(engine="hub_pipeline"), timed("orch_branch"):
+            run = OrchestrationRun(run_id=str(uuid.uuid4()), cancel=CancelToken())
+            ticket = Ticket(ticket_id=str(uuid.uuid4()), goal=goal, deliverables=[], constraints=[])
+            # Abbruch des Aufrufers (Disconnect) setzt auch das Token → Sync-Pipeline stoppt am Checkpoint
+            res = await run_cancellable(_run_pipeline(hub, run, ticket), run.cancel, timeout=default_deadline())
         steps: List[List[str]] = []
         if res.get("plan"):
             steps.append(["planner", res["plan"]])
@@ -159,7 +695,8 @@ async def orch_chat(body: ChatIn, request: Request):
             sync_fn = getattr(hub, "chat_reply_sync", None)
             if callable(sync_fn):
                 call_sync = cast(Callable[[str], Optional[str]], sync_fn)
-                reply = await run_in_threadpool(call_sync, goal)
+                with metric_labels(engine="bridge"), timed("orch_branch"):
+                    reply = await run_in_threadpool(call_sync, goal)
                 if reply:
                     return {"reply": reply, "steps": []}
         except Exception:
@@ -172,14 +709,19 @@ async def orch_chat(body: ChatIn, request: Request):
             if not callable(fn):
                 continue
             try:
-                if inspect.iscoroutinefunction(fn):
-                    out = await fn(goal)
-                else:
-                    out = await run_in_threadpool(fn, goal)
+                with metric_labels(engine="facade"), timed("orch_branch"):
+                    if inspect.iscoroutinefunction(fn):
+                        out = await fn(goal)
+                    else:
+                        out = await run_in_threadpool(fn, goal)
                 if isinstance(out, dict):
                     rep = out.get("reply")
                     if isinstance(rep, str) and rep:
-                        return {"reply": rep, "steps": out.get("steps", [])}
+                        res_out: Dict[str, Any] = {"reply": rep, "steps": out.get("steps", [])}
+                        for k in ("context", "cached"):
+                            if k in out:
+                                res_out[k] = out[k]
+                        return res_out
                 elif isinstance(out, str) and out:
                     return {"reply": out, "steps": []}
             except Exception:
@@ -188,9 +730,13 @@ async def orch_chat(body: ChatIn, request: Request):
     # 4) Fallback: Lobby (falls vorhanden)
     if lobby and hasattr(lobby, "converse"):
         try:
-            out = await lobby.converse(goal)
+            with metric_labels(engine="lobby"), timed("orch_branch"):
+                out = await lobby.converse(goal)
             if isinstance(out, dict):
-                return {"reply": out.get("reply", ""), "steps": out.get("steps", [])}
+                res_out = {"reply": out.get("reply", ""), "steps": out.get("steps", [])}
+                if "context" in out:
+                    res_out["context"] = out["context"]
+                return res_out
             if isinstance(out, tuple):
                 reply = out[0]
                 steps = out[1] if len(out) > 1 else []
@@ -199,6 +745,7 @@ async def orch_chat(body: ChatIn, request: Request):
             pass
 
     # 5) Letzter Fallback (keine Chat-Engine verfügbar)
+    EVENTS.inc("orch_branch", engine="fallback")
     plan = f"(Fallback) Plan aus Ziel:\n{goal}"
     impl = f"(No coder) Nutze Plan:\n{plan}"
     return {"reply": impl, "steps": [["planner", plan], ["coder", impl]]}
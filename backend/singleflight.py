@@ -0,0 +1,49 @@
+"""
+SingleFlight
+------------
+Koalesziert identische, gleichzeitig laufende Aufrufe: der erste Aufrufer startet
+die Arbeit als Task, alle weiteren mit gleichem Key warten auf dasselbe Ergebnis.
+Bricht ein Wartender ab (z. B. Client-Disconnect), läuft der Task für die übrigen weiter;
+bricht der letzte Wartende ab, wird auch der Task abgebrochen (niemand braucht das Ergebnis).
+"""
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+
+class SingleFlight:
+    def __init__(self) -> None:
+        self._inflight: Dict[Hashable, "asyncio.Task[Any]"] = {}
+        self._waiters: Dict["asyncio.Task[Any]", int] = {}
+        self._stats: Dict[str, int] = {"leaders": 0, "coalesced": 0, "abandoned": 0}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """Rückgabe (Ergebnis, shared): shared=True, wenn an einen laufenden Aufruf angehängt."""
+        task = self._inflight.get(key)
+        shared = task is not None
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _t, k=key: self._inflight.pop(k, None))
+            self._stats["leaders"] += 1
+        else:
+            self._stats["coalesced"] += 1
+        self._waiters[task] = self._waiters.get(task, 0) + 1
+        try:
+            return await asyncio.shield(task), shared
+        finally:
+            left = self._waiters.get(task, 1) - 1
+            if left > 0:
+                self._waiters[task] = left
+            else:
+                self._waiters.pop(task, None)
+                if not task.done():
+                    task.cancel()
+                    self._stats["abandoned"] += 1
+
+    def stats(self) -> Dict[str, int]:
+        return {**self._stats, "inflight": len(self._inflight)}
+
+
+__all__ = ["SingleFlight"]
@@ -0,0 +1,86 @@
+"""
+SpokeSlots
+----------
+Kapazitäts-Slots für Spokes (Anzahl gleichzeitiger Tickets pro Spoke).
+
+- `try_acquire()` nicht-blockierend (Auswahl im Hub: least-loaded, Score als Tie-Break)
+- `force_acquire()` belegt auch über Kapazität (Fallback „overcommit“, wird gezählt)
+- thread-safe, da die Sync-Pipeline aus Worker-Threads läuft
+- `subscribe(wake)`: Wartende (Hub, mehrere Spokes gleichzeitig) werden bei `release()`
+  geweckt statt zu pollen; `wake` muss aus beliebigen Threads aufrufbar sein
+"""
+from __future__ import annotations
+
+import threading
+from typing import Any, Callable, Dict, List
+
+
+class SpokeSlots:
+    def __init__(self, capacity: int = 1) -> None:
+        self.capacity = max(1, int(capacity))
+        self._lock = threading.Lock()
+        self._in_use = 0
+        self._stats: Dict[str, int] = {"acquired": 0, "rejected": 0, "overcommits": 0}
+        self._waiters: List[Callable[[], None]] = []
+
+    @property
+    def in_use(self) -> int:
+        return self._in_use
+
+    @property
+    def free(self) -> int:
+        return max(0, self.capacity - self._in_use)
+
+    @property
+    def load(self) -> float:
+        return self._in_use / self.capacity
+
+    def try_acquire(self) -> bool:
+        with self._lock:
+            if self._in_use >= self.capacity:
+                self._stats["rejected"] += 1
+                return False
+            self._in_use += 1
+            self._stats["acquired"] += 1
+            return True
+
+    def force_acquire(self) -> None:
+        with self._lock:
+            if self._in_use >= self.capacity:
+                self._stats["overcommits"] += 1
+            self._in_use += 1
+            self._stats["acquired"] += 1
+
+    def release(self) -> None:
+        with self._lock:
+            if self._in_use > 0:
+                self._in_use -= 1
+            waiters = list(self._waiters) if self._in_use < self.capacity else []
+        for wake in waiters:
+            try:
+                wake()
+            except Exception:
+                pass
+
+    def subscribe(self, wake: Callable[[], None]) -> None:
+        with self._lock:
+            self._waiters.append(wake)
+
+    def unsubscribe(self, wake: Callable[[], None]) -> None:
+        with self._lock:
+            try:
+                self._waiters.remove(wake)
+            except ValueError:
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {"capacity": self.capacity, "in_use": self._in_use, "waiters": len(self._waiters), **self._stats}
+
+
+def spoke_slots(spoke: Any) -> "SpokeSlots | None":
+    """Slots eines Spokes oder None (= unbegrenzt, Legacy-Spokes mit No-op acquire/release)."""
+    sl = getattr(spoke, "slots", None)
+    return sl if isinstance(sl, SpokeSlots) else None
+
+
+__all__ = ["SpokeSlots", "spoke_slots"]
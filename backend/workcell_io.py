@@ -1,7 +1,10 @@
 
 from __future__ import annotations
+import inspect
 from dataclasses import dataclass
-from typing import Any, Dict, Optional, Protocol
+from typing import Any, Dict, List, Optional, Protocol
+
+from backend.orchestration.events import RUN_EVENTS, RunEventBus
 
 # Keep protocol tiny and compatible with your existing Memory
 class Memory(Protocol):
@@ -11,6 +14,16 @@ class Memory(Protocol):
     def set_status(self, *, space_id: str, status: str) -> None: ...
     def gc(self, *, space_id: str) -> None: ...
 
+# Optionale Bulk-Primitiven (z. B. ZepMemoryAdapter): WorkcellIO nutzt sie, wenn vorhanden,
+# sonst die Einzelaufrufe oben → open/step_out/close kosten je einen Memory-Aufruf
+class BulkMemory(Memory, Protocol):
+    def create_spaces(self, *, specs: List[Dict[str, Any]]) -> List[str]: ...
+    def write_messages(self, *, writes: List[Dict[str, Any]]) -> None: ...
+    def finish_space(self, *, space_id: str, status: str, event: Optional[str] = None,
+                     payload: Optional[Dict[str, Any]] = None, gc: bool = True) -> None: ...
+
+_ST_ROLES = ("planner", "coder", "critic")
+
 @dataclass
 class WorkcellOpenResult:
     workcell_sid: str
@@ -22,12 +35,27 @@ class WorkcellIO:
     - Workcell & ST-Räume anlegen
     - Status & Events setzen
     - Schritt-Outputs gleichzeitig in Workcell + ST spiegeln
+    - Async-Spiegel (aopen/astart/astep_out/aclose): nutzt `a<name>` des Memory,
+      falls vorhanden, sonst den (in-memory, nicht blockierenden) Sync-Aufruf
+    - cancel/acancel, fail/afail: abgebrochene bzw. fehlgeschlagene Runs markieren und
+      Spaces sofort per GC freigeben
+    - Bulk-Pfad (create_spaces/write_messages/finish_space am Memory): open, step_out
+      und close sind je ein Aufruf, unabhängig von der Zahl der ST-Spaces
+    - start/step_out/close werden zusätzlich auf dem Run-Eventbus publiziert
+      (run_id kommt aus dem start-Payload)
     """
-    def __init__(self, memory: Memory) -> None:
+    def __init__(self, memory: Memory, events: Optional[RunEventBus] = None) -> None:
         self.m = memory
+        self.events = events if events is not None else RUN_EVENTS
+        self._run_ids: Dict[str, str] = {}  # workcell_sid → run_id
 
     # --- Lifecycle -------------------------------------------------------------
     def open(self, *, ticket_id: str, workcell_space_id: Optional[str] = None) -> WorkcellOpenResult:
+        if self._has("create_spaces"):
+            ids = self.m.create_spaces(specs=self._open_specs(ticket_id, workcell_space_id))  # type: ignore[attr-defined]
+            if workcell_space_id:
+                self.m.set_status(space_id=workcell_space_id, status="running")
+            return self._open_result(ids, workcell_space_id)
         wc = workcell_space_id or self.m.create_space(kind="workcell", name=f"wc:{ticket_id}")
         st_pl = self.m.create_space(kind="st", name="planner", parent_id=wc)
         st_cd = self.m.create_space(kind="st", name="coder", parent_id=wc)
@@ -37,25 +65,216 @@ class WorkcellIO:
 
     def start(self, *, workcell_sid: str, payload: Dict[str, Any]) -> None:
         self._event(workcell_sid, "start", payload)
+        self._publish_start(workcell_sid, payload)
 
     def close(self, *, workcell_sid: str, review: str = "OK", impl_ok: bool = True, do_gc: bool = True) -> None:
+        if self._has("finish_space"):
+            self.m.finish_space(  # type: ignore[attr-defined]
+                space_id=workcell_sid, status="done", event="done",
+                payload={"impl_ok": impl_ok, "review": review}, gc=do_gc,
+            )
+            self._publish_close(workcell_sid, review, impl_ok)
+            return
         self.m.set_status(space_id=workcell_sid, status="done")
         self._event(workcell_sid, "done", {"impl_ok": impl_ok, "review": review})
+        self._publish_close(workcell_sid, review, impl_ok)
         if do_gc:
             self.m.gc(space_id=workcell_sid)
 
+    def cancel(self, *, workcell_sid: str, reason: str = "cancelled", do_gc: bool = True) -> None:
+        """Abgebrochener Run: Status/Event setzen und Spaces sofort freigeben (best-effort)."""
+        self._abort(workcell_sid, "cancelled", {"reason": reason}, do_gc)
+
+    def fail(self, *, workcell_sid: str, error: str, do_gc: bool = True) -> None:
+        """Fehlgeschlagener Run (Exception aus Impl/I/O): wie `cancel`, Status "failed"."""
+        self._abort(workcell_sid, "failed", {"error": error}, do_gc)
+
+    def _abort(self, workcell_sid: str, status: str, payload: Dict[str, Any], do_gc: bool) -> None:
+        if self._has("finish_space"):
+            try:
+                self.m.finish_space(  # type: ignore[attr-defined]
+                    space_id=workcell_sid, status=status, event=status, payload=payload, gc=do_gc,
+                )
+            except Exception:
+                pass
+            self._publish_end(workcell_sid, status, payload)
+            return
+        try:
+            self.m.set_status(space_id=workcell_sid, status=status)
+        except Exception:
+            pass
+        self._event(workcell_sid, status, payload)
+        self._publish_end(workcell_sid, status, payload)
+        if do_gc:
+            try:
+                self.m.gc(space_id=workcell_sid)
+            except Exception:
+                pass
+
     # --- Steps -----------------------------------------------------------------
     def step_out(self, *, workcell_sid: str, st_ids: Dict[str, str], role: str, content: str, prompt: Optional[str] = None) -> None:
+        writes = self._step_writes(workcell_sid, st_ids, role, content, prompt)
+        if self._has("write_messages"):
+            self.m.write_messages(writes=writes)  # type: ignore[attr-defined]
+        else:
+            for w in writes:
+                self.m.write_message(**w)
+        self._publish(workcell_sid, "step_out", {"role": role, "content": content})
+
+    def emit(self, *, workcell_sid: str, type: str, payload: Dict[str, Any]) -> None:
+        """Beliebiges Workcell-Event: Memory (`write_event`) + Run-Eventbus."""
+        self._event(workcell_sid, type, payload)
+        self._publish(workcell_sid, type, dict(payload))
+
+    def _event(self, workcell_sid: str, type: str, payload: Dict[str, Any]) -> None:
+        try:
+            self.m.write_event(space_id=workcell_sid, type=type, payload=payload)
+        except Exception:
+            # Event darf nicht tödlich sein
+            pass
+
+    # --- Bulk-Helfer -----------------------------------------------------------
+    def _has(self, op: str, *, aio: bool = False) -> bool:
+        return callable(getattr(self.m, op, None)) or (aio and callable(getattr(self.m, f"a{op}", None)))
+
+    @staticmethod
+    def _open_specs(ticket_id: str, workcell_space_id: Optional[str]) -> List[Dict[str, Any]]:
+        # Neue Workcell: Index 0, ST-Spaces referenzieren sie per Index
+        if workcell_space_id:
+            return [{"kind": "st", "name": r, "parent_id": workcell_space_id} for r in _ST_ROLES]
+        return [{"kind": "workcell", "name": f"wc:{ticket_id}", "status": "running"}] + [
+            {"kind": "st", "name": r, "parent": 0} for r in _ST_ROLES
+        ]
+
+    @staticmethod
+    def _open_result(ids: List[str], workcell_space_id: Optional[str]) -> WorkcellOpenResult:
+        wc = workcell_space_id or ids[0]
+        st = ids if workcell_space_id else ids[1:]
+        return WorkcellOpenResult(workcell_sid=wc, st_ids=dict(zip(_ST_ROLES, st)))
+
+    @staticmethod
+    def _step_writes(workcell_sid: str, st_ids: Dict[str, str], role: str, content: str,
+                     prompt: Optional[str]) -> List[Dict[str, Any]]:
         meta = {"prompt": prompt} if prompt else None
-        self.m.write_message(space_id=workcell_sid, role=role, content=content, metadata=meta)
+        writes: List[Dict[str, Any]] = [{"space_id": workcell_sid, "role": role, "content": content, "metadata": meta}]
         # Mirror raw content into role's ST
         sid = st_ids.get(role)
         if sid:
-            self.m.write_message(space_id=sid, role=role, content=content)
+            writes.append({"space_id": sid, "role": role, "content": content})
+        return writes
 
-    def _event(self, workcell_sid: str, type: str, payload: Dict[str, Any]) -> None:
+    # --- Run-Events -----------------------------------------------------------
+    def _publish(self, workcell_sid: str, type: str, data: Dict[str, Any]) -> None:
+        run_id = self._run_ids.get(workcell_sid)
+        if not run_id:
+            return
         try:
-            self.m.write_event(space_id=workcell_sid, type=type, payload=payload)
+            self.events.publish(run_id, type, {"workcell_sid": workcell_sid, **data})
+        except Exception:
+            # Event-Bus darf die Pipeline nicht stören
+            pass
+
+    def _publish_start(self, workcell_sid: str, payload: Dict[str, Any]) -> None:
+        run_id = payload.get("run_id")
+        if run_id:
+            self._run_ids[workcell_sid] = str(run_id)
+            self._publish(workcell_sid, "start", dict(payload))
+
+    def _publish_close(self, workcell_sid: str, review: str, impl_ok: bool) -> None:
+        self._publish(workcell_sid, "done", {"impl_ok": impl_ok, "review": review})
+        self._run_ids.pop(workcell_sid, None)
+
+    def _publish_end(self, workcell_sid: str, type: str, data: Dict[str, Any]) -> None:
+        # cancelled/failed: Terminal-Event der Workcell, run_id-Zuordnung entfernen
+        self._publish(workcell_sid, type, dict(data))
+        self._run_ids.pop(workcell_sid, None)
+
+    # --- Async-Varianten ------------------------------------------------------
+    async def _acall(self, op: str, /, **kwargs: Any) -> Any:
+        fn = getattr(self.m, f"a{op}", None)
+        if fn is not None and inspect.iscoroutinefunction(fn):
+            return await fn(**kwargs)
+        return getattr(self.m, op)(**kwargs)
+
+    async def aopen(self, *, ticket_id: str, workcell_space_id: Optional[str] = None) -> WorkcellOpenResult:
+        if self._has("create_spaces", aio=True):
+            ids = await self._acall("create_spaces", specs=self._open_specs(ticket_id, workcell_space_id))
+            if workcell_space_id:
+                await self._acall("set_status", space_id=workcell_space_id, status="running")
+            return self._open_result(ids, workcell_space_id)
+        wc = workcell_space_id or await self._acall("create_space", kind="workcell", name=f"wc:{ticket_id}")
+        st_pl = await self._acall("create_space", kind="st", name="planner", parent_id=wc)
+        st_cd = await self._acall("create_space", kind="st", name="coder", parent_id=wc)
+        st_cr = await self._acall("create_space", kind="st", name="critic", parent_id=wc)
+        await self._acall("set_status", space_id=wc, status="running")
+        return WorkcellOpenResult(workcell_sid=wc, st_ids={"planner": st_pl, "coder": st_cd, "critic": st_cr})
+
+    async def astart(self, *, workcell_sid: str, payload: Dict[str, Any]) -> None:
+        await self._aevent(workcell_sid, "start", payload)
+        self._publish_start(workcell_sid, payload)
+
+    async def aclose(self, *, workcell_sid: str, review: str = "OK", impl_ok: bool = True, do_gc: bool = True) -> None:
+        if self._has("finish_space", aio=True):
+            await self._acall(
+                "finish_space", space_id=workcell_sid, status="done", event="done",
+                payload={"impl_ok": impl_ok, "review": review}, gc=do_gc,
+            )
+            self._publish_close(workcell_sid, review, impl_ok)
+            return
+        await self._acall("set_status", space_id=workcell_sid, status="done")
+        await self._aevent(workcell_sid, "done", {"impl_ok": impl_ok, "review": review})
+        self._publish_close(workcell_sid, review, impl_ok)
+        if do_gc:
+            await self._acall("gc", space_id=workcell_sid)
+
+    async def acancel(self, *, workcell_sid: str, reason: str = "cancelled", do_gc: bool = True) -> None:
+        await self._aabort(workcell_sid, "cancelled", {"reason": reason}, do_gc)
+
+    async def afail(self, *, workcell_sid: str, error: str, do_gc: bool = True) -> None:
+        await self._aabort(workcell_sid, "failed", {"error": error}, do_gc)
+
+    async def _aabort(self, workcell_sid: str, status: str, payload: Dict[str, Any], do_gc: bool) -> None:
+        if self._has("finish_space", aio=True):
+            try:
+                await self._acall(
+                    "finish_space", space_id=workcell_sid, status=status, event=status, payload=payload, gc=do_gc,
+                )
+            except Exception:
+                pass
+            self._publish_end(workcell_sid, status, payload)
+            return
+        try:
+            await self._acall("set_status", space_id=workcell_sid, status=status)
+        except Exception:
+            pass
+        await self._aevent(workcell_sid, status, payload)
+        self._publish_end(workcell_sid, status, payload)
+        if do_gc:
+            try:
+                await self._acall("gc", space_id=workcell_sid)
+            except Exception:
+                pass
+
+    async def astep_out(self, *, workcell_sid: str, st_ids: Dict[str, str], role: str, content: str, prompt: Optional[str] = None) -> None:
+        writes = self._step_writes(workcell_sid, st_ids, role, content, prompt)
+        if self._has("write_messages", aio=True):
+            await self._acall("write_messages", writes=writes)
+        else:
+            for w in writes:
+                await self._acall("write_message", **w)
+        self._publish(workcell_sid, "step_out", {"role": role, "content": content})
+
+    async def awrite(self, *, space_id: str, role: str, content: str) -> None:
+        await self._acall("write_message", space_id=space_id, role=role, content=content)
+
+    async def aemit(self, *, workcell_sid: str, type: str, payload: Dict[str, Any]) -> None:
+        """Beliebiges Workcell-Event: Memory (`write_event`) + Run-Eventbus."""
+        await self._aevent(workcell_sid, type, payload)
+        self._publish(workcell_sid, type, dict(payload))
+
+    async def _aevent(self, workcell_sid: str, type: str, payload: Dict[str, Any]) -> None:
+        try:
+            await self._acall("write_event", space_id=workcell_sid, type=type, payload=payload)
         except Exception:
             # Event darf nicht tödlich sein
             pass
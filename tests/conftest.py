@@ -0,0 +1,112 @@
+"""
+Gemeinsame Test-Fakes für Hub/Registry/Slots/WorkcellIO-Tests.
+
+Import direkt aus den Testmodulen: `from conftest import FakeBulkMemory, FakeMemory, FakeSpoke`.
+"""
+from __future__ import annotations
+
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from backend.spoke_slots import SpokeSlots
+
+
+@dataclass(eq=False)
+class FakeSpoke:
+    """Spoke mit echten Slots; Gleichheit = Identität (Unterklassen mit eq=True vergleichen Felder)."""
+    role: str = "coder"
+    score: int = 1
+    impl: Any = None
+    capacity: int = 1
+    tags: Any = ()
+    name: str = ""
+    slots: SpokeSlots = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        self.slots = SpokeSlots(self.capacity)
+
+    def acquire(self) -> None:
+        self.slots.force_acquire()
+
+    def release(self) -> None:
+        self.slots.release()
+
+
+class FakeMemory:
+    """Memory-Fake: Spaces mit Parent (gc entfernt den Teilbaum), Status, Events, Aufrufzähler."""
+
+    def __init__(self) -> None:
+        self.parent: Dict[str, Optional[str]] = {}
+        self.status: Dict[str, str] = {}
+        self.events: List[Dict[str, Any]] = []
+        self.messages: List[Dict[str, Any]] = []
+        self.calls: Counter = Counter()
+        self._n = 0
+
+    def create_space(self, *, kind: str, name: Optional[str] = None, parent_id: Optional[str] = None) -> str:
+        self.calls["create_space"] += 1
+        self._n += 1
+        sid = f"{kind}-{self._n}"
+        self.parent[sid] = parent_id
+        return sid
+
+    def write_message(self, *, space_id: str, role: str, content: str, metadata: Optional[Dict[str, Any]] = None) -> None:
+        self.calls["write_message"] += 1
+        self.messages.append({"space_id": space_id, "role": role, "content": content})
+
+    def write_event(self, *, space_id: str, type: str, payload: Dict[str, Any]) -> None:
+        self.calls["write_event"] += 1
+        self.events.append({"space_id": space_id, "type": type, **payload})
+
+    def set_status(self, *, space_id: str, status: str) -> None:
+        self.calls["set_status"] += 1
+        self.status[space_id] = status
+
+    def gc(self, *, space_id: str) -> None:
+        self.calls["gc"] += 1
+        self._drop_tree(space_id)
+
+    def _drop_tree(self, space_id: str) -> None:
+        drop = {space_id}
+        while True:
+            more = {s for s, p in self.parent.items() if p in drop} - drop
+            if not more:
+                break
+            drop |= more
+        for s in drop:
+            self.parent.pop(s, None)
+
+    def event_types(self) -> List[str]:
+        return [e["type"] for e in self.events]
+
+
+class FakeBulkMemory(FakeMemory):
+    """FakeMemory plus Bulk-Primitiven (create_spaces/write_messages/finish_space)."""
+
+    def create_spaces(self, *, specs: List[Dict[str, Any]]) -> List[str]:
+        self.calls["create_spaces"] += 1
+        ids: List[str] = []
+        for spec in specs:
+            self._n += 1
+            sid = f"{spec['kind']}-{self._n}"
+            parent = ids[spec["parent"]] if "parent" in spec else spec.get("parent_id")
+            self.parent[sid] = parent
+            if spec.get("status"):
+                self.status[sid] = spec["status"]
+            ids.append(sid)
+        return ids
+
+    def write_messages(self, *, writes: List[Dict[str, Any]]) -> None:
+        self.calls["write_messages"] += 1
+        for w in writes:
+            self.messages.append({"space_id": w["space_id"], "role": w["role"], "content": w["content"]})
+
+    def finish_space(self, *, space_id: str, status: str, event: Optional[str] = None,
+                     payload: Optional[Dict[str, Any]] = None, gc: bool = True) -> None:
+        self.calls["finish_space"] += 1
+        self.status[space_id] = status
+        if event:
+            self.events.append({"space_id": space_id, "type": event, **(payload or {})})
+        if gc:
+            self._drop_tree(space_id)
@@ -0,0 +1,128 @@
+import asyncio
+import time
+
+import pytest
+
+from backend.captain_hub import CaptainHub, HubPolicy
+from backend.captain_spoke_registry import RealRouter
+from backend.orchestration.cancel import (
+    CancelToken, RunCancelled, check_cancelled, default_deadline, run_cancellable, use_token,
+)
+from conftest import FakeMemory, FakeSpoke
+
+
+def test_no_deadline_by_default(monkeypatch):
+    monkeypatch.delenv("ORCH_RUN_DEADLINE", raising=False)
+    assert default_deadline() is None
+    monkeypatch.setenv("ORCH_RUN_DEADLINE", "30")
+    assert default_deadline() == 30.0
+
+
+def test_cancel_aborts_attached_task():
+    async def main():
+        tok = CancelToken()
+        started = asyncio.Event()
+
+        async def work():
+            started.set()
+            await asyncio.sleep(10)
+
+        async def cancel_soon():
+            await started.wait()
+            tok.cancel("user")
+
+        asyncio.ensure_future(cancel_soon())
+        with pytest.raises(RunCancelled) as ei:
+            await run_cancellable(work(), tok)
+        assert ei.value.reason == "user"
+
+    asyncio.run(main())
+
+
+def test_deadline_cancels_with_reason():
+    async def main():
+        tok = CancelToken()
+        t0 = time.monotonic()
+        with pytest.raises(RunCancelled) as ei:
+            await run_cancellable(asyncio.sleep(10), tok, timeout=0.05)
+        assert ei.value.reason == "deadline exceeded"
+        assert time.monotonic() - t0 < 1.0
+
+    asyncio.run(main())
+
+
+def test_caller_cancel_sets_token():
+    async def main():
+        tok = CancelToken()
+        outer = asyncio.ensure_future(run_cancellable(asyncio.sleep(10), tok))
+        await asyncio.sleep(0.01)
+        outer.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await outer
+        assert tok.cancelled and tok.reason == "caller cancelled"
+
+    asyncio.run(main())
+
+
+def test_context_token_reaches_nested_calls_and_threads():
+    tok = CancelToken()
+    tok.cancel("stop")
+
+    def sync_step():
+        check_cancelled()
+
+    async def main():
+        with use_token(tok):
+            with pytest.raises(RunCancelled):
+                check_cancelled()
+            with pytest.raises(RunCancelled):
+                await asyncio.to_thread(sync_step)
+        check_cancelled()  # außerhalb des Kontexts kein Token
+
+    asyncio.run(main())
+
+
+def test_async_slot_wait_observes_cancellation():
+    spoke = FakeSpoke(role="planner")
+    assert spoke.slots.try_acquire()  # Slot belegt → Hub muss warten
+    hub = CaptainHub(router=RealRouter({"planner": [spoke]}), memory=None, policy=HubPolicy(spoke_wait=5.0))
+
+    async def main():
+        tok = CancelToken()
+        asyncio.get_running_loop().call_later(0.05, tok.cancel, "user")
+        with use_token(tok):
+            t0 = time.monotonic()
+            with pytest.raises(RunCancelled):
+                await hub._aacquire_role("planner", set())
+            assert time.monotonic() - t0 < 1.0
+
+    asyncio.run(main())
+    assert spoke.slots.in_use == 1
+
+
+class _Boom:
+    def run(self, prompt):
+        raise ValueError("llm kaputt")
+
+
+@pytest.mark.parametrize("aio", [False, True])
+def test_failed_run_frees_workcell(aio):
+    from backend.captain_hub import OrchestrationRun, Ticket
+    from backend.orchestration.events import RunEventBus
+
+    spoke = FakeSpoke(role="coder", impl=_Boom())
+    mem = FakeMemory()
+    hub = CaptainHub(router=RealRouter({"coder": [spoke]}), memory=mem)
+    bus = hub.io.events = RunEventBus()
+    ticket = Ticket(ticket_id="t", goal="ziel", deliverables=[], constraints=[], plan="plan")
+    run = OrchestrationRun(run_id="r1")
+    with pytest.raises(ValueError):
+        if aio:
+            asyncio.run(hub.arun_ticket(run=run, ticket=ticket))
+        else:
+            hub.run_ticket(run=run, ticket=ticket)
+    assert mem.parent == {}                      # Workcell + ST-Spaces per GC weg
+    assert "failed" in mem.status.values() and "failed" in mem.event_types()
+    assert hub.io._run_ids == {}
+    assert bus.last_type("r1") == "failed"
+    assert spoke.slots.in_use == 0
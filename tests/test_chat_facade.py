@@ -0,0 +1,118 @@
+import asyncio
+from typing import Any, Dict, List
+
+from backend.captain_hub import HubChatFacade
+from backend.reply_cache import ReplyCache
+
+
+class _Zep:
+    def __init__(self, delays: List[float]) -> None:
+        self.delays = list(delays)
+        self.n = 0
+        self.saved: List[str] = []
+
+    async def add_user_message(self, text: str) -> None:
+        self.saved.append(text)
+
+    async def add_assistant_message(self, text: str) -> None:
+        # zweiter Request persistiert langsam → erster überschreibt inzwischen geteilten Zustand
+        await asyncio.sleep(0.1 if text.endswith("-2") else 0)
+        self.saved.append(text)
+
+    async def build_context(self, **kw: Any) -> Dict[str, Any]:
+        self.n += 1
+        n = self.n
+        await asyncio.sleep(self.delays[n - 1])
+        return {"block": f"block-{n}", "sources": [f"src-{n}"], "dropped": []}
+
+
+class _LLM:
+    async def chat(self, messages: List[Dict[str, Any]]) -> str:
+        await asyncio.sleep(0.01)
+        return messages[0]["content"].rsplit("\n", 1)[-1]
+
+    async def stream(self, messages: List[Dict[str, Any]]):
+        yield await self.chat(messages)
+
+
+class _Hub:
+    llm = _LLM()
+    reply_cache = None
+
+
+def _facade(delays: List[float]) -> HubChatFacade:
+    return HubChatFacade(_Hub(), _Zep(delays), user_id="u", thread_id="t")
+
+
+def test_concurrent_converse_reports_own_context():
+    chat = _facade([0.05, 0.0])
+
+    async def main():
+        return await asyncio.gather(chat.converse("a"), chat.converse("b"))
+
+    for out in asyncio.run(main()):
+        n = out["reply"].split("-")[1]
+        assert out["context"]["sources"] == [f"src-{n}"]
+
+
+def test_concurrent_stream_fills_own_context():
+    chat = _facade([0.05, 0.0])
+
+    async def one(prompt: str):
+        ctx: Dict[str, Any] = {}
+        toks = [t async for t in chat.converse_stream(prompt, context=ctx)]
+        return "".join(toks), ctx
+
+    async def main():
+        return await asyncio.gather(one("a"), one("b"))
+
+    for reply, ctx in asyncio.run(main()):
+        assert ctx["sources"] == [f"src-{reply.split('-')[1]}"]
+
+
+class _RecentZep(_Zep):
+    """Kontext-Block = User-Kontext + letzte Nachrichten (wie build_context mit include_recent)."""
+
+    def __init__(self, with_recent: bool) -> None:
+        super().__init__([])
+        self.with_recent = with_recent
+
+    async def add_assistant_message(self, text: str) -> None:
+        self.saved.append(text)
+
+    async def build_context(self, **kw: Any) -> Dict[str, Any]:
+        recent = " | ".join(self.saved[-8:]) if self.with_recent else ""
+        return {"block": f"facts {recent}", "sources": ["user_context"], "dropped": []}
+
+
+class _CountingLLM(_LLM):
+    def __init__(self) -> None:
+        self.calls = 0
+
+    async def chat(self, messages: List[Dict[str, Any]]) -> str:
+        self.calls += 1
+        return f"antwort {self.calls}"
+
+
+def _cached_facade(with_recent: bool):
+    hub = _Hub()
+    hub.llm = _CountingLLM()
+    hub.reply_cache = ReplyCache()
+    return HubChatFacade(hub, _RecentZep(with_recent), user_id="u", thread_id="t"), hub.llm
+
+
+def test_reply_cache_misses_after_new_turns():
+    chat, llm = _cached_facade(with_recent=True)
+    first = asyncio.run(chat.converse("status?"))
+    second = asyncio.run(chat.converse("status?"))
+    assert llm.calls == 2 and "cached" not in second
+    assert first["reply"] != second["reply"]
+
+
+def test_reply_cache_hit_reports_empty_context():
+    chat, llm = _cached_facade(with_recent=False)
+    first = asyncio.run(chat.converse("status?"))
+    second = asyncio.run(chat.converse("status?"))
+    assert llm.calls == 1 and second["reply"] == first["reply"] and "cached" in second
+    assert first["context"]["sources"] == ["user_context"]
+    assert second["context"] == {"sources": [], "dropped": []}
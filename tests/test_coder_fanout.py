@@ -0,0 +1,139 @@
+import asyncio
+import threading
+import time
+from typing import List
+
+from backend.captain_hub import CaptainHub, HubPolicy, OrchestrationRun, Ticket
+from backend.captain_spoke_registry import RealRouter
+from backend.orchestration.events import RunEventBus
+from conftest import FakeMemory, FakeSpoke
+
+
+class _Impl:
+    def __init__(self, fn) -> None:
+        self.fn = fn
+        self.prompts: List[str] = []
+        self.active = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def run(self, prompt: str) -> str:
+        with self._lock:
+            self.prompts.append(prompt)
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        try:
+            return self.fn(prompt)
+        finally:
+            with self._lock:
+                self.active -= 1
+
+
+def _judge(prompt: str) -> str:
+    time.sleep(0.02)
+    return "OK" if "gut" in prompt.split("Ergebnis:")[-1] else "Änderungen nötig"
+
+
+def _slow_bad(prompt: str) -> str:
+    time.sleep(0.05)
+    return "schlecht"
+
+
+def _fast_good(prompt: str) -> str:
+    time.sleep(0.1)
+    return "gut"
+
+
+def _hub(fanout: int, critic_capacity: int = 1):
+    critic = FakeSpoke("critic", 5, _Impl(_judge), capacity=critic_capacity)
+    coders = [FakeSpoke("coder", 9, _Impl(_slow_bad)), FakeSpoke("coder", 8, _Impl(_fast_good))]
+    hub = CaptainHub(router=RealRouter({"coder": coders, "critic": [critic]}), memory=FakeMemory(),
+                     policy=HubPolicy(coder_fanout=fanout))
+    hub.io.events = RunEventBus()
+    return hub, coders, critic
+
+
+def _ticket() -> Ticket:
+    return Ticket(ticket_id="t1", goal="ziel", deliverables=["code"], constraints=[], plan="plan")
+
+
+def _wait_idle(spokes, timeout: float = 2.0) -> None:
+    end = time.monotonic() + timeout
+    while any(sp.slots.in_use for sp in spokes) and time.monotonic() < end:
+        time.sleep(0.01)
+
+
+def test_sync_fanout_picks_ok_candidate_and_releases_slots():
+    hub, coders, critic = _hub(fanout=2)
+    res = hub.run_ticket(run=OrchestrationRun(run_id="r1"), ticket=_ticket())
+    assert res["impl"] == "gut" and res["review"] == "OK"
+    _wait_idle(coders + [critic])
+    assert [sp.slots.in_use for sp in coders + [critic]] == [0, 0, 0]
+    assert all("Ergebnis:\n" in p for p in critic.impl.prompts)
+    cands = [e for e in hub.memory.events if e["type"] == "coder_candidate"]
+    assert {e["status"] for e in cands} >= {"rejected", "accepted"}
+
+
+def test_async_fanout_matches_sync():
+    hub, coders, critic = _hub(fanout=2)
+    res = asyncio.run(hub.arun_ticket(run=OrchestrationRun(run_id="r2"), ticket=_ticket()))
+    assert res["impl"] == "gut" and res["review"] == "OK"
+    assert [sp.slots.in_use for sp in coders + [critic]] == [0, 0, 0]
+    assert all("Ergebnis:\n" in p for p in critic.impl.prompts)
+
+
+def test_fanout_reviews_respect_critic_capacity():
+    # zwei gleich schnelle Kandidaten, ein Critic-Slot → Reviews laufen nacheinander
+    hub, coders, critic = _hub(fanout=2, critic_capacity=1)
+    for sp in coders:
+        sp.impl.fn = lambda p: (time.sleep(0.02), "schlecht")[1]
+    hub.run_ticket(run=OrchestrationRun(run_id="r3"), ticket=_ticket())
+    _wait_idle(coders + [critic])
+    assert critic.impl.peak == 1
+
+
+def test_single_path_critic_sees_result():
+    hub, coders, critic = _hub(fanout=1)
+    res = hub.run_ticket(run=OrchestrationRun(run_id="r4"), ticket=_ticket())
+    assert res["impl"] == "schlecht" and res["review"] == "Änderungen nötig"
+    assert critic.impl.prompts and critic.impl.prompts[0].endswith("Ergebnis:\nschlecht")
+
+
+def test_sync_fanout_returns_without_waiting_for_loser_review():
+    # Verlierer wird zuerst fertig, sein Review dauert; Gewinner bekommt den Zusatz-Critic
+    hub, coders, critic = _hub(fanout=2, critic_capacity=2)
+    coders[0].impl.fn = lambda p: "schlecht"
+    coders[1].impl.fn = lambda p: (time.sleep(0.05), "gut")[1]
+    critic.impl.fn = lambda p: (time.sleep(0.5), "Änderungen nötig")[1] if p.endswith("schlecht") else "OK"
+    t0 = time.monotonic()
+    res = hub.run_ticket(run=OrchestrationRun(run_id="r5"), ticket=_ticket())
+    assert res["impl"] == "gut"
+    assert time.monotonic() - t0 < 0.4
+    assert critic.slots.in_use == 1          # läuft noch für den Verlierer
+    _wait_idle(coders + [critic])
+    assert critic.slots.in_use == 0
+
+
+def test_sync_fanout_holds_primary_coder_slot_until_thread_ends():
+    hub, coders, critic = _hub(fanout=2)
+    coders[0].impl.fn = lambda p: (time.sleep(0.3), "schlecht")[1]
+    coders[1].impl.fn = lambda p: "gut"
+    res = hub.run_ticket(run=OrchestrationRun(run_id="r6"), ticket=_ticket())
+    assert res["impl"] == "gut"
+    assert coders[0].slots.in_use == 1       # Thread ruft noch das LLM
+    _wait_idle(coders + [critic])
+    assert [sp.slots.in_use for sp in coders + [critic]] == [0, 0, 0]
+    assert len(coders[0].impl.prompts) == 1 and len(critic.impl.prompts) == 1
+
+
+def test_fanout_candidates_skip_llm_cache():
+    from backend.llm_cache import cache_skipped
+
+    hub, coders, critic = _hub(fanout=2)
+    seen = []
+    for sp in coders:
+        sp.impl.fn = lambda p: (seen.append(cache_skipped()), "gut")[1]
+    hub.run_ticket(run=OrchestrationRun(run_id="r7"), ticket=_ticket())
+    asyncio.run(hub.arun_ticket(run=OrchestrationRun(run_id="r8"), ticket=_ticket()))
+    _wait_idle(coders + [critic])
+    assert seen and all(seen)
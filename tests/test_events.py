@@ -0,0 +1,64 @@
+import asyncio
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from backend.orchestration.events import RunEventBus
+from backend.orchestration.run_store import RunStore
+from backend.orchestration.scheduler import RunScheduler
+from backend.routes.orch_api import router
+
+
+async def _collect(bus, run_id, offset=0, **kw):
+    return [ev async for ev in bus.subscribe(run_id, offset, **kw)]
+
+
+def test_replay_from_offset_until_terminal():
+    bus = RunEventBus()
+    for t in ("queued", "running", "step_out", "run_done"):
+        bus.publish("r1", t)
+    evs = asyncio.run(_collect(bus, "r1", 1))
+    assert [e["type"] for e in evs] == ["running", "step_out", "run_done"]
+    assert [e["offset"] for e in evs] == [1, 2, 3]
+
+
+def test_unknown_run_does_not_create_log():
+    bus = RunEventBus(max_runs=2)
+    bus.publish("live", "queued")
+    assert asyncio.run(_collect(bus, "typo")) == []
+    assert not bus.known("typo")
+    assert bus.known("live")
+
+
+def test_per_run_limit_keeps_absolute_offsets():
+    bus = RunEventBus(max_per_run=3)
+    for i in range(5):
+        bus.publish("r", "step", {"i": i})
+    bus.publish("r", "run_done")
+    evs = asyncio.run(_collect(bus, "r"))
+    assert [e["offset"] for e in evs] == [3, 4, 5]
+
+
+def test_eviction_closes_waiting_subscriber():
+    bus = RunEventBus(max_runs=1)
+
+    async def main():
+        bus.publish("old", "queued")
+        sub = asyncio.ensure_future(_collect(bus, "old"))
+        await asyncio.sleep(0.01)
+        bus.publish("new", "queued")          # verdrängt "old"
+        return await asyncio.wait_for(sub, 1.0)
+
+    evs = asyncio.run(main())
+    assert [e["type"] for e in evs] == ["queued"]
+    assert bus.stats()["evicted_runs"] == 1
+
+
+def test_events_route_unknown_run_is_404():
+    app = FastAPI()
+    app.state.run_store = RunStore(None)
+    app.state.run_scheduler = RunScheduler()
+    app.include_router(router, prefix="/api/orch")
+    r = TestClient(app).get("/api/orch/runs/run_missing/events")
+    assert r.status_code == 404
+    assert r.json()["error"] == "unknown run"
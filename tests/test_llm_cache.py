@@ -0,0 +1,122 @@
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+
+from backend.llm_cache import (
+    LLMResponseCache, cache_bypass, cache_bypassed, cache_key, cache_skip, cache_skipped, should_store,
+)
+from backend.llm_client import AsyncLLMClient
+
+_MSGS = [{"role": "user", "content": "hallo"}]
+
+
+def test_cache_key_is_canonical():
+    a = cache_key(model="m", messages=[{"role": "user", "content": "x"}], temperature=0, base_url=None)
+    b = cache_key(model="m", messages=[{"content": "x", "role": "user"}], temperature=0.0, base_url="")
+    assert a == b
+    assert a != cache_key(model="m", messages=[{"role": "user", "content": "x"}], temperature=0.2, base_url=None)
+    assert a != cache_key(model="m2", messages=[{"role": "user", "content": "x"}], temperature=0, base_url=None)
+
+
+def test_should_store_and_bypass():
+    assert should_store(0, None) and should_store(0.7, True) and not should_store(0.7, None)
+    assert not cache_bypassed()
+    with cache_bypass():
+        assert cache_bypassed()
+    assert not cache_bypassed()
+
+
+def test_disk_roundtrip_and_promotion(tmp_path):
+    path = str(tmp_path / "llm.sqlite3")
+    key = cache_key(model="m", messages=_MSGS, temperature=0, base_url=None)
+    c = LLMResponseCache(path)
+    c.put(key, "antwort")
+    c.close()
+
+    c2 = LLMResponseCache(path)
+    assert c2.get(key, disk=False) is None
+    assert c2.get(key) == "antwort"
+    assert c2.get(key) == "antwort"
+    st = c2.stats()
+    assert st["hits_disk"] == 1 and st["hits_mem"] == 1 and st["disk_bytes"] == len("antwort")
+    c2.close()
+
+
+def test_ttl_expires_memory_and_disk(tmp_path):
+    c = LLMResponseCache(str(tmp_path / "llm.sqlite3"), ttl=0.05)
+    c.put("k", "v")
+    assert c.get("k") == "v"
+    time.sleep(0.08)
+    assert c.get("k") is None
+    assert c.stats()["disk_bytes"] == 0
+    c.close()
+
+
+def test_memory_lru_and_disk_size_eviction(tmp_path):
+    c = LLMResponseCache(str(tmp_path / "llm.sqlite3"), mem_max=2, disk_max_bytes=10)
+    c.put("a", "xxxx")
+    time.sleep(0.01)
+    c.put("b", "yyyy")
+    time.sleep(0.01)
+    c.put("c", "zzzz")               # Platte 12 > 10 → ältester Zugriff ("a") fliegt
+    assert c.stats()["disk_bytes"] == 8
+    assert c.get("a") is None
+    assert c.get("b") == "yyyy" and c.get("c") == "zzzz"
+    assert c.stats()["mem_entries"] == 2
+    c.close()
+
+
+class _Completions:
+    def __init__(self) -> None:
+        self.calls = 0
+
+    async def create(self, **kw):
+        self.calls += 1
+        msg = SimpleNamespace(content=f"antwort {self.calls}")
+        return SimpleNamespace(choices=[SimpleNamespace(message=msg)])
+
+
+def _client():
+    client = AsyncLLMClient(cache=LLMResponseCache(None))
+    completions = _Completions()
+    client._client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    return client, completions
+
+
+def test_skip_neither_reads_nor_stores():
+    assert not cache_skipped()
+    client, completions = _client()
+
+    async def main():
+        with cache_skip():
+            assert cache_skipped()
+            a = await client.chat(_MSGS, temperature=0)
+            b = await client.chat(_MSGS, temperature=0)
+        c = await client.chat(_MSGS, temperature=0)
+        d = await client.chat(_MSGS, temperature=0)
+        return a, b, c, d
+
+    assert asyncio.run(main()) == ("antwort 1", "antwort 2", "antwort 3", "antwort 3")
+    assert completions.calls == 3 and client.cache.stats()["stores"] == 1
+
+
+def test_chat_sync_carries_skip_into_loop():
+    client, completions = _client()
+    out = []
+
+    async def main():
+        client.bind_loop()
+        await client.chat(_MSGS, temperature=0)        # Cache füllen
+
+        def worker():
+            with cache_skip():
+                out.append(client.chat_sync(_MSGS, temperature=0))
+            out.append(client.chat_sync(_MSGS, temperature=0))
+
+        t = threading.Thread(target=worker)
+        t.start()
+        await asyncio.to_thread(t.join)
+
+    asyncio.run(main())
+    assert out == ["antwort 2", "antwort 1"]
@@ -0,0 +1,93 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from backend.llm_client import AsyncLLMClient
+from backend.metrics import METRICS
+from backend.orchestration.cancel import CancelToken, RunCancelled, use_token
+
+_MSGS = [{"role": "user", "content": "hallo"}]
+
+
+class _Stream:
+    def __init__(self, parts, delay):
+        self.parts, self.delay = parts, delay
+
+    def __aiter__(self):
+        return self._gen()
+
+    async def _gen(self):
+        for p in self.parts:
+            await asyncio.sleep(self.delay)
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=p))])
+
+
+class _Completions:
+    def __init__(self, parts=("a", "b", "c"), delay=0.0):
+        self.parts, self.delay = parts, delay
+
+    async def create(self, *, stream=False, **kw):
+        if stream:
+            return _Stream(self.parts, self.delay)
+        msg = SimpleNamespace(content="".join(self.parts))
+        return SimpleNamespace(choices=[SimpleNamespace(message=msg)])
+
+
+def _client(**kw):
+    client = AsyncLLMClient(max_concurrency=1)
+    client._client = SimpleNamespace(chat=SimpleNamespace(completions=_Completions(**kw)))
+    return client
+
+
+def _count(engine):
+    return sum(v["count"] for k, v in METRICS.snapshot().items() if k.startswith("llm|") and k.endswith(f"|{engine}"))
+
+
+def test_stream_and_chat_record_llm_phase_with_engine():
+    client = _client()
+    before = (_count("async"), _count("async_stream"))
+
+    async def main():
+        toks = [t async for t in client.stream(_MSGS)]
+        return toks, await client.chat(_MSGS)
+
+    toks, full = asyncio.run(main())
+    assert toks == ["a", "b", "c"] and full == "abc"
+    assert (_count("async"), _count("async_stream")) == (before[0] + 1, before[1] + 1)
+
+
+def test_slow_reader_does_not_hold_the_slot():
+    client = _client()
+
+    async def main():
+        gen = client.stream(_MSGS)
+        assert await gen.__anext__() == "a"
+        await asyncio.sleep(0.02)          # Client liest nicht weiter, Upstream ist schon fertig
+        assert client.stats()["in_flight"] == 0
+        # einziger Slot frei → chat läuft sofort
+        assert await asyncio.wait_for(client.chat(_MSGS), timeout=0.5) == "abc"
+        assert [t async for t in gen] == ["b", "c"]
+
+    asyncio.run(main())
+
+
+def test_stream_honours_cancel_token_and_deadline():
+    client = _client(delay=0.05)
+    tok = CancelToken()
+    tok.cancel("user")
+
+    async def consume(token):
+        return [t async for t in client.stream(_MSGS, cancel=token)]
+
+    with pytest.raises(RunCancelled):
+        asyncio.run(consume(tok))
+
+    async def with_deadline():
+        with use_token(CancelToken(timeout=0.08)):
+            return [t async for t in client.stream(_MSGS)]
+
+    with pytest.raises(RunCancelled) as ei:
+        asyncio.run(with_deadline())
+    assert ei.value.reason == "deadline exceeded"
+    assert client.stats()["in_flight"] == 0
@@ -0,0 +1,76 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from backend.memory.memory_zep_thread import ZepThreadMemory
+
+
+class _Threads:
+    def __init__(self):
+        self.msgs = []
+        self.ctx_calls = 0
+        self.on_get = None
+        self.hook_after_read = True
+
+    async def get(self, thread_id, limit=None, cursor=None, lastn=None):
+        hook, self.on_get = self.on_get, None
+        if hook is not None and not self.hook_after_read:
+            await hook()
+        msgs = self.msgs[-lastn:] if lastn else list(self.msgs)
+        out = SimpleNamespace(messages=[dict(m) for m in msgs])
+        if hook is not None and self.hook_after_read:
+            await hook()
+        return out
+
+    async def add_messages(self, thread_id, messages):
+        self.msgs.extend(messages)
+
+    async def get_user_context(self, thread_id, mode):
+        self.ctx_calls += 1
+        return SimpleNamespace(context=f"ctx{self.ctx_calls}")
+
+
+def _mem(tmp_path, monkeypatch):
+    monkeypatch.setenv("ZEP_THREAD_INDEX_DIR", str(tmp_path))
+    threads = _Threads()
+    return ZepThreadMemory(SimpleNamespace(thread=threads), "u1", "t1"), threads
+
+
+def test_one_context_refresh_per_turn(tmp_path, monkeypatch):
+    mem, threads = _mem(tmp_path, monkeypatch)
+
+    async def main():
+        assert await mem.get_user_context() == "ctx1"
+        await mem.add_user_message("Frage")
+        await asyncio.sleep(0)
+        assert threads.ctx_calls == 1  # nur stale markiert
+        assert await mem.get_user_context() == "ctx1"
+        await mem.add_assistant_message("Antwort")
+        for _ in range(5):
+            await asyncio.sleep(0)
+        assert threads.ctx_calls == 2
+        assert await mem.get_user_context() == "ctx2"
+        stats = mem.context_cache_stats()
+        assert stats["invalidations"] == 2 and stats["refreshes"] == 1
+
+    asyncio.run(main())
+
+
+@pytest.mark.parametrize("after_read", [True, False], ids=["missing-in-fetch", "already-in-fetch"])
+def test_append_during_recent_seed_is_kept_once(tmp_path, monkeypatch, after_read):
+    mem, threads = _mem(tmp_path, monkeypatch)
+    threads.msgs = [{"role": "user", "content": "alt"}]
+    threads.hook_after_read = after_read
+
+    async def main():
+        async def append():
+            await mem.add_assistant_message("neu während Seed")
+        threads.on_get = append
+        recent = await mem.list_recent_messages(limit=10)
+        assert [m["content"] for m in recent] == ["alt", "neu während Seed"]
+        await mem.add_user_message("danach")
+        recent = await mem.list_recent_messages(limit=10)
+        assert [m["content"] for m in recent] == ["alt", "neu während Seed", "danach"]
+
+    asyncio.run(main())
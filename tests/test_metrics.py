@@ -0,0 +1,42 @@
+from backend.metrics import _FAMILIES, METRIC, PhaseMetrics, register, render_prometheus
+from backend.orchestration.zep_mirror import ZepMirror
+
+
+def test_mirror_lag_has_its_own_family():
+    chat = PhaseMetrics()
+    lag = PhaseMetrics("gateway_zep_mirror_lag_seconds", help="x", phase_label="target")
+    chat.observe("llm", 0.2, route="/api/chat", engine="zep")
+    lag.observe("graph", 1.5)
+    text = lag.render_prometheus()
+    assert 'gateway_zep_mirror_lag_seconds_count{target="graph",route="",engine=""} 1' in text
+    assert METRIC not in text
+    assert "graph" not in chat.render_prometheus()
+
+
+def test_registered_families_are_exported():
+    fam = register(PhaseMetrics("gateway_test_seconds", help="Test."))
+    fam.observe("x", 0.01)
+    try:
+        text = render_prometheus()
+    finally:
+        _FAMILIES.remove(fam)
+    assert "# TYPE gateway_test_seconds histogram" in text
+    assert f"# TYPE {METRIC} histogram" in text
+
+
+def test_mirror_is_off_by_default(monkeypatch):
+    monkeypatch.delenv("ORCH_MIRROR", raising=False)
+    assert ZepMirror.from_env(client=object(), user_id="u") is None
+
+
+def test_event_counters_count_without_fake_latency():
+    from backend.metrics import EventCounters, metric_labels
+
+    ev = EventCounters("gateway_test_events_total")
+    with metric_labels(route="/api/orch/chat"):
+        ev.inc("orch_branch", engine="fallback")
+        ev.inc("orch_branch", engine="fallback")
+    text = ev.render_prometheus()
+    assert "# TYPE gateway_test_events_total counter" in text
+    assert 'gateway_test_events_total{event="orch_branch",route="/api/orch/chat",engine="fallback"} 2' in text
+    assert ev.snapshot() == {"orch_branch|/api/orch/chat|fallback": 2}
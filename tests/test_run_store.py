@@ -0,0 +1,85 @@
+import asyncio
+import threading
+import time
+
+from backend.orchestration import run_store as rs
+from backend.orchestration.run_store import RunStore
+
+
+def test_put_is_write_behind_and_roundtrips(tmp_path):
+    path = str(tmp_path / "runs.sqlite3")
+    store = RunStore(path)
+    store.put("r1", {"run_id": "r1", "success": True})
+    store.put("r1", {"run_id": "r1", "success": False})
+    assert store.get("r1") == {"run_id": "r1", "success": False}
+    assert store.flush(timeout=2.0)
+    store.close()
+
+    again = RunStore(path)
+    assert again.get("r1") == {"run_id": "r1", "success": False}
+    assert again.stats()["disk_hits"] == 1
+    again.close()
+
+
+def test_put_does_not_wait_for_sqlite(tmp_path):
+    store = RunStore(str(tmp_path / "runs.sqlite3"))
+    store.put("warm", {"x": 0})
+    assert store.flush(timeout=2.0)
+    with store._db_lock:          # Platte "hängt"
+        t0 = time.monotonic()
+        store.put("r1", {"x": 1})
+        assert store.get("r1") == {"x": 1}
+        assert time.monotonic() - t0 < 0.5
+        assert "r1" in store._pending or store._writing   # Writer wartet auf die Platte
+    assert store.flush(timeout=2.0)
+    store.close()
+
+
+def test_aget_reads_disk_off_loop_after_cache_expiry(tmp_path):
+    store = RunStore(str(tmp_path / "runs.sqlite3"), cache_ttl=0.05)
+    store.put("r1", {"x": 1})
+    assert store.flush(timeout=2.0)
+    time.sleep(0.08)
+    seen = []
+    orig = store._get_disk
+
+    def spy(run_id):
+        seen.append(threading.current_thread() is threading.main_thread())
+        return orig(run_id)
+
+    store._get_disk = spy
+    assert asyncio.run(store.aget("r1")) == {"x": 1}
+    assert seen == [False]
+    assert asyncio.run(store.aget("nope")) is None
+    store.close()
+
+
+def test_evicted_pending_record_stays_visible(tmp_path):
+    store = RunStore(str(tmp_path / "runs.sqlite3"), cache_max=1)
+    with store._db_lock:
+        store.put("a", {"x": 1})
+        store.put("b", {"x": 2})      # verdrängt "a" aus dem Cache, Schreiben hängt noch
+        assert asyncio.run(store.aget("a")) == {"x": 1}
+    store.close()
+
+
+def test_prune_runs_in_writer(tmp_path, monkeypatch):
+    monkeypatch.setattr(rs, "_PRUNE_EVERY", 2)
+    store = RunStore(str(tmp_path / "runs.sqlite3"), retention=1.0)
+    with store._db_lock:
+        store._db.execute("INSERT INTO runs(run_id, updated, data) VALUES ('old', 0, '{}')")
+    store.put("r1", {})
+    store.put("r2", {})
+    assert store.flush(timeout=2.0)
+    stats = store.stats()
+    assert stats["pruned"] == 1 and stats["disk_rows"] == 2
+    store.close()
+
+
+def test_memory_only_store():
+    store = RunStore(None, cache_max=2)
+    store.put("a", {"x": 1})
+    assert asyncio.run(store.aget("a")) == {"x": 1}
+    assert store.get("missing") is None
+    assert store.flush(timeout=0.1)
+    assert store.stats()["path"] is None
@@ -0,0 +1,160 @@
+import asyncio
+
+import pytest
+
+from backend.orchestration.scheduler import RunScheduler, SchedulerFull
+
+
+async def _run_all(sched, submissions):
+    """Erst einen blockierenden Job einreihen, dann alle übrigen; Ausführungsreihenfolge zurückgeben."""
+    order = []
+    gate = asyncio.Event()
+
+    async def blocker():
+        await gate.wait()
+
+    def job(name):
+        async def _do():
+            order.append(name)
+        return _do
+
+    await sched.submit("block", blocker, caller="x")
+    await asyncio.sleep(0)
+    for name, caller, prio in submissions:
+        await sched.submit(name, job(name), caller=caller, priority=prio)
+    gate.set()
+    while len(order) < len(submissions):
+        await asyncio.sleep(0.01)
+    await sched.shutdown()
+    return order
+
+
+def test_burst_of_one_caller_does_not_starve_another():
+    sched = RunScheduler(workers=1, max_queue=50)
+    subs = [(f"a{i}", "A", 0) for i in range(10)] + [("b0", "B", 0)]
+    order = asyncio.run(_run_all(sched, subs))
+    assert order.index("b0") <= 1
+
+
+def test_client_priority_is_clamped_weight_not_a_bypass():
+    sched = RunScheduler(workers=1, max_queue=50, priority_max=2)
+    subs = [(f"a{i}", "A", 0) for i in range(4)] + [(f"b{i}", "B", -1000) for i in range(8)]
+    order = asyncio.run(_run_all(sched, subs))
+    # B bekommt höchstens 2**2-fachen Anteil, A's erster Job läuft trotzdem früh
+    assert order.index("a0") <= 4
+    assert order.index("a1") <= 9
+
+
+def test_finish_entries_are_pruned():
+    sched = RunScheduler(workers=1, max_queue=50)
+    subs = [(f"j{i}", f"caller{i}", 0) for i in range(20)]
+    asyncio.run(_run_all(sched, subs))
+    assert sched.stats()["callers"] <= 1
+
+
+def test_full_queue_raises_with_retry_after():
+    sched = RunScheduler(workers=1, max_queue=2)
+
+    async def main():
+        gate = asyncio.Event()
+
+        async def blocker():
+            await gate.wait()
+
+        await sched.submit("running", blocker)
+        await asyncio.sleep(0)
+        await sched.submit("q1", blocker)
+        await sched.submit("q2", blocker)
+        with pytest.raises(SchedulerFull) as ei:
+            await sched.submit("q3", blocker)
+        assert ei.value.retry_after >= 1
+        assert sched.stats()["rejected"] == 1
+        assert sched.cancel("q2") and sched.state("q2") is None
+        gate.set()
+        await sched.shutdown()
+
+    asyncio.run(main())
+
+
+def test_submit_many_is_all_or_nothing():
+    sched = RunScheduler(workers=1, max_queue=3)
+
+    async def main():
+        gate = asyncio.Event()
+
+        async def blocker():
+            await gate.wait()
+
+        await sched.submit("running", blocker)
+        await asyncio.sleep(0)
+        await sched.submit("q1", blocker)
+        with pytest.raises(SchedulerFull):
+            await sched.submit_many([("b0", blocker), ("b1", blocker), ("b2", blocker)], caller="B")
+        assert sched.state("b0") is None and sched.stats()["queued"] == 1
+        positions = await sched.submit_many([("b0", blocker), ("b1", blocker)], caller="B")
+        assert len(set(positions)) == 2 and sched.stats()["queued"] == 3
+        gate.set()
+        await sched.shutdown()
+
+    asyncio.run(main())
+
+
+def test_chunk_members_report_position_and_weight_limits_concurrency():
+    sched = RunScheduler(workers=2, max_queue=10)
+
+    async def main():
+        gate = asyncio.Event()
+        active, peak = [0], [0]
+
+        async def blocker():
+            await gate.wait()
+
+        async def single():
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+            await asyncio.sleep(0.02)
+            active[0] -= 1
+
+        async def chunk():
+            # Gewicht 2 = zwei gleichzeitige Runs
+            async def one():
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+                await asyncio.sleep(0.02)
+                active[0] -= 1
+            await asyncio.gather(one(), one())
+
+        await sched.submit("block", blocker)
+        await asyncio.sleep(0)
+        positions = await sched.submit_many([("batch:0", chunk, ["r1", "r2", "r3"]), ("solo", single)])
+        assert sched.weight_for(3) == 2
+        assert sched.state("r2") == "queued" and sched.position("r2") == positions[0]
+        assert not sched.cancel("r2")                # Mitglieder nur per Cancel-Token
+        gate.set()
+        while sched.stats()["completed"] < 3:
+            await asyncio.sleep(0.01)
+        assert sched.state("r1") is None and sched.position("r1") is None
+        assert peak[0] == 2 and sched.stats()["busy_slots"] == 0
+        await sched.shutdown()
+
+    asyncio.run(main())
+
+
+def test_cancelled_chunk_drops_members():
+    sched = RunScheduler(workers=1, max_queue=10)
+
+    async def main():
+        gate = asyncio.Event()
+
+        async def blocker():
+            await gate.wait()
+
+        await sched.submit("block", blocker)
+        await asyncio.sleep(0)
+        await sched.submit_many([("batch:0", blocker, ["r1", "r2"])])
+        assert sched.cancel("batch:0")
+        assert sched.state("r1") is None
+        gate.set()
+        await sched.shutdown()
+
+    asyncio.run(main())
@@ -0,0 +1,64 @@
+import asyncio
+
+from backend.singleflight import SingleFlight
+
+
+def test_concurrent_calls_share_one_task():
+    sf = SingleFlight()
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.02)
+        return "ok"
+
+    async def main():
+        return await asyncio.gather(*(sf.do("k", work) for _ in range(3)))
+
+    res = asyncio.run(main())
+    assert calls == [1]
+    assert sorted(shared for _, shared in res) == [False, True, True]
+    assert all(r == "ok" for r, _ in res)
+    assert sf.stats() == {"leaders": 1, "coalesced": 2, "abandoned": 0, "inflight": 0}
+
+
+def test_cancelled_waiter_does_not_cancel_others():
+    sf = SingleFlight()
+
+    async def work():
+        await asyncio.sleep(0.05)
+        return "ok"
+
+    async def main():
+        first = asyncio.ensure_future(sf.do("k", work))
+        second = asyncio.ensure_future(sf.do("k", work))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        return await second, first.cancelled()
+
+    (res, shared), cancelled = asyncio.run(main())
+    assert res == "ok" and shared and cancelled
+    assert sf.stats()["abandoned"] == 0
+
+
+def test_last_waiter_cancel_aborts_task():
+    sf = SingleFlight()
+    state = {}
+
+    async def work():
+        try:
+            await asyncio.sleep(1.0)
+        except asyncio.CancelledError:
+            state["cancelled"] = True
+            raise
+        return "ok"
+
+    async def main():
+        waiter = asyncio.ensure_future(sf.do("k", work))
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        await asyncio.sleep(0.01)
+
+    asyncio.run(main())
+    assert state == {"cancelled": True}
+    assert sf.stats()["abandoned"] == 1 and sf.stats()["inflight"] == 0
@@ -0,0 +1,94 @@
+import time
+
+from backend.orchestration.space_archive import SpaceArchive
+from backend.orchestration.space_store import SpaceStore
+from backend.orchestration.zep_adapter import ZepMemoryAdapter
+
+_INMEM = {"workcell": "inmem", "orch": "inmem", "agent_st": "inmem"}
+
+
+def _store_with_tree() -> SpaceStore:
+    store = SpaceStore()
+    store.create("wc", "workcell", "wc:t1")
+    store.create("st", "st", "coder", parent_id="wc")
+    store.append_message("st", 1.0, "coder", "ergebnis " * 1000)
+    store.append_event("wc", 2.0, "done", {"impl_ok": True})
+    return store
+
+
+def test_archive_round_trip_by_any_space_id(tmp_path):
+    store = _store_with_tree()
+    arch = SpaceArchive(str(tmp_path / "spaces.sqlite3"))
+    snap = store.subtree("wc")
+    assert arch.put(snap)
+    assert arch.get("wc") == snap
+    child = arch.get("st")
+    assert child["space_id"] == "st" and child["messages"][0]["content"] == "ergebnis " * 1000
+    assert arch.get("nope") is None
+    stats = arch.stats()
+    assert stats["disk_rows"] == 1 and stats["hits"] == 2 and stats["misses"] == 1
+    assert stats["bytes"] < len("ergebnis " * 1000)
+    arch.close()
+    # nach Neustart weiterhin lesbar
+    again = SpaceArchive(str(tmp_path / "spaces.sqlite3"))
+    assert again.get("st")["space_id"] == "st"
+    again.close()
+
+
+def test_archive_prunes_old_entries(tmp_path):
+    arch = SpaceArchive(str(tmp_path / "spaces.sqlite3"), retention=60.0)
+    arch.put({"space_id": "old", "children": [{"space_id": "old-st"}]}, closed=time.time() - 3600)
+    arch.put({"space_id": "new"})
+    arch._prune(time.time())
+    assert arch.get("old") is None and arch.get("old-st") is None
+    assert arch.get("new") is not None
+    assert arch.stats()["pruned"] == 1
+    arch.close()
+
+
+def _wait(cond, timeout: float = 2.0) -> bool:
+    end = time.monotonic() + timeout
+    while not cond() and time.monotonic() < end:
+        time.sleep(0.01)
+    return cond()
+
+
+def test_retention_ttl_is_enforced_without_further_calls(tmp_path):
+    arch = SpaceArchive(str(tmp_path / "spaces.sqlite3"))
+    mem = ZepMemoryAdapter(zep_facade=None, targets=_INMEM, archive=arch, retain_ttl=0.1, retain_max_bytes=1 << 20)
+    wc = mem.create_space(kind="workcell")
+    mem.create_space(kind="st", parent_id=wc)
+    mem.gc(wc)
+    assert mem.inspect_space(wc)["source"] == "memory"
+    # kein weiterer Aufruf am Adapter: der Reaper verdrängt nach Ablauf der TTL
+    assert _wait(lambda: wc not in mem._spaces)
+    assert mem.inspect_space(wc)["source"] == "archive"
+    assert mem.space_stats()["retention"]["expired"] == 1
+    mem.close()
+
+
+def test_retention_budget_is_enforced_on_gc(tmp_path):
+    arch = SpaceArchive(str(tmp_path / "spaces.sqlite3"))
+    mem = ZepMemoryAdapter(zep_facade=None, targets=_INMEM, archive=arch, retain_ttl=3600, retain_max_bytes=4096)
+    ids = []
+    for _ in range(3):
+        wc = mem.create_space(kind="workcell")
+        mem.write_message(space_id=wc, role="coder", content="z" * 3000)
+        mem.gc(wc)
+        ids.append(wc)
+    assert _wait(lambda: mem.space_stats()["retention"]["bytes"] <= 4096)
+    assert ids[0] not in mem._spaces and ids[-1] in mem._spaces
+    assert mem.space_stats()["retention"]["over_budget"] == 2
+    mem.close()
+    assert arch.stats()["path"] is None
+
+
+def test_close_archives_retained_subtrees(tmp_path):
+    path = str(tmp_path / "spaces.sqlite3")
+    mem = ZepMemoryAdapter(zep_facade=None, targets=_INMEM, archive=SpaceArchive(path), retain_ttl=3600)
+    wc = mem.create_space(kind="workcell")
+    mem.gc(wc)
+    mem.close()
+    arch = SpaceArchive(path)
+    assert arch.get(wc) is not None
+    arch.close()
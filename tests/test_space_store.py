@@ -0,0 +1,68 @@
+from backend.orchestration.space_store import SpaceStore
+
+
+def _tree(store: SpaceStore) -> None:
+    store.create("wc", "workcell", "wc:t1")
+    for name in ("planner", "coder", "critic"):
+        store.create(f"st-{name}", "st", name, parent_id="wc")
+    store.create("other", "workcell")
+
+
+def test_gc_removes_whole_subtree_only():
+    store = SpaceStore(stripes=4)
+    _tree(store)
+    assert store.gc("wc") == 4
+    assert "st-coder" not in store and "other" in store
+    stats = store.stats()
+    assert stats["spaces"] == 1 and stats["by_kind"] == {"workcell": 1}
+    assert stats["gc"]["freed"] == 4
+    assert store.gc("wc") == 0
+
+
+def test_gc_of_child_unhooks_it_from_parent():
+    store = SpaceStore()
+    _tree(store)
+    store.gc("st-critic")
+    assert {c["space_id"] for c in store.subtree("wc")["children"]} == {"st-planner", "st-coder"}
+    assert store.subtree_bytes("st-critic") is None
+
+
+def test_large_content_is_compressed_and_round_trips():
+    store = SpaceStore(compress_threshold=100)
+    store.create("s", "st")
+    big = "x" * 10_000
+    store.append_message("s", 1.0, "coder", big, {"k": 1})
+    store.append_event("s", 2.0, "coder_candidate", {"blob": "y" * 500})
+    store.append_message("s", 3.0, "critic", "OK")
+    snap = store.snapshot("s")
+    assert snap["messages"][0]["content"] == big and snap["messages"][0]["meta"] == {"k": 1}
+    assert snap["messages"][1]["content"] == "OK"
+    assert snap["events"][0]["payload"]["blob"] == "y" * 500
+    stats = store.stats()
+    assert stats["compressed"] == 2
+    assert stats["bytes"] < len(big)
+
+
+def test_gc_lowers_compressed_count():
+    store = SpaceStore(compress_threshold=100)
+    store.create("wc", "workcell")
+    store.create("st", "st", parent_id="wc")
+    store.append_message("wc", 1.0, "coder", "x" * 500)
+    store.append_message("st", 1.0, "coder", "x" * 500)
+    store.create("other", "workcell")
+    store.append_message("other", 1.0, "coder", "z" * 500)
+    assert store.stats()["compressed"] == 3
+    store.gc("wc")
+    assert store.stats()["compressed"] == 1
+    store.gc("other")
+    assert store.stats()["compressed"] == 0 and store.stats()["bytes"] == 0
+
+
+def test_append_to_unknown_space_raises():
+    store = SpaceStore()
+    try:
+        store.append_message("nope", 0.0, "user", "hi")
+    except KeyError:
+        pass
+    else:
+        raise AssertionError("KeyError erwartet")
@@ -0,0 +1,54 @@
+from dataclasses import dataclass
+
+from backend.captain_hub import CaptainHub
+from backend.captain_spoke_registry import RealRouter
+from conftest import FakeSpoke
+
+
+def test_candidates_are_cached_immutable_tuples():
+    py, go, generic = FakeSpoke(name="py", score=5, tags=("python",)), FakeSpoke(name="go", score=9, tags=("go",)), FakeSpoke(name="gen", score=1)
+    router = RealRouter({"coder": [py, go, generic]})
+    first = router.candidates("coder", {"python"})
+    assert isinstance(first, tuple) and first == (py, generic)
+    assert router.candidates("coder", {"python"}) is first
+    assert router.candidates("coder", {"rust"}) == (go, py, generic)   # kein Treffer → volle Liste
+    router.register("coder", FakeSpoke(name="py2", score=7, tags=("python",)))
+    assert first == (py, generic)                                        # ausgegebenes Tupel unverändert
+    assert [s.name for s in router.candidates("coder", {"python"})] == ["py2", "py", "gen"]
+
+
+def test_hub_sees_registry_changes_without_own_cache():
+    router = RealRouter({"coder": [FakeSpoke(name="a", score=3)]})
+    hub = CaptainHub(router=router, memory=None)
+    assert [s.name for _, s in hub._match_spokes("coder", set())] == ["a"]
+    router.register("coder", FakeSpoke(name="b", score=8))
+    assert [s.name for _, s in hub._match_spokes("coder", set())] == ["b", "a"]
+    assert not hasattr(hub, "_match_cache")
+
+
+def test_cache_key_ignores_unknown_tags():
+    py, generic = FakeSpoke(name="py", score=5, tags=("python",)), FakeSpoke(name="gen", score=1)
+    router = RealRouter({"coder": [py, generic]})
+    first = router.candidates("coder", {"python", "baue", "eine", "api"})
+    assert router.candidates("coder", {"python", "etwas", "anderes"}) is first
+    assert router.candidates("coder", {"nur", "freitext"}) is router.candidates("coder", set())
+    assert len(router._cache) == 2
+
+
+def test_string_tags_are_one_tag():
+    sp, generic = FakeSpoke(name="py", score=5, tags="python"), FakeSpoke(name="gen", score=1)  # type: ignore[arg-type]
+    router = RealRouter({"coder": [sp, generic]})
+    assert router.candidates("coder", {"python"}) == (sp, generic)
+    assert "p" not in router._tag_index["coder"]
+
+
+def test_unregister_uses_identity():
+    @dataclass
+    class _Eq(FakeSpoke):
+        pass  # eq=True: gleiche Felder → gleich, aber nicht identisch
+
+    a, b = _Eq(name="x"), _Eq(name="x")
+    router = RealRouter({"coder": [a]})
+    assert not router.unregister("coder", b)
+    assert router.candidates("coder", set()) == (a,)
+    assert router.unregister("coder", a) and router.candidates("coder", set()) == ()
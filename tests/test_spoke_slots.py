@@ -0,0 +1,56 @@
+import asyncio
+import threading
+import time
+
+from backend.captain_hub import CaptainHub, HubPolicy
+from backend.captain_spoke_registry import RealRouter
+from backend.spoke_slots import SpokeSlots
+from conftest import FakeSpoke
+
+
+def test_release_wakes_subscribers_only_when_free():
+    sl = SpokeSlots(1)
+    woke = []
+    sl.subscribe(lambda: woke.append(1))
+    sl.force_acquire()
+    sl.force_acquire()          # überbucht
+    sl.release()                # immer noch voll → niemand geweckt
+    assert woke == []
+    sl.release()
+    assert woke == [1]
+    assert sl.stats()["waiters"] == 1
+
+
+def _busy_hub(wait: float = 5.0):
+    spoke = FakeSpoke()
+    assert spoke.slots.try_acquire()
+    hub = CaptainHub(router=RealRouter({"coder": [spoke]}), memory=None, policy=HubPolicy(spoke_wait=wait))
+    return hub, spoke
+
+
+def test_sync_waiter_is_woken_by_release():
+    hub, spoke = _busy_hub()
+    threading.Timer(0.05, spoke.release).start()
+    t0 = time.monotonic()
+    assert hub._acquire_role("coder", set()) is spoke
+    assert time.monotonic() - t0 < 0.2
+    assert spoke.slots.in_use == 1 and spoke.slots.stats()["waiters"] == 0
+
+
+def test_async_waiter_is_woken_by_release_from_thread():
+    hub, spoke = _busy_hub()
+
+    async def main():
+        threading.Timer(0.05, spoke.release).start()
+        t0 = time.monotonic()
+        assert await hub._aacquire_role("coder", set()) is spoke
+        assert time.monotonic() - t0 < 0.2
+
+    asyncio.run(main())
+    assert spoke.slots.stats()["waiters"] == 0
+
+
+def test_wait_ends_in_overcommit_fallback():
+    hub, spoke = _busy_hub(wait=0.1)
+    assert hub._acquire_role("coder", set()) is spoke
+    assert spoke.slots.in_use == 2 and spoke.slots.stats()["overcommits"] == 1
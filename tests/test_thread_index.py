@@ -0,0 +1,117 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from backend.memory.memory_zep_thread import ZepThreadMemory
+from backend.memory.thread_index import ThreadSearchIndex, index_path
+
+
+def _index(path=None) -> ThreadSearchIndex:
+    idx = ThreadSearchIndex(path)
+    idx.add_many([
+        {"role": "user", "content": "Wie läuft das Deployment auf Staging?"},
+        {"role": "assistant", "content": "Das Deployment auf Staging ist grün, Deployment auf Prod folgt."},
+        {"role": "user", "content": "Merke: Prod-Deployment nur freitags"},
+        {"role": "assistant", "content": "Kaffeemaschine ist kaputt"},
+    ], backfilled=True)
+    return idx
+
+
+def test_bm25_ranks_by_term_frequency_and_filters():
+    idx = _index()
+    res, _ = idx.search("deployment staging", limit=5)
+    assert {r["content"] for r in res[:2]} == {
+        "Wie läuft das Deployment auf Staging?",
+        "Das Deployment auf Staging ist grün, Deployment auf Prod folgt.",
+    }
+    assert res[0]["score"] >= res[1]["score"] > res[2]["score"]
+    assert all("Kaffee" not in r["content"] for r in res)
+    res, _ = idx.search("deployment", roles={"user"}, exclude_notes=True)
+    assert [r["content"] for r in res] == ["Wie läuft das Deployment auf Staging?"]
+
+
+def test_prefix_match_and_cursor_paging():
+    idx = _index()
+    res, cur = idx.search("deplo", limit=1)
+    assert len(res) == 1 and cur == "1"
+    more, _ = idx.search("deplo", limit=5, cursor=cur)
+    assert res[0]["content"] not in {r["content"] for r in more}
+
+
+def test_substring_hits_come_first_newest_first():
+    idx = _index()
+    # "maschine" steckt mitten im Wort → kein Token-Treffer, aber Teilstring wie bisher
+    res, _ = idx.search("maschine", substring_scan=200)
+    assert [r["content"] for r in res] == ["Kaffeemaschine ist kaputt"]
+    assert idx.search("maschine")[0] == []
+    res, _ = idx.search("auf staging", substring_scan=200)
+    assert [r["content"] for r in res][:2] == [
+        "Das Deployment auf Staging ist grün, Deployment auf Prod folgt.",
+        "Wie läuft das Deployment auf Staging?",
+    ]
+    # außerhalb des Scan-Fensters nur noch BM25
+    res, _ = idx.search("maschine", substring_scan=1)
+    assert res[0]["content"] == "Kaffeemaschine ist kaputt"
+    res, _ = idx.search("läuft das", substring_scan=1)
+    assert res[0]["content"] != "Kaffeemaschine ist kaputt"
+
+
+def test_persistence_round_trip_with_deferred_appends(tmp_path):
+    path = index_path(str(tmp_path), "thread/1")
+    idx = _index(path)
+    idx.add("user", "neue Nachricht zu Rollback", defer=True)
+    assert idx.pending == 1
+    assert len(ThreadSearchIndex(path)) == 4
+    assert idx.flush() == 1 and idx.pending == 0
+    again = ThreadSearchIndex(path)
+    assert again.backfilled and len(again) == 5
+    assert again.search("rollback")[0][0]["content"] == "neue Nachricht zu Rollback"
+
+
+class _Threads:
+    def __init__(self, msgs):
+        self.msgs = list(msgs)
+        self.on_get = None
+        self.hook_after_read = False
+
+    async def get(self, thread_id, limit=None, cursor=None, lastn=None):
+        hook, self.on_get = self.on_get, None
+        if hook is not None and not self.hook_after_read:
+            await hook()
+        msgs = self.msgs[-lastn:] if lastn else self.msgs[cursor or 0:(cursor or 0) + limit if limit else None]
+        out = SimpleNamespace(messages=[dict(m) for m in msgs])
+        if hook is not None and self.hook_after_read:
+            await hook()
+        return out
+
+    async def add_messages(self, thread_id, messages):
+        self.msgs.extend(messages)
+
+    async def get_user_context(self, thread_id, mode):
+        return SimpleNamespace(context="")
+
+
+@pytest.mark.parametrize("after_read", [True, False], ids=["missing-in-fetch", "already-in-fetch"])
+def test_appends_during_backfill_are_merged_once(tmp_path, monkeypatch, after_read):
+    monkeypatch.setenv("ZEP_THREAD_INDEX_DIR", str(tmp_path))
+    threads = _Threads([{"role": "user", "content": "alte Nachricht über Kubernetes"}])
+    threads.hook_after_read = after_read
+    mem = ZepThreadMemory(SimpleNamespace(thread=threads), "u1", "t1")
+
+    async def main():
+        async def append_during_fetch():
+            # läuft, während der Backfill die Seite holt → remote erst nach dem Fetch sichtbar
+            await mem.add_assistant_message("Antwort zu Terraform")
+        threads.on_get = append_during_fetch
+        # erste Suche stößt den Backfill an; der Append landet im Backlog und wird danach gemerged
+        res = await mem.search_text("terraform")
+        assert [r["content"] for r in res] == ["Antwort zu Terraform"]
+        assert [r["content"] for r in await mem.search_text("kubernetes")] == ["alte Nachricht über Kubernetes"]
+        await mem.add_user_message("danach: Ansible")
+        assert (await mem.search_text("ansible"))[0]["content"] == "danach: Ansible"
+        await mem.aclose()
+
+    asyncio.run(main())
+    disk = ThreadSearchIndex(index_path(str(tmp_path), "t1"))
+    assert disk.backfilled and len(disk) == 3
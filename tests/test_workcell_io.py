@@ -0,0 +1,82 @@
+import asyncio
+
+import pytest
+
+from backend.orchestration.events import RunEventBus
+from backend.workcell_io import WorkcellIO
+from conftest import FakeBulkMemory, FakeMemory
+
+
+class _AsyncBulk(FakeBulkMemory):
+    """Bulk-Memory mit nativen Coroutinen; zählt a<op>-Aufrufe getrennt."""
+
+    async def acreate_spaces(self, *, specs):
+        self.calls["acreate_spaces"] += 1
+        return self.create_spaces(specs=specs)
+
+    async def awrite_messages(self, *, writes):
+        self.calls["awrite_messages"] += 1
+        self.write_messages(writes=writes)
+
+    async def afinish_space(self, **kw):
+        self.calls["afinish_space"] += 1
+        self.finish_space(**kw)
+
+
+def _run_sync(io, end):
+    wc = io.open(ticket_id="t1")
+    io.step_out(workcell_sid=wc.workcell_sid, st_ids=wc.st_ids, role="coder", content="x = 1", prompt="p")
+    getattr(io, end)(workcell_sid=wc.workcell_sid, **({"error": "boom"} if end == "fail" else {}))
+    return wc
+
+
+async def _run_async(io, end):
+    wc = await io.aopen(ticket_id="t1")
+    await io.astep_out(workcell_sid=wc.workcell_sid, st_ids=wc.st_ids, role="coder", content="x = 1", prompt="p")
+    await getattr(io, f"a{end}")(workcell_sid=wc.workcell_sid, **({"error": "boom"} if end == "fail" else {}))
+    return wc
+
+
+_STATUS = {"close": "done", "cancel": "cancelled", "fail": "failed"}
+
+
+@pytest.mark.parametrize("end", ["close", "cancel", "fail"])
+def test_bulk_path_is_one_call_per_step(end):
+    mem = FakeBulkMemory()
+    wc = _run_sync(WorkcellIO(mem, events=RunEventBus()), end)
+    assert dict(mem.calls) == {"create_spaces": 1, "write_messages": 1, "finish_space": 1}
+    assert set(wc.st_ids) == {"planner", "coder", "critic"}
+    assert [m["space_id"] for m in mem.messages] == [wc.workcell_sid, wc.st_ids["coder"]]
+    assert mem.status[wc.workcell_sid] == _STATUS[end]
+    assert mem.event_types() == [_STATUS[end]]
+    assert mem.parent == {}                    # gc=True räumt den ganzen Baum
+
+
+@pytest.mark.parametrize("end", ["close", "cancel", "fail"])
+def test_async_bulk_uses_coroutines_once(end):
+    mem = _AsyncBulk()
+    asyncio.run(_run_async(WorkcellIO(mem, events=RunEventBus()), end))
+    assert mem.calls["acreate_spaces"] == mem.calls["create_spaces"] == 1
+    assert mem.calls["awrite_messages"] == mem.calls["write_messages"] == 1
+    assert mem.calls["afinish_space"] == mem.calls["finish_space"] == 1
+    assert set(mem.calls) == {"acreate_spaces", "create_spaces", "awrite_messages", "write_messages",
+                              "afinish_space", "finish_space"}
+
+
+def test_async_bulk_falls_back_to_sync_primitives():
+    mem = FakeBulkMemory()
+    asyncio.run(_run_async(WorkcellIO(mem, events=RunEventBus()), "close"))
+    assert dict(mem.calls) == {"create_spaces": 1, "write_messages": 1, "finish_space": 1}
+
+
+def test_bulk_open_into_existing_workcell_sets_status():
+    mem = FakeBulkMemory()
+    wc = WorkcellIO(mem, events=RunEventBus()).open(ticket_id="t1", workcell_space_id="wc-0")
+    assert dict(mem.calls) == {"create_spaces": 1, "set_status": 1}
+    assert wc.workcell_sid == "wc-0" and all(mem.parent[s] == "wc-0" for s in wc.st_ids.values())
+
+
+def test_single_call_fallback_without_bulk():
+    mem = FakeMemory()
+    _run_sync(WorkcellIO(mem, events=RunEventBus()), "close")
+    assert dict(mem.calls) == {"create_space": 4, "set_status": 2, "write_message": 2, "write_event": 1, "gc": 1}
@@ -0,0 +1,160 @@
+import asyncio
+import json
+import time
+from types import SimpleNamespace
+
+from backend.orchestration.zep_mirror import MirrorRecord, ZepMirror
+
+
+class _ApiError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"status {status_code}")
+        self.status_code = status_code
+
+
+class _Client:
+    """Fake-ZEP-Client: zeichnet Calls auf; `fail` = Anzahl add_messages-Fehler vor dem Erfolg."""
+
+    def __init__(self, fail=0, exists=False):
+        self.fail = fail
+        self.exists = exists
+        self.creates, self.adds, self.episodes = [], [], []
+        self.thread = SimpleNamespace(create=self._create, add_messages=self._add)
+        self.graph = SimpleNamespace(add=self._graph_add)
+
+    async def _create(self, *, thread_id, user_id):
+        self.creates.append(thread_id)
+        if self.exists:
+            raise _ApiError(409)
+
+    async def _add(self, *, thread_id, messages):
+        if self.fail:
+            self.fail -= 1
+            raise RuntimeError("zep down")
+        self.adds.append((thread_id, [m["content"] for m in messages]))
+
+    async def _graph_add(self, *, user_id, type, data):
+        self.episodes.append(json.loads(data))
+
+
+def _msg(root, text, target="thread"):
+    return MirrorRecord(target, root, f"{root}/s", "coder", "message", {"role": "coder", "content": text})
+
+
+def test_linger_batches_steps_into_one_call():
+    async def main():
+        client = _Client(exists=True)
+        mirror = ZepMirror(client, "u", linger=0.05)
+        mirror.bind_loop()
+        mirror.enqueue(_msg("w1", "a"))
+        mirror.enqueue(_msg("w1", "b"), _msg("w1", "c"))
+        assert await mirror.flush(timeout=2.0)
+        mirror.enqueue(_msg("w1", "d"))
+        assert await mirror.flush(timeout=2.0)
+        await mirror.aclose()
+        return client, mirror.stats()
+
+    client, stats = asyncio.run(main())
+    assert client.creates == ["orch_w1"]          # 409 → existiert, trotzdem nur einmal angelegt
+    assert client.adds == [("orch_w1", ["a", "b", "c"]), ("orch_w1", ["d"])]
+    assert stats["sent"] == 4 and stats["batches"] == 2 and stats["failed"] == 0
+
+
+def test_groups_keep_order_across_roots():
+    async def main():
+        client = _Client()
+        mirror = ZepMirror(client, "u", linger=0.05)
+        mirror.bind_loop()
+        mirror.enqueue(_msg("w1", "a"), _msg("w1", "b"), _msg("w2", "c"), _msg("w1", "d"))
+        await mirror.aclose()
+        return client
+
+    client = asyncio.run(main())
+    assert client.adds == [("orch_w1", ["a", "b"]), ("orch_w2", ["c"]), ("orch_w1", ["d"])]
+    assert client.creates == ["orch_w1", "orch_w2"]
+
+
+def test_full_batch_and_kick_skip_linger():
+    async def main():
+        client = _Client()
+        mirror = ZepMirror(client, "u", linger=30.0, batch=2)
+        mirror.bind_loop()
+        t0 = time.monotonic()
+        mirror.enqueue(_msg("w1", "a"), _msg("w1", "b"))        # volle Batch → sofort
+        while not client.adds:
+            await asyncio.sleep(0.01)
+        mirror.enqueue(_msg("w1", "c"))
+        mirror.kick()
+        while len(client.adds) < 2:
+            await asyncio.sleep(0.01)
+        took = time.monotonic() - t0
+        await mirror.aclose(timeout=1.0)
+        return client, took
+
+    client, took = asyncio.run(main())
+    assert took < 2.0
+    assert client.adds == [("orch_w1", ["a", "b"]), ("orch_w1", ["c"])]
+
+
+def test_retry_then_success():
+    async def main():
+        client = _Client(fail=1)
+        mirror = ZepMirror(client, "u", linger=0.0, retries=2)
+        mirror.bind_loop()
+        mirror.enqueue(_msg("w1", "a"))
+        assert await mirror.flush(timeout=3.0)
+        await mirror.aclose()
+        return client, mirror.stats()
+
+    client, stats = asyncio.run(main())
+    assert client.adds == [("orch_w1", ["a"])]
+    assert stats["retries"] == 1 and stats["sent"] == 1 and stats["failed"] == 0
+
+
+def test_gives_up_after_retries():
+    async def main():
+        client = _Client(fail=5)
+        mirror = ZepMirror(client, "u", linger=0.0, retries=0)
+        mirror.bind_loop()
+        mirror.enqueue(_msg("w1", "a"), _msg("w1", "b"))
+        assert await mirror.flush(timeout=2.0)
+        await mirror.aclose()
+        return client, mirror.stats()
+
+    client, stats = asyncio.run(main())
+    assert client.adds == []
+    assert stats["failed"] == 2 and stats["sent"] == 0 and stats["pending"] == 0
+
+
+def test_full_queue_drops_oldest():
+    client = _Client()
+    mirror = ZepMirror(client, "u", max_pending=3)      # kein Loop gebunden → nichts wird gesendet
+    mirror.enqueue(*[_msg("w1", str(i)) for i in range(5)])
+    stats = mirror.stats()
+    assert stats["dropped"] == 2 and stats["pending"] == 3
+
+    async def main():
+        mirror.bind_loop()
+        await mirror.aclose()
+
+    asyncio.run(main())
+    assert client.adds == [("orch_w1", ["2", "3", "4"])]
+
+
+def test_graph_records_become_json_episodes():
+    async def main():
+        client = _Client()
+        mirror = ZepMirror(client, "u", linger=0.0)
+        mirror.bind_loop()
+        mirror.enqueue(
+            _msg("w1", "hello", target="graph"),
+            MirrorRecord("graph", "w1", "w1/s", "coder", "event", {"type": "done", "payload": {"ok": True}}),
+        )
+        await mirror.aclose()
+        return client
+
+    client = asyncio.run(main())
+    assert client.adds == [] and len(client.episodes) == 1
+    ep = client.episodes[0]
+    assert ep["workcell"] == "w1"
+    assert [r["op"] for r in ep["records"]] == ["message", "event"]